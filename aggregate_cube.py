@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+
+from state_management import shared_state
+
+# Number of per-sheet cubes kept in memory, shared by all sessions
+CUBE_CACHE_SIZE = 32
+
+# Dimensions derived from another column instead of read directly from the sheet
+DERIVED_DIMENSIONS = {
+    'Tahun': lambda df: df['Tanggal'].dt.year,
+}
+
+# Aggregations supported by a rollup: 'size' counts rows per group in group order,
+# 'count' counts rows per group ordered like value_counts (largest first)
+COUNT_AGGREGATIONS = ('size', 'count')
+
+
+def _as_tuple(value):
+    if value is None:
+        return None
+    return (value,) if isinstance(value, str) else tuple(value)
+
+
+def frame_bytes(result) -> int:
+    """
+    Deep memory usage of a rollup result; a DataFrame reports it per column, a Series as one number.
+    """
+    usage = result.memory_usage(deep=True)
+    return int(usage.sum() if hasattr(usage, 'sum') else usage)
+
+
+def dimension_columns(dims) -> list:
+    """
+    Sheet columns a set of dimensions is computed from.
+    """
+    columns = []
+    for dim in _as_tuple(dims):
+        columns.append('Tanggal' if dim in DERIVED_DIMENSIONS else dim)
+    return columns
+
+
+class AggregateCube:
+    """
+    Memoized dimension/measure rollups of one sheet.
+
+    Rollups sharing the same dimensions reuse one groupby, so the sheet rows are
+    factorized once per dimension set; every later request is a dictionary lookup.
+    Results are returned as fresh frames, safe for the caller to modify.
+
+    :param df: Sheet data.
+    :param rollups: ``(dims, measure, how)`` tuples to compute up front.
+    :param owns_data: Whether ``df`` is held only by this cube (e.g. date-filtered rows) and
+        counts towards its footprint, rather than belonging to a cached workbook.
+    :param on_grow: Called after new rollups are memoized, so a cache holding the cube can
+        re-measure it.
+    """
+
+    def __init__(self, df, rollups=(), owns_data=False, on_grow=None):
+        self._df = df
+        self._owns_data = owns_data
+        self._on_grow = on_grow
+        self._rollups = {}
+        self._lock = threading.Lock()
+        if rollups:
+            self.precompute(rollups)
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate footprint of the memoized rollups, plus the rows when the cube owns them;
+        an unfiltered sheet belongs to its workbook.
+        """
+        with self._lock:
+            results = list(self._rollups.values())
+        rows = frame_bytes(self._df) if self._owns_data else 0
+        return rows + sum(frame_bytes(result) for result in results)
+
+    def precompute(self, rollups):
+        by_dims = OrderedDict()
+        for dims, measure, how in rollups:
+            by_dims.setdefault(_as_tuple(dims), []).append((_as_tuple(measure), how))
+        for dims, aggregations in by_dims.items():
+            self._compute(dims, aggregations)
+
+    def rollup(self, dims, measure=None, how='sum', name=None):
+        """
+        Aggregate ``measure`` by ``dims``.
+
+        :param dims: Dimension column name or names.
+        :param measure: Measure column name or names; None for row counts.
+        :param how: 'sum', 'mean', or one of COUNT_AGGREGATIONS.
+        :param name: Column name of the counts when ``how`` counts rows.
+        :return: Aggregated frame with the dimensions as columns.
+        """
+        dims, measure = _as_tuple(dims), _as_tuple(measure)
+        key = (dims, measure, how)
+        result = self._rollups.get(key)
+        if result is None:
+            self._compute(dims, [(measure, how)])
+            result = self._rollups[key]
+        if how in COUNT_AGGREGATIONS:
+            return result.reset_index(name=name or 'Jumlah')
+        return result.reset_index()
+
+    def _compute(self, dims, aggregations):
+        pending = [(measure, how) for measure, how in aggregations if (dims, measure, how) not in self._rollups]
+        if not pending:
+            return
+        keys = [self._dimension(dim) for dim in dims]
+        grouped = self._df.groupby(keys, observed=True)
+        sizes = None
+        results = {}
+        for measure, how in pending:
+            if how in COUNT_AGGREGATIONS:
+                if sizes is None:
+                    sizes = grouped.size()
+                result = sizes.sort_values(ascending=False, kind='stable') if how == 'count' else sizes
+            elif len(measure) == 1:
+                result = grouped[measure[0]].agg(how)
+            else:
+                result = grouped[list(measure)].agg(how)
+            results[(dims, measure, how)] = result
+        with self._lock:
+            self._rollups.update(results)
+        if self._on_grow is not None:
+            self._on_grow()
+
+    def _dimension(self, dim):
+        if dim not in self._df.columns and dim in DERIVED_DIMENSIONS:
+            return DERIVED_DIMENSIONS[dim](self._df).rename(dim)
+        return self._df[dim]
+
+
+class CubeCache:
+    """
+    Cubes keyed by the ``sheet_key`` attribute the loader puts on sheet frames, kept in
+    the ``'aggregates'`` namespace of the shared state store.
+    """
+
+    namespace = 'aggregates'
+
+    def __init__(self, max_entries: int = CUBE_CACHE_SIZE, store=shared_state):
+        self.max_entries = max_entries
+        self._store = store
+        self._store.set_limit(self.namespace, max_entries)
+
+    def get(self, df, rollups=()):
+        """
+        Cube for ``df``, built and precomputed with ``rollups`` on first use.
+
+        Frames without a ``sheet_key`` (not loaded through data_loader) get an uncached cube.
+        Filtered or re-sorted frames (marked ``filtered_from``) are counted with their rows,
+        so the shared store's byte cap sees the copies date-range cubes hold.
+        """
+        key = df.attrs.get('sheet_key')
+        if key is None:
+            return AggregateCube(df, rollups)
+        owns_data = df.attrs.get('filtered_from') is not None
+        return self._store.get_or_create(
+            self.namespace, key,
+            lambda: AggregateCube(df, rollups, owns_data, on_grow=lambda: self._store.resize(self.namespace, key))
+        )
+
+
+cube_cache = CubeCache()
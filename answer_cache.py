@@ -0,0 +1,206 @@
+import difflib
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from chat_context import STOPWORDS
+
+# Answers older than this are asked again
+ANSWER_TTL = 24 * 60 * 60
+MAX_ANSWERS = 512
+# Cosine similarity of character n-gram vectors above which two questions count as the same;
+# None (the default) disables the similarity tier so only exact repeats are served
+SIMILARITY_THRESHOLD = None
+# Width of the hashed n-gram vectors and length of the n-grams
+NGRAM_DIMENSIONS = 1024
+NGRAM_SIZE = 3
+# Words that flip a question's meaning while barely changing its n-grams; similar questions
+# only match when they contain the same ones ("paling laku" is not "paling tidak laku")
+POLARITY_WORDS = frozenset(
+    'tidak tak bukan belum kurang tanpa jangan terendah terkecil tersedikit terburuk minimum'.split()
+)
+# Spelling similarity from which a word one question has and the other lacks still counts
+# as the same word ("penjualn" for "penjualan"), rather than a different item or measure
+SPELLING_SIMILARITY = 0.8
+
+
+def normalize_question(question: str) -> str:
+    """
+    Lowercase, strip punctuation and collapse whitespace, so trivially different
+    spellings of a question share one exact-match key.
+    """
+    text = unicodedata.normalize('NFKC', question).lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+
+def context_fingerprint(charts, interpretation: str, conversation=None) -> str:
+    """
+    Fingerprint of what the chatbot answers from: the charts shown, their interpretation
+    and the conversation so far, since a follow-up question depends on what came before it.
+
+    :param conversation: JSON-serializable state of the session's chat context, e.g.
+        ``ChatContext.state()``; None for a question without earlier turns. A conversation
+        id instead keys answers for questions repeated later in that conversation.
+    """
+    chart_ids = [chart.get('key') or chart.get('type') for chart in charts or []]
+    payload = json.dumps([chart_ids, interpretation or '', conversation or None], default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def answer_keys(charts, interpretation: str, chat_context) -> tuple:
+    """
+    Cache keys of a chatbot question: the full context, shared by every session that reaches
+    it, and the asking conversation, so a question repeated later in it is answered again.
+
+    Answers under the conversation key were given with fewer earlier turns in the prompt; a
+    repeat gets the earlier answer rather than one that also weighs the turns in between.
+    """
+    return (context_fingerprint(charts, interpretation, chat_context.state()),
+            context_fingerprint(charts, interpretation, ['conversation', chat_context.id]))
+
+
+def ngram_vector(text: str, size: int = NGRAM_SIZE, dimensions: int = NGRAM_DIMENSIONS) -> dict:
+    """
+    Sparse, L2-normalized vector of hashed character n-grams of ``text``.
+    """
+    padded = f' {text} '
+    counts = {}
+    for i in range(max(len(padded) - size + 1, 1)):
+        gram = padded[i:i + size]
+        bucket = int.from_bytes(hashlib.md5(gram.encode('utf-8')).digest()[:4], 'little') % dimensions
+        counts[bucket] = counts.get(bucket, 0) + 1
+    norm = math.sqrt(sum(count * count for count in counts.values())) or 1.0
+    return {bucket: count / norm for bucket, count in counts.items()}
+
+
+def polarity(text: str) -> frozenset:
+    return frozenset(word for word in text.split() if word in POLARITY_WORDS)
+
+
+def same_specifics(a: str, b: str) -> bool:
+    """
+    Whether two normalized questions name the same things.
+
+    Every word only one of them contains must be a stopword or a misspelling of a word only
+    the other contains. Numbers never count as misspellings, so "tahun 2023" is not
+    "tahun 2024", and neither is "produk A" "produk B" nor "paling tinggi" "paling rendah".
+    """
+    words_a, words_b = set(a.split()), set(b.split())
+    only_a, only_b = words_a - words_b - STOPWORDS, words_b - words_a - STOPWORDS
+    for words, others in ((only_a, only_b), (only_b, only_a)):
+        for word in words:
+            if any(ch.isdigit() for ch in word):
+                return False
+            if not any(difflib.SequenceMatcher(None, word, other).ratio() >= SPELLING_SIMILARITY
+                       for other in others):
+                return False
+    return True
+
+
+def cosine_similarity(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(bucket, 0.0) for bucket, value in a.items())
+
+
+class AnswerCache:
+    """
+    Chatbot answers keyed by normalized question and context fingerprint, with LRU and TTL eviction.
+
+    Answers can also be stored under a conversation key (see ``context_fingerprint``
+    with a conversation id): the full context key changes with every turn, so without it
+    a question repeated later in the same conversation would never hit.
+
+    With ``similarity_threshold`` set, a miss on the exact key falls back to a similarity
+    tier: the closest earlier question asked against the same context is reused if its
+    n-gram cosine similarity reaches the threshold, both contain the same POLARITY_WORDS
+    and they name the same things (see ``same_specifics``). The tier is off by default.
+    """
+
+    def __init__(self, ttl: float = ANSWER_TTL, max_entries: int = MAX_ANSWERS,
+                 similarity_threshold: float = SIMILARITY_THRESHOLD):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, question: str, context_key: str, conversation_key: str = None):
+        """
+        :param conversation_key: Key of the asking conversation, tried after ``context_key``.
+        :return: The cached answer, or None on a miss.
+        """
+        normalized = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            for key in (context_key, conversation_key):
+                entry = None if key is None else self._live_entry((key, normalized), now)
+                if entry is not None:
+                    self.exact_hits += 1
+                    return entry['answer']
+            if self.similarity_threshold is not None:
+                vector, words = ngram_vector(normalized), polarity(normalized)
+                best_key, best_score = None, self.similarity_threshold
+                for key, candidate in self._entries.items():
+                    if (key[0] != context_key or candidate['polarity'] != words
+                            or now - candidate['created_at'] >= self.ttl):
+                        continue
+                    score = cosine_similarity(vector, candidate['vector'])
+                    if score >= best_score and same_specifics(normalized, key[1]):
+                        best_key, best_score = key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.similar_hits += 1
+                    return self._entries[best_key]['answer']
+            self.misses += 1
+        return None
+
+    def set(self, question: str, context_key: str, answer: str, conversation_key: str = None):
+        normalized = normalize_question(question)
+        entry = {
+            'answer': answer,
+            'vector': ngram_vector(normalized),
+            'polarity': polarity(normalized),
+            'created_at': time.time(),
+        }
+        with self._lock:
+            for key in (context_key, conversation_key):
+                if key is not None:
+                    self._entries[(key, normalized)] = entry
+                    self._entries.move_to_end((key, normalized))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            total = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'exact_hits': self.exact_hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses,
+                'hit_rate': hits / total if total else 0.0,
+            }
+
+    def _live_entry(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry['created_at'] >= self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,231 @@
+"""
+Headless batch reports: charts and AI interpretations for every workbook in a directory.
+
+    python batch_report.py laporan_masuk/ laporan_keluar/ --workers 4
+
+Each workbook gets its own output directory holding one HTML (and optionally PNG) file
+per chart, one markdown file per business option and a combined ``laporan.md``. Work
+is resumable: finished options are skipped and finished workbooks are marked with a
+``.done`` file recording the hash of the workbook they were built from and the mode of
+the run. Output of a ``--charts-only`` run has no interpretations, so a later full run
+redoes it; a charts-only run reuses full output.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+# Name of the marker written once a workbook's report is complete
+DONE_MARKER = '.done'
+REPORT_NAME = 'laporan.md'
+# Report modes: 'full' interprets the charts, 'charts' (--charts-only) does not
+FULL, CHARTS_ONLY = 'full', 'charts'
+# Per-option markdown of each mode, and the modes whose output a run of each mode can reuse
+OPTION_FILES = {FULL: 'interpretasi.md', CHARTS_ONLY: 'grafik.md'}
+REUSABLE_MODES = {FULL: (FULL,), CHARTS_ONLY: (FULL, CHARTS_ONLY)}
+MODEL_NAME = 'gemini-1.5-flash'
+
+_model = None
+
+
+def safe_name(name: str) -> str:
+    return re.sub(r'[^\w.-]+', '_', name).strip('_') or 'tanpa_nama'
+
+
+def read_api_key():
+    """
+    Gemini API key from the environment or a ``.env`` file (API_KEY or GOOGLE_API_KEY).
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return os.environ.get('API_KEY') or os.environ.get('GOOGLE_API_KEY')
+
+
+def init_worker(api_key, workers):
+    """
+    Process pool initializer: configure Gemini once per worker process and give each
+    worker its share of the request rate.
+    """
+    global _model
+    if api_key is None:
+        return
+    import google.generativeai as genai
+
+    from llm_client import REQUESTS_PER_MINUTE, get_client, shared_limiter
+
+    genai.configure(api_key=api_key)
+    shared_limiter.rate = REQUESTS_PER_MINUTE / 60 / max(workers, 1)
+    _model = get_client(genai.GenerativeModel(model_name=MODEL_NAME))
+
+
+class _Upload(BytesIO):
+    """
+    In-memory stand-in for a Streamlit upload, so workbooks go through ``load_data``.
+    """
+
+    def __init__(self, content: bytes, name: str):
+        super().__init__(content)
+        self.name = name
+
+
+def is_done(out_dir: str, key: str, mode: str = FULL) -> bool:
+    """
+    Whether the workbook with content hash ``key`` was finished by a run this mode can reuse.
+
+    Markers without a mode predate it and may come from charts-only runs, so only a
+    charts-only run reuses them.
+    """
+    try:
+        with open(os.path.join(out_dir, DONE_MARKER), encoding='utf-8') as f:
+            marker = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return marker.get('key') == key and marker.get('mode', CHARTS_ONLY) in REUSABLE_MODES[mode]
+
+
+def existing_option(option_dir: str, mode: str):
+    """
+    :return: Path of an option's markdown this mode can reuse, or None.
+    """
+    for reusable in REUSABLE_MODES[mode]:
+        path = os.path.join(option_dir, OPTION_FILES[reusable])
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def write_text(path: str, text: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def report_option(sheet_name, df, option, option_dir, write_png):
+    """
+    Charts and interpretation of one business option; charts only when no model is configured.
+
+    :return: Tuple of the option's markdown and whether it is complete for the run's mode;
+        only complete options are saved to ``option_dir``, so a later run retries the others.
+    """
+    from chart_renderer import chart_renderer
+    from vis_interpret import CHART_ERROR_PREFIX, VISUALIZERS, chart_figure, visualize_sheet_charts
+
+    if _model is not None:
+        charts, interpretation = VISUALIZERS[sheet_name](df, option, _model, interactive=False)
+    else:
+        charts, interpretation = visualize_sheet_charts(sheet_name, df, option, interactive=False), None
+
+    os.makedirs(option_dir, exist_ok=True)
+    lines = [f"### {option}", ""]
+    for idx, chart in enumerate(charts, start=1):
+        figure = chart_figure(chart)
+        figure.write_html(os.path.join(option_dir, f'grafik_{idx}.html'), include_plotlyjs='cdn')
+        if write_png:
+            with open(os.path.join(option_dir, f'grafik_{idx}.png'), 'wb') as f:
+                f.write(chart_renderer.render(figure, chart.get('key')))
+            lines.append(f"![Grafik {idx}]({os.path.basename(option_dir)}/grafik_{idx}.png)")
+        else:
+            lines.append(f"[Grafik {idx}]({os.path.basename(option_dir)}/grafik_{idx}.html)")
+    if not charts:
+        lines.append("_Kolom yang dibutuhkan tidak ditemukan di sheet ini._")
+    if interpretation:
+        lines += ["", interpretation]
+    markdown = "\n".join(lines) + "\n"
+    complete = CHART_ERROR_PREFIX not in (interpretation or '')
+    if complete:
+        mode = FULL if _model is not None else CHARTS_ONLY
+        write_text(os.path.join(option_dir, OPTION_FILES[mode]), markdown)
+    return markdown, complete
+
+
+def process_workbook(path: str, output_dir: str, write_png: bool = False) -> dict:
+    """
+    Build the report of one workbook, skipping options already written by an earlier run
+    whose mode this run can reuse.
+
+    :return: Summary with the workbook path, status and number of options written.
+    """
+    from chart_registry import business_options
+    from data_loader import content_hash, load_data
+    from vis_interpret import VISUALIZERS
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    key = content_hash(content)
+    mode = FULL if _model is not None else CHARTS_ONLY
+    out_dir = os.path.join(output_dir, safe_name(os.path.splitext(os.path.basename(path))[0]))
+    if is_done(out_dir, key, mode):
+        return {'path': path, 'status': 'skipped', 'options': 0}
+
+    started = time.time()
+    # Without the snapshot store: batch runs must not copy every workbook into it, and
+    # concurrent workers pruning it would delete each other's snapshots in use
+    workbook = load_data(_Upload(content, os.path.basename(path)), store=None)
+    sections, written, complete = [f"# Laporan {os.path.basename(path)}", ""], 0, True
+    for sheet_name in workbook:
+        if sheet_name not in VISUALIZERS:
+            continue
+        sections += [f"## {sheet_name}", ""]
+        for option in business_options(sheet_name):
+            option_dir = os.path.join(out_dir, safe_name(f"{sheet_name}_{option}"))
+            existing = existing_option(option_dir, mode)
+            if existing is not None:
+                with open(existing, encoding='utf-8') as f:
+                    sections.append(f.read())
+                continue
+            markdown, option_complete = report_option(sheet_name, workbook[sheet_name], option, option_dir, write_png)
+            sections.append(markdown)
+            written += option_complete
+            complete = complete and option_complete
+
+    os.makedirs(out_dir, exist_ok=True)
+    write_text(os.path.join(out_dir, REPORT_NAME), "\n".join(sections))
+    if complete:
+        write_text(os.path.join(out_dir, DONE_MARKER), json.dumps({'key': key, 'mode': mode, 'finished_at': time.time()}))
+    return {'path': path, 'status': 'done' if complete else 'partial', 'options': written,
+            'seconds': round(time.time() - started, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat laporan grafik dan interpretasi AI untuk setiap file Excel.")
+    parser.add_argument('input_dir', help="Folder berisi file .xlsx")
+    parser.add_argument('output_dir', help="Folder tujuan laporan")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help="Jumlah proses paralel")
+    parser.add_argument('--png', action='store_true', help="Simpan juga grafik sebagai PNG")
+    parser.add_argument('--charts-only', action='store_true', help="Lewati interpretasi AI")
+    args = parser.parse_args(argv)
+
+    paths = sorted(glob.glob(os.path.join(args.input_dir, '*.xlsx')))
+    if not paths:
+        print(f"Tidak ada file .xlsx di {args.input_dir}", file=sys.stderr)
+        return 1
+    api_key = None if args.charts_only else read_api_key()
+    if api_key is None and not args.charts_only:
+        print("API_KEY tidak ditemukan di environment atau .env; gunakan --charts-only untuk grafik saja.", file=sys.stderr)
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(api_key, args.workers)) as executor:
+        futures = {executor.submit(process_workbook, path, args.output_dir, args.png): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"GAGAL  {futures[future]}: {e}", file=sys.stderr)
+                continue
+            print(f"{result['status'].upper():6} {result['path']} ({result['options']} opsi)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
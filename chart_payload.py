@@ -0,0 +1,81 @@
+import pandas as pd
+
+# Label used for rows folded together when a chart has too many categories
+OTHER_LABEL = 'Lainnya'
+# Largest number of rows sent to the model for one chart
+MAX_PAYLOAD_ROWS = 60
+# Number of categories kept before the rest are folded into OTHER_LABEL
+PAYLOAD_TOP_N = 20
+
+
+def fold_top_n(df, top_n: int = PAYLOAD_TOP_N, value_col: str = None, other_label: str = OTHER_LABEL,
+               measures=None):
+    """
+    Keep the ``top_n - 1`` largest rows of ``df`` and sum the rest into one ``other_label`` row.
+
+    :param df: Aggregated frame with label columns and numeric measure columns.
+    :param top_n: Maximum number of rows in the result, including the folded row.
+    :param value_col: Measure to rank by; defaults to the first measure.
+    :param measures: Measure columns, the only ones summed; defaults to every numeric column.
+        Numeric dimensions such as ages must be passed as non-measures to stay labels.
+    :return: Tuple of the folded frame and the number of rows folded away.
+    """
+    measures = _measures(df, measures)
+    if len(df) <= top_n or not measures:
+        return df, 0
+    value_col = value_col or measures[0]
+    ranked = df.sort_values(value_col, ascending=False)
+    kept, rest = ranked.iloc[:top_n - 1], ranked.iloc[top_n - 1:]
+
+    other = {col: rest[col].sum() for col in measures}
+    for col in df.columns:
+        if col not in other:
+            other[col] = other_label
+    # Label columns may be categorical or numeric (e.g. 'Harga Produk'), so fold into strings
+    kept = kept.astype({col: str for col in df.columns if col not in measures})
+    folded = pd.concat([kept, pd.DataFrame([other], columns=df.columns)], ignore_index=True)
+    return folded, len(rest)
+
+
+def _measures(df, measures):
+    if measures is None:
+        return [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+    return [col for col in measures if col in df.columns and pd.api.types.is_numeric_dtype(df[col])]
+
+
+def serialize_chart_data(df, max_rows: int = MAX_PAYLOAD_ROWS, top_n: int = PAYLOAD_TOP_N, measures=None) -> str:
+    """
+    Compact CSV rendering of the aggregated data behind a chart for the model prompt.
+
+    Time series longer than ``max_rows`` are sampled at even intervals; categorical
+    data is reduced to the top ``top_n`` rows plus a folded ``Lainnya`` row. A summary
+    of every measure over the full data is appended so totals stay exact.
+
+    :param df: Aggregated chart data.
+    :param measures: Measure columns (see ``chart_registry.measure_columns``); defaults to
+        every numeric column.
+    :return: Text payload.
+    """
+    notes = []
+    payload = df
+    first_col = df.columns[0] if len(df.columns) else None
+    if first_col is not None and pd.api.types.is_datetime64_any_dtype(df[first_col]):
+        if len(df) > max_rows:
+            step = -(-len(df) // max_rows)
+            payload = df.sort_values(first_col).iloc[::step]
+            notes.append(f"{len(df)} baris diambil sampelnya setiap {step} baris.")
+    else:
+        payload, folded = fold_top_n(df, top_n, measures=measures)
+        if folded:
+            notes.append(f"{folded} baris dengan nilai terkecil digabung menjadi '{OTHER_LABEL}'.")
+        if len(payload) > max_rows:
+            notes.append(f"Hanya {max_rows} dari {len(payload)} baris yang ditampilkan.")
+            payload = payload.iloc[:max_rows]
+
+    lines = [payload.to_csv(index=False, float_format='%.2f', date_format='%Y-%m-%d').strip()]
+    numeric = df[_measures(df, measures)]
+    if not numeric.empty:
+        summary = numeric.agg(['sum', 'mean', 'min', 'max']).round(2)
+        lines.append("Ringkasan seluruh data:\n" + summary.to_csv(float_format='%.2f').strip())
+    lines.extend(notes)
+    return "\n".join(lines)
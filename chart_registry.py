@@ -0,0 +1,248 @@
+from functools import lru_cache
+
+from aggregate_cube import COUNT_AGGREGATIONS, dimension_columns
+
+# Sheets the dashboard knows, in sidebar order: whether their rows can be filtered by
+# date and sorted before charting, and the business-info options offered for them
+SHEETS = {
+    'Pelanggan': {
+        'filters': True,
+        'options': [
+            'Analisis demografi pelanggan',
+            'Distribusi usia dan jenis kelamin pelanggan',
+            'Segmentasi pelanggan berdasarkan preferensi',
+        ],
+    },
+    'Produk': {
+        'filters': True,
+        'options': [
+            'Kinerja penjualan produk dan stok',
+            'Distribusi penjualan berdasarkan kategori produk',
+            'Analisis harga produk dan trend penjualan',
+        ],
+    },
+    'Transaksi Penjualan': {
+        'filters': True,
+        'options': [
+            'Jumlah penjualan, pendapatan, dan metode pembayaran',
+            'Tren penjualan',
+            'Analisis status penjualan dan metode pembayaran',
+        ],
+    },
+    'Lokasi Penjualan': {
+        'filters': False,
+        'options': [
+            'Kinerja penjualan di berbagai lokasi',
+            'Distribusi penjualan berdasarkan kota/provinsi',
+            'Analisis lokasi dengan penjualan tertinggi/rendah',
+        ],
+    },
+    'Staf Penjualan': {
+        'filters': False,
+        'options': [
+            'Kinerja dan komisi staf penjualan',
+            'Analisis penilaian kinerja staf',
+            'Distribusi staf berdasarkan posisi/jabatan',
+        ],
+    },
+    'Inventaris': {
+        'filters': False,
+        'options': [
+            'Manajemen stok produk',
+            'Tren stok masuk dan keluar',
+            'Analisis produk dengan stok terbanyak/terkecil',
+        ],
+    },
+    'Promosi dan Pemasaran': {
+        'filters': False,
+        'options': [
+            'Efektivitas kampanye promosi',
+            'Distribusi penjualan berdasarkan media promosi',
+            'Analisis kode diskon promosi',
+        ],
+    },
+    'Feedback dan Pengembalian': {
+        'filters': False,
+        'options': [
+            'Masalah dan kepuasan pelanggan',
+            'Distribusi alasan pengembalian produk',
+            'Status pengembalian produk',
+        ],
+    },
+    'Analisis Penjualan': {
+        'filters': False,
+        'options': [
+            'Penjualan agregat dan tren',
+            'Analisis penjualan berdasarkan produk/kategori',
+            'Tren penjualan/tahunan',
+        ],
+    },
+    'Lainnya': {
+        'filters': False,
+        'options': [
+            'Analisis tambahan dan faktor eksternal',
+            'Tren penjualan berdasarkan faktor ekonomi',
+            'Distribusi biaya operasional terkait penjualan',
+        ],
+    },
+}
+
+
+def chart_spec(sheet, option, kind, rollup, figure, columns=None, name=None):
+    """
+    Declare one chart.
+
+    :param sheet: Sheet the chart is drawn from.
+    :param option: Business-info option that shows it.
+    :param kind: Plotly Express function name: 'bar', 'pie', 'line', 'histogram' or 'sunburst'.
+    :param rollup: ``(dims, measure, how)`` aggregation served by the sheet's aggregate cube.
+    :param figure: Keyword arguments for the Plotly Express function.
+    :param columns: Columns the sheet must have; defaults to those the rollup reads.
+    :param name: Column name of row counts for counting rollups.
+    """
+    dims, measure, how = rollup
+    measures = [] if measure is None else [measure] if isinstance(measure, str) else list(measure)
+    return {
+        'sheet': sheet,
+        'option': option,
+        'kind': kind,
+        'rollup': rollup,
+        'name': name,
+        'figure': figure,
+        'columns': tuple(columns or dimension_columns(dims) + measures),
+    }
+
+
+def _bar(sheet, option, x, y, how='sum'):
+    return chart_spec(sheet, option, 'bar', (x, y, how), {'x': x, 'y': y, 'labels': {x: x, y: y}})
+
+
+def _pie(sheet, option, names, values, how='sum', name=None):
+    measure = None if how in ('count', 'size') else values
+    return chart_spec(sheet, option, 'pie', (names, measure, how), {'names': names, 'values': values}, name=name)
+
+
+def _line(sheet, option, x, y, columns=None):
+    return chart_spec(sheet, option, 'line', (x, y, 'sum'), {'x': x, 'y': y, 'labels': {x: x, y: y}}, columns=columns)
+
+
+CHART_SPECS = [
+    chart_spec('Pelanggan', 'Analisis demografi pelanggan', 'bar',
+               ('Jenis Kelamin Pelanggan', None, 'count'),
+               {'x': 'Jenis Kelamin Pelanggan', 'y': 'Jumlah',
+                'labels': {'Jenis Kelamin Pelanggan': 'Jenis Kelamin Pelanggan', 'Jumlah': 'Jumlah'}},
+               name='Jumlah'),
+    chart_spec('Pelanggan', 'Analisis demografi pelanggan', 'bar',
+               ('Umur Pelanggan', None, 'count'),
+               {'x': 'Umur Pelanggan', 'y': 'Jumlah', 'labels': {'Umur Pelanggan': 'Umur Pelanggan', 'Jumlah': 'Jumlah'}},
+               name='Jumlah'),
+    _pie('Pelanggan', 'Analisis demografi pelanggan', 'Segmentasi Pelanggan', 'Jumlah', how='count', name='Jumlah'),
+    chart_spec('Pelanggan', 'Distribusi usia dan jenis kelamin pelanggan', 'histogram',
+               (['Umur Pelanggan', 'Jenis Kelamin Pelanggan'], None, 'size'),
+               {'x': 'Umur Pelanggan', 'y': 'Jumlah', 'color': 'Jenis Kelamin Pelanggan', 'barmode': 'group'},
+               name='Jumlah'),
+    chart_spec('Pelanggan', 'Segmentasi pelanggan berdasarkan preferensi', 'sunburst',
+               (['Preferensi Pembelian', 'Segmentasi Pelanggan'], None, 'size'),
+               {'path': ['Preferensi Pembelian', 'Segmentasi Pelanggan'], 'values': 'Jumlah'},
+               name='Jumlah'),
+
+    _bar('Produk', 'Kinerja penjualan produk dan stok', 'Produk', 'Jumlah Terjual'),
+    _pie('Produk', 'Distribusi penjualan berdasarkan kategori produk', 'Kategori Produk', 'Jumlah Terjual'),
+    chart_spec('Produk', 'Analisis harga produk dan trend penjualan', 'line',
+               (['Tanggal', 'Harga Produk'], 'Jumlah Terjual', 'sum'),
+               {'x': 'Tanggal', 'y': 'Jumlah Terjual', 'color': 'Harga Produk',
+                'labels': {'Tanggal': 'Tanggal', 'Jumlah Terjual': 'Jumlah Terjual', 'Harga Produk': 'Harga Produk'}}),
+
+    _bar('Transaksi Penjualan', 'Jumlah penjualan, pendapatan, dan metode pembayaran', 'Metode Pembayaran', 'Pendapatan'),
+    _line('Transaksi Penjualan', 'Tren penjualan', 'Tanggal', 'Pendapatan'),
+    # Not offered in the sidebar, only reachable by calling the visualizer directly
+    chart_spec('Transaksi Penjualan', 'Penjualan berdasarkan channel dan produk', 'histogram',
+               (['Channel Penjualan', 'Produk'], 'Jumlah Terjual', 'sum'),
+               {'x': 'Channel Penjualan', 'y': 'Jumlah Terjual', 'color': 'Produk', 'barmode': 'group',
+                'labels': {'Channel Penjualan': 'Channel Penjualan', 'Jumlah Terjual': 'Jumlah Terjual'}}),
+
+    _bar('Lokasi Penjualan', 'Kinerja penjualan di berbagai lokasi', 'Lokasi', 'Jumlah Terjual'),
+    _pie('Lokasi Penjualan', 'Distribusi penjualan berdasarkan kota/provinsi', 'Kota/Provinsi', 'Jumlah Terjual'),
+    _bar('Lokasi Penjualan', 'Analisis lokasi dengan penjualan tertinggi/rendah', 'Lokasi', 'Jumlah Terjual'),
+
+    _bar('Staf Penjualan', 'Kinerja dan komisi staf penjualan', 'Staf', 'Komisi'),
+    _bar('Staf Penjualan', 'Analisis penilaian kinerja staf', 'Staf', 'Penilaian Kinerja', how='mean'),
+    chart_spec('Staf Penjualan', 'Distribusi staf berdasarkan posisi/jabatan', 'pie',
+               ('Posisi/Jabatan', None, 'count'),
+               {'names': 'Posisi/Jabatan', 'values': 'Jumlah Staf'},
+               columns=['Posisi/Jabatan', 'Staf'], name='Jumlah Staf'),
+
+    _bar('Inventaris', 'Manajemen stok produk', 'Produk', 'Stok'),
+    chart_spec('Inventaris', 'Tren stok masuk dan keluar', 'line',
+               ('Tanggal', ['Stok Masuk', 'Stok Keluar'], 'sum'),
+               {'x': 'Tanggal', 'y': ['Stok Masuk', 'Stok Keluar'], 'labels': {'Tanggal': 'Tanggal', 'value': 'Jumlah'}}),
+    _bar('Inventaris', 'Analisis produk dengan stok terbanyak/terkecil', 'Produk', 'Stok'),
+
+    _bar('Promosi dan Pemasaran', 'Efektivitas kampanye promosi', 'Kampanye Promosi', 'Jumlah Terjual'),
+    _pie('Promosi dan Pemasaran', 'Distribusi penjualan berdasarkan media promosi', 'Media Promosi', 'Jumlah Terjual'),
+    _bar('Promosi dan Pemasaran', 'Analisis kode diskon promosi', 'Kode Diskon', 'Jumlah Terjual'),
+
+    _bar('Feedback dan Pengembalian', 'Masalah dan kepuasan pelanggan', 'Masalah Pelanggan', 'Kepuasan Pelanggan', how='mean'),
+    _pie('Feedback dan Pengembalian', 'Distribusi alasan pengembalian produk', 'Alasan Pengembalian', 'Jumlah',
+         how='count', name='Jumlah'),
+    _pie('Feedback dan Pengembalian', 'Status pengembalian produk', 'Status Pengembalian', 'Jumlah',
+         how='count', name='Jumlah'),
+
+    _line('Analisis Penjualan', 'Penjualan agregat dan tren', 'Tanggal', 'Pendapatan'),
+    _bar('Analisis Penjualan', 'Analisis penjualan berdasarkan produk/kategori', 'Produk', 'Pendapatan'),
+    _line('Analisis Penjualan', 'Tren penjualan/tahunan', 'Tahun', 'Pendapatan'),
+
+    _bar('Lainnya', 'Analisis tambahan dan faktor eksternal', 'Faktor Eksternal', 'Pendapatan'),
+]
+
+# Resolved once at import: chart specs by (sheet, option) and by sheet
+CHARTS_BY_OPTION = {}
+CHARTS_BY_SHEET = {}
+for _spec in CHART_SPECS:
+    CHARTS_BY_OPTION.setdefault((_spec['sheet'], _spec['option']), []).append(_spec)
+    CHARTS_BY_SHEET.setdefault(_spec['sheet'], []).append(_spec)
+
+
+# Function to get business info options based on selected sheet
+def business_options(sheet_name):
+    return list(SHEETS.get(sheet_name, {}).get('options', []))
+
+
+def sheet_has_filters(sheet_name):
+    return SHEETS.get(sheet_name, {}).get('filters', False)
+
+
+@lru_cache(maxsize=256)
+def valid_chart_specs(sheet_name, option, columns):
+    """
+    Chart specs of an option whose required columns are all present, checked once per column set.
+
+    :param columns: Tuple of the sheet's column names.
+    """
+    available = set(columns)
+    return tuple(spec for spec in CHARTS_BY_OPTION.get((sheet_name, option), [])
+                 if all(col in available for col in spec['columns']))
+
+
+def measure_columns(spec) -> list:
+    """
+    Columns of a chart's aggregated data holding measures; the rest are dimensions, even
+    when numeric (e.g. 'Umur Pelanggan').
+    """
+    _, measure, how = spec['rollup']
+    if how in COUNT_AGGREGATIONS:
+        return [spec['name'] or 'Jumlah']
+    return [measure] if isinstance(measure, str) else list(measure)
+
+
+@lru_cache(maxsize=256)
+def sheet_rollups(sheet_name, columns):
+    """
+    Rollups behind every chart of a sheet that its columns allow, for precomputing the cube.
+    """
+    available = set(columns)
+    rollups = []
+    for spec in CHARTS_BY_SHEET.get(sheet_name, []):
+        if all(col in available for col in spec['columns']) and spec['rollup'] not in rollups:
+            rollups.append(spec['rollup'])
+    return tuple(rollups)
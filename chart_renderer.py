@@ -0,0 +1,95 @@
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+# Number of rendered PNGs kept in memory, shared by all sessions
+RENDER_CACHE_SIZE = 64
+
+
+class ChartRenderer:
+    """
+    Long-lived kaleido renderer with a content-addressed cache of PNG bytes.
+
+    Figures are keyed by a hash of their JSON, so an identical chart is rasterized
+    once per process. Exports are serialized through one lock because the kaleido
+    browser process is shared.
+    """
+
+    def __init__(self, max_entries: int = RENDER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._started = False
+
+    def render(self, fig, key: str = None) -> bytes:
+        """
+        :return: PNG bytes of ``fig``.
+        """
+        return self.render_many([fig], None if key is None else [key])[0]
+
+    def render_many(self, figs, keys=None) -> list:
+        """
+        Render several figures in a single pass through the renderer.
+
+        Cached and duplicate figures are rendered only once.
+
+        :param keys: Precomputed figure keys (e.g. from figure_cache), saving a JSON
+            serialization per figure; hashed from the figure when omitted.
+        :return: PNG bytes for each figure, in order.
+        """
+        keys = list(keys) if keys is not None else [self.figure_key(fig) for fig in figs]
+        images = {}
+        with self._lock:
+            for key in keys:
+                if key in self._images:
+                    self._images.move_to_end(key)
+                    images[key] = self._images[key]
+                    self.hits += 1
+
+        missing = {key: fig for key, fig in zip(keys, figs) if key not in images}
+        if missing:
+            with self._render_lock:
+                self._ensure_started()
+                for key, fig in missing.items():
+                    images[key] = pio.to_image(fig, format='png')
+            with self._lock:
+                self.misses += len(missing)
+                for key in missing:
+                    self._images[key] = images[key]
+                    self._images.move_to_end(key)
+                while len(self._images) > self.max_entries:
+                    self._images.popitem(last=False)
+        return [images[key] for key in keys]
+
+    @staticmethod
+    def figure_key(fig) -> str:
+        return hashlib.sha256(fig.to_json().encode('utf-8')).hexdigest()
+
+    def _ensure_started(self):
+        # kaleido >= 1.0 launches a browser for every export unless a sync server is
+        # running; older kaleido keeps its Chromium subprocess alive after the first export
+        if self._started:
+            return
+        self._started = True
+        try:
+            import kaleido
+        except ImportError:
+            return
+        start_server = getattr(kaleido, 'start_sync_server', None)
+        stop_server = getattr(kaleido, 'stop_sync_server', None)
+        if start_server is not None:
+            try:
+                start_server()
+            except Exception:
+                return
+            if stop_server is not None:
+                atexit.register(stop_server)
+
+
+chart_renderer = ChartRenderer()
@@ -0,0 +1,180 @@
+import os
+import re
+import uuid
+from functools import lru_cache
+
+# Rough size of a Gemini token in characters, used for budgeting without a tokenizer call
+CHARS_PER_TOKEN = 4
+# Token budget of everything sent with one chatbot question, besides the system prompt
+CHAT_CONTEXT_BUDGET = int(os.environ.get('CHAT_CONTEXT_BUDGET', '3000'))
+# Most recent question/answer pairs sent verbatim; older ones are folded into the summary
+RECENT_TURNS = 3
+# Token budget of the rolling summary of older turns
+SUMMARY_BUDGET = 400
+# Messages kept in the visible chat history; older ones only survive in the summary
+MAX_HISTORY_MESSAGES = 40
+
+# Persona and answering rules, sent once per model as its system instruction instead of
+# being prepended to every question
+SYSTEM_PROMPT = (
+    "Bertindaklah sebagai data dan business analyst profesional. Tugas kamu adalah menjawab pertanyaan dari pelaku UMKM seputar bisnis UMKM mereka. "
+    "Jawablah sesuai dengan pertanyaan pelaku UMKM. Kamu menjawab berdasarkan visualisasi chart dan interpretasi yang telah kamu buat sendiri. "
+    "Jawab dengan gaya bahasa yang sama dari interpretasi yang kamu buat sendiri tersebut. "
+    "Gunakan bahasa yang santai, mudah dipahami, friendly untuk pemula hingga ahli, dan tetap berfokus pada konteks bisnis. "
+    "Selalu panggil user dengan 'Kamu', gunakan bahasa yang energik, menarik, dan tidak membosankan. "
+    "Interpretasikan secara spesifik dan mendalam dalam konteks bisnis yang sesuai dan berikan rekomendasi yang dapat membantu bisnis untuk berkembang. "
+    "Jelaskan data dengan detail, sampaikan informasi yang bermanfaat kepada pelaku UMKM. "
+    "Tekankan kalimat atau kata yang penting dengan **bold**, _italic_, atau __underline__ sesuai kebutuhan. Buatkan poin-poin atau tabel jika perlu."
+)
+
+# Common Indonesian words ignored when matching a question against interpretation sections
+STOPWORDS = frozenset(
+    'yang dan di ke dari untuk dengan pada ini itu apa apakah bagaimana kenapa mengapa mana '
+    'adalah ada atau juga saya kamu aku kita kami bisa tidak lebih paling sangat akan sudah '
+    'dalam oleh agar jika karena saja nya lah kah tolong berapa siapa kapan'.split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(' ', 1)[0] + '…'
+
+
+def keywords(text: str) -> frozenset:
+    words = re.findall(r'\w+', text.lower())
+    return frozenset(word for word in words if len(word) > 2 and word not in STOPWORDS)
+
+
+@lru_cache(maxsize=32)
+def interpretation_sections(interpretation: str) -> tuple:
+    """
+    Split an interpretation into paragraphs with their keywords, once per interpretation.
+
+    :return: Tuple of ``(text, keywords)`` pairs in their original order.
+    """
+    sections = [section.strip() for section in re.split(r'\n\s*\n', interpretation or '')]
+    return tuple((section, keywords(section)) for section in sections if section)
+
+
+def select_sections(question: str, interpretation: str, max_tokens: int) -> list:
+    """
+    Interpretation paragraphs most relevant to a question that fit in ``max_tokens``.
+
+    Paragraphs are ranked by how many of the question's keywords they share, ties going
+    to the earlier paragraph; the chosen ones are returned in their original order.
+    """
+    sections = interpretation_sections(interpretation)
+    question_words = keywords(question)
+    ranked = sorted(range(len(sections)), key=lambda idx: (-len(sections[idx][1] & question_words), idx))
+    chosen, used = [], 0
+    for idx in ranked:
+        cost = estimate_tokens(sections[idx][0])
+        if used + cost > max_tokens:
+            if not chosen:
+                chosen.append((idx, truncate_to_tokens(sections[idx][0], max_tokens)))
+            continue
+        chosen.append((idx, sections[idx][0]))
+        used += cost
+    return [text for _, text in sorted(chosen)]
+
+
+def summarize_turn(question: str, answer: str) -> str:
+    """
+    One summary line of a question/answer pair: the question and the answer's first sentence.
+    """
+    first_sentence = re.split(r'(?<=[.!?])\s', answer.strip().replace('\n', ' '), maxsplit=1)[0]
+    return f"- Pertanyaan: {truncate_to_tokens(question, 40)} → {truncate_to_tokens(first_sentence, 60)}"
+
+
+class ChatContext:
+    """
+    Per-session chatbot context held within a token budget.
+
+    The latest RECENT_TURNS exchanges are kept verbatim; older ones are folded into a
+    rolling summary whose oldest lines are dropped once it outgrows SUMMARY_BUDGET. The
+    remaining budget goes to the interpretation paragraphs most relevant to the question,
+    so the prompt size stays flat however long the conversation gets.
+
+    :param budget: Token budget of one prompt, excluding the system prompt.
+    """
+
+    def __init__(self, budget: int = CHAT_CONTEXT_BUDGET, recent_turns: int = RECENT_TURNS):
+        self.budget = budget
+        self.recent_turns = recent_turns
+        # Identifies the conversation for caching answers to questions repeated within it
+        self.id = uuid.uuid4().hex
+        self.summary_lines = []
+        self.turns = []
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+    def record(self, question: str, answer: str):
+        """
+        Add an answered question, rolling the oldest verbatim turn into the summary.
+        """
+        self.turns.append((question, answer))
+        while len(self.turns) > self.recent_turns:
+            self.summary_lines.append(summarize_turn(*self.turns.pop(0)))
+        while self.summary_lines and estimate_tokens(self.summary) > SUMMARY_BUDGET:
+            self.summary_lines.pop(0)
+
+    def state(self):
+        """
+        What earlier turns contribute to the next prompt, for keying cached answers;
+        None before the first turn.
+        """
+        if not self.summary_lines and not self.turns:
+            return None
+        return [self.summary_lines, self.turns]
+
+    def reset(self):
+        self.id = uuid.uuid4().hex
+        self.summary_lines = []
+        self.turns = []
+
+    def build_prompt(self, question: str, charts, interpretation: str) -> str:
+        """
+        Prompt for one question: chart list, relevant interpretation, summary and recent turns.
+        """
+        prompt = (
+            f"Pertanyaan: {question}\n"
+            f"Jawab dalam konteks bisnis, berdasarkan hasil visualisasi dan interpretasi yang telah kamu buat sendiri.\n\n"
+            f"**Ini adalah hasil Visualisasi dan Interpretasi yang sudah kamu buat sendiri sebelumnya:**\n"
+        )
+        if charts:
+            prompt += "Berikut adalah visualisasi yang telah ditampilkan:\n"
+            for idx, chart in enumerate(charts):
+                prompt += f"Visualisasi {idx + 1}: {chart.get('description') or chart.get('type', 'Tidak ada deskripsi')}\n"
+
+        history = ""
+        if self.summary_lines:
+            history += f"\nRingkasan percakapan sebelumnya:\n{self.summary}\n"
+        if self.turns:
+            history += "\nPercakapan terakhir:\n"
+            history += "".join(f"Pengguna: {q}\nKamu: {a}\n" for q, a in self.turns)
+        remaining = self.budget - estimate_tokens(prompt) - estimate_tokens(history)
+        if remaining < self.budget // 4 and self.turns:
+            # Long recent answers must not crowd out the interpretation; keep the latest part
+            max_chars = max(self.budget // 4, 1) * CHARS_PER_TOKEN
+            history = '…' + history[-max_chars:]
+            remaining = self.budget - estimate_tokens(prompt) - estimate_tokens(history)
+
+        sections = select_sections(question, interpretation, max(remaining, 1)) if interpretation else []
+        if sections:
+            prompt += "\nInterpretasi sebelumnya (bagian yang relevan):\n" + "\n\n".join(sections) + "\n"
+        return prompt + history
+
+
+def trim_history(chat_history: list, max_messages: int = MAX_HISTORY_MESSAGES) -> list:
+    """
+    Drop the oldest messages of a chat history in place, keeping at most ``max_messages``.
+    """
+    if len(chat_history) > max_messages:
+        del chat_history[:len(chat_history) - max_messages]
+    return chat_history
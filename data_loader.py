@@ -0,0 +1,229 @@
+import hashlib
+import threading
+from collections.abc import Mapping
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from sheet_schema import apply_schema, compact_frame, infer_schema
+from snapshot_store import snapshot_store
+from state_management import shared_state
+from time_index import DATE_FILTER_COLUMN, time_index_cache
+
+# Maximum number of parsed workbooks kept in memory, shared by all sessions
+WORKBOOK_CACHE_SIZE = 8
+
+
+class LazyWorkbook(Mapping):
+    """
+    Read-only mapping of sheet name to DataFrame that parses each sheet on first access.
+
+    Only the sheet names are read up front (openpyxl read-only mode); a sheet is
+    parsed the first time ``workbook[sheet]`` is used and the frame is kept. When a
+    snapshot store is given, sheets are memory-mapped from their columnar snapshot
+    if one exists and snapshotted after the first parse otherwise. ``on_grow`` is called
+    after each parse, so a cache holding the workbook can re-measure it.
+    """
+
+    def __init__(self, content: bytes, key: str = None, store=None, sheet_names=None, on_access=None,
+                 on_grow=None):
+        self.key = key
+        self.schemas = {}
+        self.memory_report = {}
+        self._content = content
+        self._store = store
+        self._on_access = on_access
+        self._on_grow = on_grow
+        self._frames = {}
+        self._lock = threading.Lock()
+        self._sheet_locks = {}
+        if sheet_names is None:
+            book = load_workbook(BytesIO(content), read_only=True)
+            try:
+                sheet_names = list(book.sheetnames)
+            finally:
+                book.close()
+        self._sheet_names = list(sheet_names)
+
+    def __getitem__(self, sheet_name):
+        if sheet_name not in self._sheet_names:
+            raise KeyError(sheet_name)
+        frame = self._frames.get(sheet_name)
+        if frame is not None:
+            self._record(sheet_name, 'hits')
+            return frame
+
+        with self._lock:
+            sheet_lock = self._sheet_locks.setdefault(sheet_name, threading.Lock())
+        with sheet_lock:
+            frame = self._frames.get(sheet_name)
+            if frame is None:
+                frame = self._parse(sheet_name)
+                self._frames[sheet_name] = frame
+                self._record(sheet_name, 'misses')
+                if self._on_grow is not None:
+                    self._on_grow()
+            else:
+                self._record(sheet_name, 'hits')
+        return frame
+
+    def __iter__(self):
+        return iter(self._sheet_names)
+
+    def __len__(self):
+        return len(self._sheet_names)
+
+    def is_loaded(self, sheet_name: str) -> bool:
+        return sheet_name in self._frames
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate footprint: the raw xlsx plus every sheet parsed so far.
+        """
+        return len(self._content) + sum(report['after'] for report in list(self.memory_report.values()))
+
+    def _parse(self, sheet_name):
+        frame = None
+        if self._store is not None:
+            frame = self._store.load_sheet(self.key, sheet_name)
+        from_snapshot = frame is not None
+        if from_snapshot:
+            self.schemas[sheet_name] = infer_schema(frame)
+        else:
+            # Types are inferred once per upload; snapshots are stored typed and compacted
+            frame = pd.read_excel(BytesIO(self._content), sheet_name=sheet_name)
+            self.schemas[sheet_name] = infer_schema(frame)
+            frame = apply_schema(frame, self.schemas[sheet_name])
+        frame, self.memory_report[sheet_name] = compact_frame(frame, self.schemas[sheet_name])
+        if not from_snapshot and self._store is not None:
+            self._store.save_sheet(self.key, sheet_name, frame)
+        # Lets per-sheet caches (aggregates, ...) recognise frames of this upload; views of
+        # the frame inherit it and only add a suffix when their rows differ
+        if self.key is not None:
+            frame.attrs['sheet_key'] = f"{self.key}:{sheet_name}"
+            if DATE_FILTER_COLUMN in frame.columns:
+                time_index_cache.get(frame, DATE_FILTER_COLUMN)
+        return frame
+
+    def _record(self, sheet_name, outcome):
+        if self._on_access is not None:
+            self._on_access(sheet_name, outcome)
+
+
+class WorkbookCache:
+    """
+    Process-wide cache of parsed workbooks keyed by a hash of the uploaded bytes.
+
+    Streamlit re-executes the app script on every interaction, but imported modules
+    stay loaded, so workbooks kept in the ``'workbooks'`` namespace of the shared
+    state store survive reruns and are shared by sessions: identical uploads are
+    parsed once.
+    """
+
+    namespace = 'workbooks'
+
+    def __init__(self, max_entries: int = WORKBOOK_CACHE_SIZE, store=shared_state):
+        self.max_entries = max_entries
+        self.sheet_stats = {}
+        self._store = store
+        self._store.set_limit(self.namespace, max_entries)
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: str, loader):
+        """
+        Return the workbook cached under ``key``, calling ``loader`` to parse it on a miss.
+
+        Concurrent misses for the same key wait for a single parse.
+
+        :param key: Content hash of the uploaded file.
+        :param loader: Callable returning a mapping of sheet name to DataFrame.
+        :return: The cached workbook.
+        """
+        return self._store.get_or_create(self.namespace, key, loader)
+
+    def resize(self, key: str):
+        """
+        Re-measure a cached workbook after it parsed another sheet.
+        """
+        self._store.resize(self.namespace, key)
+
+    def stats(self) -> dict:
+        """
+        Per-sheet hit/miss counters, e.g. ``{'Produk': {'hits': 3, 'misses': 1}}``.
+        """
+        with self._lock:
+            return {sheet: dict(counts) for sheet, counts in self.sheet_stats.items()}
+
+    def record_sheet(self, sheet_name: str, outcome: str):
+        """
+        Count a sheet access as one of ``'hits'`` (frame already parsed) or ``'misses'``.
+        """
+        with self._lock:
+            counts = self.sheet_stats.setdefault(sheet_name, {'hits': 0, 'misses': 0})
+            counts[outcome] += 1
+
+    def clear(self):
+        self._store.clear(self.namespace)
+        with self._lock:
+            self.sheet_stats.clear()
+
+
+workbook_cache = WorkbookCache()
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def data_fingerprint(df) -> str:
+    """
+    Stable hash of a DataFrame's column names, dtypes and values.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _open_uploaded(key, content, filename, store=snapshot_store):
+    if store is not None and store.has(key):
+        sheet_names = store.read_manifest(key)['sheet_names']
+        store.touch(key)
+    else:
+        sheet_names = None
+    workbook = LazyWorkbook(content, key=key, store=store, sheet_names=sheet_names,
+                            on_access=workbook_cache.record_sheet, on_grow=lambda: workbook_cache.resize(key))
+    if store is not None and sheet_names is None:
+        store.save_source(key, content, filename, list(workbook))
+    return workbook
+
+
+def _open_snapshot(key):
+    manifest = snapshot_store.read_manifest(key)
+    snapshot_store.touch(key)
+    return LazyWorkbook(snapshot_store.read_source(key), key=key, store=snapshot_store,
+                        sheet_names=manifest['sheet_names'], on_access=workbook_cache.record_sheet,
+                        on_grow=lambda: workbook_cache.resize(key))
+
+
+# Function to load data from the uploaded file; sheets are parsed lazily on first access.
+# With store=None nothing is written to the snapshot store (e.g. one-off batch runs)
+def load_data(uploaded_file, store=snapshot_store):
+    if uploaded_file is not None:
+        content = uploaded_file.getvalue()
+        key = content_hash(content)
+        return workbook_cache.get_or_load(
+            key,
+            lambda: _open_uploaded(key, content, getattr(uploaded_file, 'name', 'workbook.xlsx'), store)
+        )
+    else:
+        return None
+
+
+# Function to reopen a previously uploaded workbook from the snapshot store
+def load_recent(key):
+    if key and snapshot_store.has(key):
+        return workbook_cache.get_or_load(key, lambda: _open_snapshot(key))
+    else:
+        return None
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+from chart_payload import OTHER_LABEL
+
+# Most points drawn per series of a time-series chart
+MAX_POINTS = 2000
+# Most categories drawn on a categorical axis, including the folded OTHER_LABEL
+MAX_CATEGORIES = 30
+# Most series (distinct colors) drawn in one chart, including the folded OTHER_LABEL
+MAX_SERIES = 10
+# Granularities tried, finest first, when a time series has too many points
+RESAMPLE_RULES = [('D', 'harian'), ('W', 'mingguan'), ('MS', 'bulanan')]
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: positions of ``n_out`` points preserving the shape of y(x).
+
+    :param x: Sorted numeric x values.
+    :param y: Numeric y values.
+    :return: Sorted integer positions, always including the first and last point.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = [0]
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        prev = selected[-1]
+        areas = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev])
+                       - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        selected.append(start if np.isnan(areas).all() else start + int(np.nanargmax(areas)))
+    selected.append(n - 1)
+    return np.unique(selected)
+
+
+def minmax_indices(values, n_buckets):
+    """
+    Positions of the minimum and maximum of each of ``n_buckets`` equal-width buckets.
+
+    :param values: 2-D array (rows x series); every series keeps its extremes.
+    """
+    n = len(values)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    values = np.asarray(values, dtype='float64').reshape(n, -1)
+    selected = {0, n - 1}
+    for bucket in np.array_split(np.arange(n), n_buckets):
+        chunk = values[bucket]
+        for col in range(chunk.shape[1]):
+            if not np.isnan(chunk[:, col]).all():
+                selected.add(int(bucket[np.nanargmin(chunk[:, col])]))
+                selected.add(int(bucket[np.nanargmax(chunk[:, col])]))
+    return np.array(sorted(selected))
+
+
+def fold_column(df, col, other_dims, value_cols, top_n, agg='sum', other_label=OTHER_LABEL):
+    """
+    Keep the ``top_n - 1`` largest labels of ``col`` and fold the rest into ``other_label``.
+
+    :param other_dims: Other dimension columns of ``df``, kept when re-aggregating.
+    :param value_cols: Measure columns; labels are ranked by the total of the first.
+    :param agg: How folded measures are combined, 'sum' or 'mean'.
+    """
+    totals = df.groupby(col, observed=True)[value_cols[0]].sum().sort_values(ascending=False)
+    if len(totals) <= top_n:
+        return df
+    keep = set(totals.index[:top_n - 1])
+    labels = df[col].map(lambda value: str(value) if value in keep else other_label)
+    return (df.assign(**{col: labels})
+            .groupby([col] + list(other_dims), observed=True, sort=False)[value_cols]
+            .agg(agg).reset_index())
+
+
+def resample_time_series(df, x, value_cols, group_cols=(), agg='sum', max_points=MAX_POINTS):
+    """
+    Coarsen a time series to daily, weekly, then monthly buckets until every series fits.
+
+    :return: Tuple of the resampled frame and the granularity label used (None if unchanged).
+    """
+    granularity = None
+    for rule, label in RESAMPLE_RULES:
+        if _points_per_series(df, group_cols) <= max_points:
+            break
+        df = (df.groupby([pd.Grouper(key=x, freq=rule)] + list(group_cols), observed=True)[value_cols]
+              .agg(agg).reset_index())
+        granularity = label
+    return df, granularity
+
+
+def thin_time_series(df, x, value_cols, group_cols=(), max_points=MAX_POINTS):
+    """
+    Pick at most ``max_points`` rows per series: LTTB for one measure, min/max bucketing for several.
+    """
+    def thin(series_df):
+        series_df = series_df.sort_values(x)
+        if len(series_df) <= max_points:
+            return series_df
+        if len(value_cols) == 1:
+            positions = lttb_indices(series_df[x].astype('int64').to_numpy(),
+                                     series_df[value_cols[0]].to_numpy(), max_points)
+        else:
+            positions = minmax_indices(series_df[value_cols].to_numpy(), max_points // 2)
+        return series_df.iloc[positions]
+
+    if not group_cols:
+        return thin(df)
+    return pd.concat([thin(part) for _, part in df.groupby(list(group_cols), observed=True, sort=False)],
+                     ignore_index=True)
+
+
+def _points_per_series(df, group_cols):
+    if not group_cols:
+        return len(df)
+    return int(df.groupby(list(group_cols), observed=True).size().max()) if len(df) else 0
+
+
+def prepare_plot_data(data, spec):
+    """
+    Bound the data a chart sends to the browser, before its figure is built.
+
+    High-cardinality color columns and categorical axes are folded into top N plus
+    ``Lainnya``; time series are resampled to a coarser granularity and, if still too
+    long, thinned with LTTB or min/max bucketing.
+
+    :param data: Aggregated chart data.
+    :param spec: Chart spec from the registry.
+    :return: Tuple of the frame to plot and a dict describing what was reduced.
+    """
+    kind, figure = spec['kind'], spec['figure']
+    x = figure.get('x') or figure.get('names')
+    y = figure.get('y') or figure.get('values')
+    if kind == 'sunburst' or x is None or y is None or data.empty:
+        return data, {}
+    value_cols = [y] if isinstance(y, str) else list(y)
+    color = figure.get('color')
+    agg = 'mean' if spec['rollup'][2] == 'mean' else 'sum'
+    info = {'rows_in': len(data)}
+
+    if color and data[color].nunique() > MAX_SERIES:
+        data = fold_column(data, color, [x], value_cols, MAX_SERIES, agg)
+        info['folded_series'] = color
+
+    group_cols = [color] if color else []
+    if kind == 'line' and pd.api.types.is_datetime64_any_dtype(data[x]):
+        data, granularity = resample_time_series(data, x, value_cols, group_cols, agg)
+        if granularity:
+            info['granularity'] = granularity
+        if _points_per_series(data, group_cols) > MAX_POINTS:
+            data = thin_time_series(data, x, value_cols, group_cols)
+            info['thinned'] = True
+    elif kind != 'line' and data[x].nunique() > MAX_CATEGORIES:
+        data = fold_column(data, x, group_cols, value_cols, MAX_CATEGORIES, agg)
+        info['folded_categories'] = x
+
+    info['rows_out'] = len(data)
+    return data, info
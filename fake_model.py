@@ -0,0 +1,77 @@
+import threading
+import time
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Offline stand-in for ``genai.GenerativeModel`` used for testing and benchmarking.
+
+    Each ``generate_content`` call sleeps for ``latency`` seconds to mimic a Gemini
+    round trip and returns a canned response. With ``stream=True`` the response is
+    an iterator of word chunks, the first arriving after ``latency`` seconds.
+
+    :param latency: Simulated round-trip time in seconds.
+    :param text: Response text; ``{n}`` is replaced with the call number.
+    :param fail_on: Call numbers (1-based) that raise ``RuntimeError`` instead.
+    """
+
+    def __init__(self, latency: float = 0.5, text: str = "Interpretasi palsu #{n}", fail_on=()):
+        self.latency = latency
+        self.text = text
+        self.fail_on = set(fail_on)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        if stream:
+            return self._stream(n)
+        time.sleep(self.latency)
+        if n in self.fail_on:
+            raise RuntimeError(f"Simulated failure on call {n}")
+        return FakeResponse(self.text.format(n=n))
+
+    def _stream(self, n):
+        time.sleep(self.latency)
+        if n in self.fail_on:
+            raise RuntimeError(f"Simulated failure on call {n}")
+        for word in self.text.format(n=n).split(' '):
+            yield FakeResponse(word + ' ')
+
+
+def benchmark(n_charts: int = 3, latency: float = 0.5):
+    """
+    Compare sequential and concurrent interpretation of ``n_charts`` charts.
+    """
+    import random
+
+    import pandas as pd
+    import plotly.express as px
+
+    from vis_interpret import interpret_chart
+
+    def make_charts():
+        # Random data so the interpretation cache never short-circuits the run
+        charts = []
+        for i in range(n_charts):
+            data = pd.DataFrame({'Kategori': list('ABCDE'), 'Jumlah': [random.random() for _ in range(5)]})
+            charts.append({'type': f'Benchmark {i}', 'data': data,
+                           'figure': px.bar(data_frame=data, x='Kategori', y='Jumlah')})
+        return charts
+
+    for label, concurrency in [('sequential', 1), ('concurrent', n_charts)]:
+        model = FakeGenerativeModel(latency=latency)
+        start = time.perf_counter()
+        interpret_chart('Benchmark', make_charts(), model, 'Benchmark', max_concurrency=concurrency)
+        print(f"{label:>10}: {time.perf_counter() - start:.2f}s for {model.calls} calls")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from data_loader import data_fingerprint
+
+# Number of built figures kept in memory, shared by all sessions
+FIGURE_CACHE_SIZE = 64
+
+
+def figure_key(spec, plot_data, render_mode) -> str:
+    """
+    Fingerprint of a chart: its registry spec, the data it plots and its render mode.
+
+    Two charts with the same key draw the same figure, so the key doubles as the
+    chart's stable Streamlit element key.
+    """
+    digest = hashlib.sha256()
+    spec_payload = {'kind': spec['kind'], 'rollup': spec['rollup'], 'figure': spec['figure']}
+    digest.update(json.dumps(spec_payload, sort_keys=True, default=str).encode('utf-8'))
+    digest.update(data_fingerprint(plot_data).encode('utf-8'))
+    digest.update(str(render_mode).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """
+    LRU of built Plotly figures keyed by ``figure_key``.
+
+    A chart whose spec and data have not changed reuses the figure object built the
+    first time instead of running Plotly Express again. Figures are cached rather than
+    their JSON because ``st.plotly_chart`` only takes figures or dicts and serializes
+    them itself on every call (rebuilding and validating a dict first), so each rerun
+    that draws a chart still pays that serialization, bounded by downsampling.
+    """
+
+    def __init__(self, max_entries: int = FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: str, build):
+        """
+        :param build: Callable returning the figure, called only on a miss.
+        :return: The cached or newly built figure.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry['figure']
+        figure = build()
+        with self._lock:
+            self.misses += 1
+            entry = self._entries.setdefault(key, {'figure': figure})
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry['figure']
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+figure_cache = FigureCache()
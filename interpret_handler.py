@@ -1,5 +1,8 @@
+from vis_interpret import interpret_chart
 
-def get_or_generate_interpretation(sheet_name, charts, model):
-    # Function to generate or fetch the interpretation for the given data and charts
-    interpretation = "Interpretation placeholder for " + sheet_name
-    return interpretation
+
+def get_or_generate_interpretation(sheet_name, charts, model, business_info=None):
+    # Function to generate or fetch the interpretation for the given data and charts.
+    # Shares the interpretation cache used by the visualize_* functions, so a chart
+    # interpreted from either path is not sent to Gemini again.
+    return interpret_chart(sheet_name, charts, model, business_info)
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from state_management import shared_state
+
+# Persistent backend so cached interpretations survive restarts
+CACHE_PATH = os.environ.get('UMKM_INTERPRETATION_CACHE', os.path.join('.cache', 'interpretations.sqlite3'))
+# Interpretations older than this are regenerated
+INTERPRETATION_TTL = 7 * 24 * 60 * 60
+MAX_MEMORY_ENTRIES = 256
+MAX_DISK_ENTRIES = 5000
+
+
+def interpretation_key(sheet_name, business_info, chart_type, data_hash, prompt_version) -> str:
+    """
+    Cache key for one chart interpretation.
+
+    :param sheet_name: Sheet the chart was built from.
+    :param business_info: Selected business-info option.
+    :param chart_type: Plotly trace type of the chart, e.g. ``'bar'``.
+    :param data_hash: Fingerprint of the aggregated data behind the chart.
+    :param prompt_version: Version of the prompt template used to generate it.
+    """
+    parts = [sheet_name, business_info, chart_type, data_hash, prompt_version]
+    return hashlib.sha256(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+
+class InterpretationCache:
+    """
+    Two-tier TTL cache of generated interpretations: the ``'interpretations'`` namespace
+    of the shared state store in front of SQLite.
+    """
+
+    namespace = 'interpretations'
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = INTERPRETATION_TTL,
+                 max_entries: int = MAX_MEMORY_ENTRIES, max_disk_entries: int = MAX_DISK_ENTRIES,
+                 store=shared_state):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._store = store
+        self._store.set_limit(self.namespace, max_entries)
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def get(self, key: str):
+        """
+        :return: The cached interpretation text, or None on a miss or expired entry.
+        """
+        now = time.time()
+        entry = self._store.get(self.namespace, key)
+        if entry is not None:
+            text, created_at = entry
+            if now - created_at < self.ttl:
+                with self._lock:
+                    self.hits += 1
+                return text
+            self._store.discard(self.namespace, key)
+
+        row = self._query("SELECT text, created_at FROM interpretations WHERE key = ?", (key,))
+        if row and now - row[1] < self.ttl:
+            self._execute("UPDATE interpretations SET used_at = ? WHERE key = ?", (now, key))
+            self._remember(key, row[0], row[1])
+            with self._lock:
+                self.hits += 1
+            return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def contains(self, key: str) -> bool:
+        """
+        Check for a live entry without touching the hit/miss counters or recency.
+        """
+        now = time.time()
+        entry = self._store.peek(self.namespace, key)
+        if entry is not None and now - entry[1] < self.ttl:
+            return True
+        row = self._query("SELECT created_at FROM interpretations WHERE key = ?", (key,))
+        return bool(row) and now - row[0] < self.ttl
+
+    def set(self, key: str, text: str):
+        now = time.time()
+        self._remember(key, text, now)
+        self._execute(
+            "INSERT OR REPLACE INTO interpretations (key, text, created_at, used_at) VALUES (?, ?, ?, ?)",
+            (key, text, now, now)
+        )
+        self._evict_disk(now)
+
+    def stats(self) -> dict:
+        memory_entries = self._store.stats().get(self.namespace, {}).get('entries', 0)
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'memory_entries': memory_entries}
+
+    def _remember(self, key, text, created_at):
+        self._store.put(self.namespace, key, (text, created_at), replace=True)
+
+    def _evict_disk(self, now):
+        self._execute("DELETE FROM interpretations WHERE created_at < ?", (now - self.ttl,))
+        self._execute(
+            "DELETE FROM interpretations WHERE key NOT IN "
+            "(SELECT key FROM interpretations ORDER BY used_at DESC LIMIT ?)",
+            (self.max_disk_entries,)
+        )
+
+    def _init_db(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._execute(
+            "CREATE TABLE IF NOT EXISTS interpretations "
+            "(key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _query(self, sql, params=()):
+        try:
+            with closing(self._connect()) as conn:
+                return conn.execute(sql, params).fetchone()
+        except sqlite3.Error:
+            return None
+
+    def _execute(self, sql, params=()):
+        # The disk tier is best effort; the in-memory tier keeps working without it
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(sql, params)
+        except sqlite3.Error:
+            pass
+
+
+interpretation_cache = InterpretationCache()
@@ -0,0 +1,224 @@
+import itertools
+import os
+import queue
+import threading
+import time
+import uuid
+
+from vis_interpret import interpret_chart, visualize_sheet_charts
+
+# Worker threads generating interpretations, shared by all sessions
+JOB_WORKERS = int(os.environ.get('INTERPRETATION_WORKERS', '4'))
+# Lower numbers run first: what the user is looking at goes before speculative work
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PREFETCH = 10
+# Seconds a finished job is kept for sessions to collect its text
+JOB_RETENTION = 10 * 60
+# Options whose interpretation one session may prefetch speculatively
+PREFETCH_BUDGET = int(os.environ.get('PREFETCH_BUDGET', '6'))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class InterpretationJob:
+    """
+    Interpretation of one set of charts, generated in the background.
+
+    The text is buffered chunk by chunk as it streams in, so a session polling the job
+    can show partial output.
+    """
+
+    def __init__(self, sheet_name, charts, model, business_info, priority):
+        self.id = uuid.uuid4().hex
+        self.sheet_name = sheet_name
+        self.charts = charts
+        self.model = model
+        self.business_info = business_info
+        self.priority = priority
+        self.subscribers = 0
+        self.status = QUEUED
+        self.error = None
+        self.finished_at = None
+        self._parts = []
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def text(self) -> str:
+        with self._lock:
+            return "".join(self._parts)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.status == QUEUED:
+            self._finish(CANCELLED)
+
+    def run(self):
+        with self._lock:
+            if self.status != QUEUED:
+                return
+            self.status = RUNNING
+        try:
+            for chunk in interpret_chart(self.sheet_name, self.charts, self.model, self.business_info, stream=True):
+                if self.cancelled:
+                    self._finish(CANCELLED)
+                    return
+                with self._lock:
+                    self._parts.append(chunk)
+        except Exception as e:
+            self.error = e
+            self._finish(FAILED)
+            return
+        self._finish(DONE)
+
+    def _finish(self, status):
+        with self._lock:
+            if self.status in (DONE, FAILED, CANCELLED):
+                return
+            self.status = status
+            self.finished_at = time.time()
+
+
+class PrefetchTask:
+    """
+    Builds the charts of a sheet's other options off the script thread, then queues their
+    interpretations at PRIORITY_PREFETCH.
+
+    Charts are built from the unfiltered sheet, which matches what the dashboard shows
+    with the default (full) date range, so selecting the option later finds the same job.
+    """
+
+    def __init__(self, jobs, sheet_name, df, options, model):
+        self.jobs = jobs
+        self.sheet_name = sheet_name
+        self.df = df
+        self.options = list(options)
+        self.model = model
+        self.cancelled = False
+
+    def run(self):
+        for option in self.options:
+            try:
+                charts = visualize_sheet_charts(self.sheet_name, self.df, option, interactive=False)
+            except Exception:
+                continue
+            if charts:
+                self.jobs.submit(self.sheet_name, charts, self.model, option, priority=PRIORITY_PREFETCH)
+
+
+def job_signature(sheet_name, charts, business_info):
+    """
+    Identity of an interpretation request: identical requests share one job.
+    """
+    return (sheet_name, business_info, tuple(chart.get('key') or chart['type'] for chart in charts))
+
+
+class JobQueue:
+    """
+    Priority queue of interpretation jobs served by a pool of daemon worker threads.
+
+    Sessions keep only job IDs. Submitting charts that already have a live job returns
+    that job, bumping it to the higher priority if it is still queued. A job is cancelled
+    once every session that submitted it has cancelled it; cancelled jobs are skipped
+    when they reach a worker, or stop at their next chunk if already running.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._jobs = {}
+        self._by_signature = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def submit(self, sheet_name, charts, model, business_info=None, priority=PRIORITY_INTERACTIVE) -> str:
+        """
+        :return: ID of the job interpreting ``charts``.
+        """
+        signature = job_signature(sheet_name, charts, business_info)
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(self._by_signature.get(signature))
+            # A cancelled job still running is about to end as CANCELLED; start afresh instead
+            if job is not None and job.status in (QUEUED, RUNNING, DONE) and not job.cancelled:
+                job.subscribers += 1
+                if job.status == QUEUED and priority < job.priority:
+                    job.priority = priority
+                    self._queue.put((priority, next(self._order), job))
+                return job.id
+            job = InterpretationJob(sheet_name, charts, model, business_info, priority)
+            job.subscribers = 1
+            self._jobs[job.id] = job
+            self._by_signature[signature] = job.id
+            self._start_workers()
+        self._queue.put((priority, next(self._order), job))
+        return job.id
+
+    def prefetch(self, sheet_name, df, options, model):
+        """
+        Speculatively interpret ``options`` of a sheet in the background, behind interactive jobs.
+        """
+        if options:
+            with self._lock:
+                self._start_workers()
+            self._queue.put((PRIORITY_PREFETCH, next(self._order), PrefetchTask(self, sheet_name, df, options, model)))
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Withdraw one session's interest in a job, cancelling it if no other session wants it.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            job.subscribers -= 1
+            if job.subscribers > 0:
+                return
+        job.cancel()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f'interpretation-worker-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            _, _, job = self._queue.get()
+            try:
+                if not job.cancelled:
+                    job.run()
+            finally:
+                self._queue.task_done()
+
+    def _purge(self):
+        cutoff = time.time() - JOB_RETENTION
+        stale = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in stale:
+            job = self._jobs.pop(job_id)
+            signature = job_signature(job.sheet_name, job.charts, job.business_info)
+            if self._by_signature.get(signature) == job_id:
+                del self._by_signature[signature]
+
+
+interpretation_jobs = JobQueue()
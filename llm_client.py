@@ -0,0 +1,194 @@
+import hashlib
+import os
+import random
+import threading
+import time
+
+from google.api_core.exceptions import (
+    DeadlineExceeded,
+    InternalServerError,
+    ResourceExhausted,
+    ServiceUnavailable,
+    TooManyRequests,
+)
+
+# Requests per minute allowed to Gemini from this process, shared by all sessions
+REQUESTS_PER_MINUTE = float(os.environ.get('GEMINI_REQUESTS_PER_MINUTE', '60'))
+# Requests that may be sent back to back before the per-minute rate applies
+BURST = int(os.environ.get('GEMINI_BURST', '10'))
+MAX_RETRIES = int(os.environ.get('GEMINI_MAX_RETRIES', '4'))
+# Backoff before retry n is a random share of min(MAX_BACKOFF, BASE_BACKOFF * 2 ** n) seconds
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+# Seconds one Gemini call may take before it is abandoned (and retried)
+REQUEST_TIMEOUT = float(os.environ.get('GEMINI_TIMEOUT', '60'))
+
+# Quota (429) and transient server (5xx) errors worth retrying
+RETRYABLE_ERRORS = (ResourceExhausted, TooManyRequests, InternalServerError, ServiceUnavailable, DeadlineExceeded)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: ``rate`` tokens per second, holding at most ``capacity``.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = None) -> bool:
+        """
+        Take one token, waiting for it if the bucket is empty.
+
+        :return: False if no token became available within ``timeout`` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class LLMClient:
+    """
+    Drop-in wrapper of ``genai.GenerativeModel.generate_content`` for shared use.
+
+    Every request takes a token from the process-wide rate limiter, gets a timeout,
+    and is retried with exponential backoff and jitter on RETRYABLE_ERRORS. Identical
+    non-streaming requests in flight at the same time share one call (single flight).
+    A streaming request is only retried until its first chunk has been yielded.
+
+    Streams are not coalesced: each consumer iterates its own chunks. The interactive
+    path streams interpretations through ``interpretation_jobs``, where identical
+    requests from different sessions already share one job (see ``job_signature``).
+
+    :param model: The ``genai.GenerativeModel`` (or compatible stand-in) to call.
+    :param limiter: Rate limiter shared with the other clients.
+    """
+
+    def __init__(self, model, limiter: TokenBucket, max_retries: int = MAX_RETRIES,
+                 timeout: float = REQUEST_TIMEOUT):
+        self.model = model
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.retries = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        if stream:
+            return self._stream(contents, **kwargs)
+        key = request_key(contents, kwargs)
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.response = self._with_retries(lambda: self._call(contents, False, kwargs))
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                call.done.set()
+        if call.error is not None:
+            raise call.error
+        return call.response
+
+    def _stream(self, contents, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                for chunk in self._call(contents, True, kwargs):
+                    started = True
+                    yield chunk
+                return
+            except RETRYABLE_ERRORS:
+                if started or attempt == self.max_retries:
+                    raise
+                self._backoff(attempt)
+
+    def _with_retries(self, call):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return call()
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                self._backoff(attempt)
+
+    def _call(self, contents, stream, kwargs):
+        self.limiter.acquire()
+        kwargs = dict(kwargs)
+        kwargs.setdefault('request_options', {'timeout': self.timeout})
+        return self.model.generate_content(contents, stream=stream, **kwargs)
+
+    def _backoff(self, attempt):
+        with self._lock:
+            self.retries += 1
+        time.sleep(random.uniform(0.5, 1.0) * min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'in_flight': len(self._in_flight), 'retries': self.retries, 'coalesced': self.coalesced}
+
+
+def request_key(contents, kwargs) -> str:
+    """
+    Hash identifying a request; images are hashed by their pixels.
+    """
+    digest = hashlib.sha256()
+    for part in contents if isinstance(contents, (list, tuple)) else [contents]:
+        if hasattr(part, 'tobytes'):
+            digest.update(part.tobytes())
+        else:
+            digest.update(repr(part).encode('utf-8'))
+    digest.update(repr(sorted(kwargs.items())).encode('utf-8'))
+    return digest.hexdigest()
+
+
+shared_limiter = TokenBucket(REQUESTS_PER_MINUTE / 60, BURST)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(model) -> LLMClient:
+    """
+    Process-wide client for a model, reused across Streamlit reruns and sessions.
+
+    Models are matched by name and system instruction, since every rerun constructs a
+    new ``GenerativeModel``; all clients share one rate limiter.
+    """
+    key = (getattr(model, 'model_name', None) or repr(model), str(getattr(model, '_system_instruction', None)))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = LLMClient(model, shared_limiter)
+        return client
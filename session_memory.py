@@ -0,0 +1,214 @@
+import os
+import sys
+import threading
+import time
+import uuid
+
+from chat_context import trim_history
+from state_management import shared_state
+
+# Approximate memory one session's state may hold before it is compacted
+SESSION_MEMORY_BUDGET = int(os.environ.get('SESSION_MEMORY_MB', '32')) * 1024 * 1024
+# When all sessions together hold more than this, the least recently active ones are compacted...
+SESSION_HIGH_WATER = int(os.environ.get('SESSION_HIGH_WATER_MB', '512')) * 1024 * 1024
+# ...until they are expected to hold at most this share of the high-water mark
+SESSION_LOW_WATER_RATIO = 0.75
+# Sessions not seen for this many seconds are forgotten and release their shared workbook
+SESSION_TTL = 30 * 60
+# Chat messages left in a compacted session
+COMPACT_HISTORY_MESSAGES = 10
+
+
+def value_size(value) -> int:
+    """
+    Approximate memory held by a session-state value, in bytes.
+
+    DataFrames are measured deeply and containers recursively; Plotly figures are
+    counted by the arrays of their traces.
+    """
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, 'to_plotly_json'):
+        return sum(value_size(v) for trace in getattr(value, 'data', ()) for v in trace.to_plotly_json().values())
+    if isinstance(value, dict):
+        return sum(value_size(v) for v in value.values())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sum(value_size(v) for v in value)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + value_size(vars(value))
+    return sys.getsizeof(value)
+
+
+def estimate_state_size(state) -> int:
+    """
+    Approximate size of a session's state; shared objects it only points to are not counted.
+    """
+    return sum(value_size(state[key]) for key in list(state.keys()))
+
+
+def slim_charts(charts) -> list:
+    """
+    Charts as kept in session state: spec, key and aggregated data, without the figure.
+
+    ``vis_interpret.chart_figure`` redraws the figure on demand, usually straight from
+    the shared figure cache.
+    """
+    return [{k: v for k, v in chart.items() if k != 'figure'} if chart.get('spec') is not None else chart
+            for chart in charts]
+
+
+def compact_session(state, aggressive=False):
+    """
+    Shrink a session's state in place.
+
+    The chat history is always capped. An aggressive compaction also drops the charts
+    and asks the dashboard to rebuild the current selection, which is served from the
+    shared aggregate, figure and interpretation caches.
+    """
+    if 'chat_history' in state:
+        trim_history(state['chat_history'])
+    if not aggressive:
+        return
+    if 'chat_history' in state:
+        trim_history(state['chat_history'], COMPACT_HISTORY_MESSAGES)
+    # Charts whose interpretation is still being generated are kept until it is done
+    if state.get('charts') and state.get('interpretation_done'):
+        state['charts'] = []
+        state['selected_sheet'] = ""
+        state['interpretation_done'] = False
+
+
+class SessionRegistry:
+    """
+    Process-wide record of each session's approximate state size, for a high-water-mark
+    eviction policy across sessions.
+
+    A session reports its size after every run. When the sessions together exceed
+    ``high_water``, the least recently active ones are flagged and compact themselves
+    on their next run; a session cannot safely touch another session's state.
+    Sessions idle for longer than SESSION_TTL are dropped and their workbook pin released.
+    """
+
+    def __init__(self, high_water: int = SESSION_HIGH_WATER, ttl: float = SESSION_TTL):
+        self.high_water = high_water
+        self.ttl = ttl
+        self.compactions = 0
+        self._sessions = {}
+        self._flagged = set()
+        self._lock = threading.Lock()
+
+    def update(self, session_id: str, size: int, workbook_key: str = None):
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = {'bytes': size, 'seen_at': now, 'workbook_key': workbook_key}
+            self._expire(now)
+            self._enforce()
+
+    def touch(self, session_id: str) -> bool:
+        """
+        Mark a session as active at the start of its run, so it cannot expire mid-run.
+
+        :return: False if the session is not tracked: new, or expired with its pin released.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return False
+            session['seen_at'] = time.time()
+            return True
+
+    def should_compact(self, session_id: str) -> bool:
+        """
+        :return: True once if the session was flagged for compaction.
+        """
+        with self._lock:
+            if session_id in self._flagged:
+                self._flagged.discard(session_id)
+                self.compactions += 1
+                return True
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'bytes': sum(session['bytes'] for session in self._sessions.values()),
+                'flagged': len(self._flagged),
+                'compactions': self.compactions,
+            }
+
+    def _expire(self, now):
+        for session_id in [sid for sid, session in self._sessions.items() if now - session['seen_at'] > self.ttl]:
+            session = self._sessions.pop(session_id)
+            self._flagged.discard(session_id)
+            if session['workbook_key']:
+                shared_state.release('workbooks', session['workbook_key'])
+
+    def _enforce(self):
+        total = sum(session['bytes'] for sid, session in self._sessions.items() if sid not in self._flagged)
+        if total <= self.high_water:
+            return
+        target = self.high_water * SESSION_LOW_WATER_RATIO
+        for session_id, session in sorted(self._sessions.items(), key=lambda item: item[1]['seen_at']):
+            if total <= target:
+                break
+            if session_id not in self._flagged:
+                self._flagged.add(session_id)
+                total -= session['bytes']
+
+
+session_registry = SessionRegistry()
+
+
+def current_session_id(state) -> str:
+    """
+    Streamlit's id of the running session, or a random id kept in its state.
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        if ctx is not None:
+            return ctx.session_id
+    except ImportError:
+        pass
+    if 'session_id' not in state:
+        state['session_id'] = uuid.uuid4().hex
+    return state['session_id']
+
+
+def resume_session(state) -> bool:
+    """
+    Register the start of a run with the session registry.
+
+    A session that expired while idle had its workbook pin released by the registry, so
+    its ``workbook_key`` is cleared: the app then pins the workbook again instead of
+    releasing the pin a second time (and taking it from another session).
+
+    :return: False if the session was new or had expired.
+    """
+    if session_registry.touch(current_session_id(state)):
+        return True
+    state['workbook_key'] = None
+    return False
+
+
+def manage_session_memory(state, budget: int = SESSION_MEMORY_BUDGET) -> dict:
+    """
+    Apply the session caps at the end of a run and report the session to the registry.
+
+    :return: ``{'bytes': size after compaction, 'compacted': bool}``.
+    """
+    session_id = current_session_id(state)
+    aggressive = session_registry.should_compact(session_id)
+    if state.get('charts'):
+        state['charts'] = slim_charts(state['charts'])
+    compact_session(state, aggressive)
+    size = estimate_state_size(state)
+    if size > budget and not aggressive:
+        compact_session(state, aggressive=True)
+        size = estimate_state_size(state)
+        aggressive = True
+    session_registry.update(session_id, size, state.get('workbook_key'))
+    return {'bytes': size, 'compacted': aggressive}
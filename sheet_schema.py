@@ -0,0 +1,147 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# Explicit formats tried, in order, when a column holds dates as text
+DATE_FORMATS = [
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%d/%m/%Y',
+    '%d/%m/%Y %H:%M',
+    '%d-%m-%Y',
+    '%m/%d/%Y',
+    '%Y/%m/%d',
+    '%d %B %Y',
+]
+# Marker format for columns whose cells are already date/datetime objects
+NATIVE_DATE_FORMAT = 'native'
+# Number of non-null values inspected to infer a column's type
+SAMPLE_SIZE = 200
+# Text columns with at most this share of distinct values are treated as categories
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+
+class SheetSchema:
+    """
+    Column roles of a sheet, inferred once per upload.
+
+    :param date_columns: Mapping of date column to its format (or NATIVE_DATE_FORMAT).
+    :param categorical: Low-cardinality text columns, used as chart dimensions.
+    :param numeric: Numeric columns, used as chart measures.
+    """
+
+    def __init__(self, date_columns=None, categorical=None, numeric=None):
+        self.date_columns = dict(date_columns or {})
+        self.categorical = list(categorical or [])
+        self.numeric = list(numeric or [])
+
+    def __repr__(self):
+        return (f"SheetSchema(date_columns={self.date_columns!r}, "
+                f"categorical={self.categorical!r}, numeric={self.numeric!r})")
+
+
+def is_text(series) -> bool:
+    """
+    Whether a column holds text: ``object`` before pandas 3, the ``str`` dtype from pandas 3 on.
+    """
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+
+def detect_date_format(series):
+    """
+    Find the format of a text date column from a sample of its values.
+
+    :return: A strptime format, NATIVE_DATE_FORMAT, or None if the column is not dates.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return NATIVE_DATE_FORMAT
+    if not is_text(series):
+        return None
+    sample = series.dropna().head(SAMPLE_SIZE)
+    if sample.empty:
+        return None
+    if sample.map(lambda value: isinstance(value, (datetime.date, datetime.datetime))).all():
+        return NATIVE_DATE_FORMAT
+    if not sample.map(lambda value: isinstance(value, str)).all():
+        return None
+    for fmt in DATE_FORMATS:
+        if pd.to_datetime(sample, format=fmt, errors='coerce').notna().all():
+            return fmt
+    return None
+
+
+def parse_dates(series, fmt):
+    if fmt == NATIVE_DATE_FORMAT:
+        return pd.to_datetime(series, errors='coerce')
+    return pd.to_datetime(series, format=fmt, errors='coerce')
+
+
+def infer_schema(df) -> SheetSchema:
+    schema = SheetSchema()
+    for col in df.columns:
+        series = df[col]
+        fmt = detect_date_format(series)
+        if fmt is not None:
+            schema.date_columns[col] = fmt
+        elif pd.api.types.is_bool_dtype(series):
+            schema.categorical.append(col)
+        elif pd.api.types.is_numeric_dtype(series):
+            schema.numeric.append(col)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            schema.categorical.append(col)
+        elif len(series) and series.nunique() <= CATEGORY_MAX_UNIQUE_RATIO * len(series):
+            schema.categorical.append(col)
+    return schema
+
+
+def apply_schema(df, schema: SheetSchema):
+    """
+    Return ``df`` with its date columns converted using their detected formats.
+    """
+    pending = [col for col, fmt in schema.date_columns.items()
+               if not pd.api.types.is_datetime64_any_dtype(df[col])]
+    if not pending:
+        return df
+    df = df.copy()
+    for col in pending:
+        df[col] = parse_dates(df[col], schema.date_columns[col])
+    return df
+
+
+def memory_usage(df) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _downcast(series):
+    if pd.api.types.is_integer_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+        # Only when float32 holds every value exactly; sales amounts must not lose precision
+        downcast = series.astype('float32')
+        if np.array_equal(downcast.to_numpy(dtype='float64'), series.to_numpy(), equal_nan=True):
+            return downcast
+    return series
+
+
+def compact_frame(df, schema: SheetSchema):
+    """
+    Shrink a typed sheet: categorical text columns become ``category`` and numeric
+    measures are downcast to the smallest dtype that holds them losslessly.
+
+    :return: Tuple of the compacted frame and ``{'before': bytes, 'after': bytes}``.
+    """
+    before = memory_usage(df)
+    converted = {}
+    for col in schema.categorical:
+        if is_text(df[col]):
+            converted[col] = df[col].astype('category')
+    for col in schema.numeric:
+        series = _downcast(df[col])
+        if series.dtype != df[col].dtype:
+            converted[col] = series
+    if converted:
+        df = df.copy()
+        for col, series in converted.items():
+            df[col] = series
+    return df, {'before': before, 'after': memory_usage(df) if converted else before}
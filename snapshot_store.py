@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import pyarrow.feather as feather
+
+# Where columnar snapshots of uploaded workbooks are kept between runs
+SNAPSHOT_DIR = os.environ.get('UMKM_SNAPSHOT_DIR', os.path.join('.cache', 'snapshots'))
+# Maximum number of workbooks kept on disk; the least recently used are removed first
+MAX_SNAPSHOTS = 20
+
+
+class SnapshotStore:
+    """
+    On-disk store of parsed sheets in Arrow IPC (Feather v2) format, keyed by content hash.
+
+    Each workbook gets a directory holding the original xlsx, a manifest and one
+    uncompressed ``.arrow`` file per parsed sheet, which is memory-mapped on load.
+    Sheets are stored already typed, so dtypes survive the round trip.
+    """
+
+    def __init__(self, root: str = SNAPSHOT_DIR, max_entries: int = MAX_SNAPSHOTS):
+        self.root = root
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def has(self, key: str) -> bool:
+        return os.path.exists(self._manifest_path(key))
+
+    def save_source(self, key: str, content: bytes, filename: str, sheet_names: list):
+        """
+        Store the uploaded xlsx and its manifest so the workbook can be reopened later.
+
+        :param key: Content hash of the uploaded file.
+        :param content: Raw xlsx bytes.
+        :param filename: Name of the uploaded file, shown in the recent files picker.
+        :param sheet_names: Sheet names in workbook order.
+        """
+        with self._lock:
+            os.makedirs(self._dir(key), exist_ok=True)
+            source_path = os.path.join(self._dir(key), 'source.xlsx')
+            if not os.path.exists(source_path):
+                self._write_atomic(source_path, content)
+            manifest = {
+                'key': key,
+                'filename': filename,
+                'sheet_names': list(sheet_names),
+                'saved_at': time.time(),
+            }
+            self._write_atomic(self._manifest_path(key), json.dumps(manifest).encode('utf-8'))
+            self._prune()
+
+    def read_source(self, key: str) -> bytes:
+        with open(os.path.join(self._dir(key), 'source.xlsx'), 'rb') as f:
+            return f.read()
+
+    def read_manifest(self, key: str) -> dict:
+        with open(self._manifest_path(key), encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_sheet(self, key: str, sheet_name: str):
+        """
+        Memory-map a snapshotted sheet.
+
+        :return: The sheet DataFrame, or None if it has not been snapshotted.
+        """
+        path = self._sheet_path(key, sheet_name)
+        if not os.path.exists(path):
+            return None
+        try:
+            # pandas.read_feather has no memory_map option; read the table through pyarrow
+            return feather.read_table(path, memory_map=True).to_pandas()
+        except Exception:
+            return None
+
+    def save_sheet(self, key: str, sheet_name: str, df) -> bool:
+        """
+        Write a typed sheet as an uncompressed Arrow file.
+
+        Sheets Arrow cannot represent (mixed-type object columns, non-string headers)
+        are skipped and keep being parsed from the xlsx.
+
+        :return: True if the snapshot was written.
+        """
+        if not self.has(key):
+            return False
+        path = self._sheet_path(key, sheet_name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            df.to_feather(tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+            return True
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def touch(self, key: str):
+        if self.has(key):
+            os.utime(self._manifest_path(key))
+
+    def recent(self, limit: int = 10) -> list:
+        """
+        Manifests of stored workbooks, most recently used first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        manifests = []
+        for key in os.listdir(self.root):
+            path = self._manifest_path(key)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    manifest = json.load(f)
+                manifest['used_at'] = os.path.getmtime(path)
+            except (OSError, ValueError):
+                continue
+            manifests.append(manifest)
+        manifests.sort(key=lambda m: m['used_at'], reverse=True)
+        return manifests[:limit]
+
+    def _prune(self):
+        stale = self.recent(limit=len(os.listdir(self.root)))[self.max_entries:]
+        for manifest in stale:
+            shutil.rmtree(self._dir(manifest['key']), ignore_errors=True)
+
+    def _dir(self, key):
+        return os.path.join(self.root, key)
+
+    def _manifest_path(self, key):
+        return os.path.join(self._dir(key), 'manifest.json')
+
+    def _sheet_path(self, key, sheet_name):
+        name_hash = hashlib.sha1(sheet_name.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self._dir(key), f'{name_hash}.arrow')
+
+    @staticmethod
+    def _write_atomic(path, payload):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+
+snapshot_store = SnapshotStore()
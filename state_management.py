@@ -1,6 +1,68 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Approximate memory the shared store may hold; least recently used entries nobody holds are evicted first
+SHARED_STATE_MAX_BYTES = int(os.environ.get('SHARED_STATE_MAX_MB', '1024')) * 1024 * 1024
+
+
+def estimate_size(value) -> int:
+    """
+    Approximate memory held by a stored value, in bytes.
+
+    Values that know their footprint expose ``memory_bytes()``; DataFrames are measured
+    deeply; anything else falls back to ``sys.getsizeof``.
+    """
+    if hasattr(value, 'memory_bytes'):
+        return int(value.memory_bytes())
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, tuple):
+        return sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def safe_size(value) -> int:
+    """
+    ``estimate_size`` that never fails: a value that cannot be measured counts as its shallow size.
+    """
+    try:
+        return estimate_size(value)
+    except Exception:
+        return sys.getsizeof(value)
+
+
 class StateManager:
-    def __init__(self):
+    """
+    Tracks the last processed input of a session and, as a process-wide instance,
+    holds the state every session can share.
+
+    Shared values live in namespaces (``'workbooks'``, ``'aggregates'``,
+    ``'interpretations'``) under content-derived keys, so identical uploads and
+    results are stored once however many sessions use them. Sessions keep only the
+    keys. Entries are evicted least recently used first once a namespace exceeds its
+    limit or the store exceeds ``max_bytes``; entries pinned with ``acquire`` are
+    skipped until released.
+
+    Each value is measured once when it is stored, outside the lock, and the store keeps
+    a running total. Values that grow afterwards (lazily parsed workbooks, memoized
+    aggregates) report it through ``resize``.
+
+    :param max_bytes: Memory cap of the shared store.
+    :param limits: Maximum number of entries per namespace, usually set by the cache
+        owning the namespace through ``set_limit``.
+    """
+
+    def __init__(self, max_bytes: int = SHARED_STATE_MAX_BYTES, limits: dict = None):
         self.last_input = ""
+        self.max_bytes = max_bytes
+        self.limits = dict(limits or {})
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
 
     def is_new_input(self, current_input: str) -> bool:
         """
@@ -17,4 +79,159 @@ class StateManager:
 
         :param current_input: The new input text.
         """
-        self.last_input = current_input
\ No newline at end of file
+        self.last_input = current_input
+
+    def set_limit(self, namespace: str, max_entries: int):
+        with self._lock:
+            self.limits[namespace] = max_entries
+
+    def get(self, namespace: str, key: str):
+        """
+        :return: The shared value, or None if it is not stored.
+        """
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            self._entries.move_to_end((namespace, key))
+            return entry['value']
+
+    def peek(self, namespace: str, key: str):
+        """
+        Like ``get``, without marking the entry as recently used.
+        """
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            return None if entry is None else entry['value']
+
+    def put(self, namespace: str, key: str, value, replace: bool = False):
+        """
+        Store a value unless one is already stored under the key.
+
+        :param replace: Overwrite an existing value instead (its pins are kept).
+        :return: The stored value, which is the existing one for a duplicate.
+        """
+        size = safe_size(value)
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                entry = self._entries[(namespace, key)] = {'value': value, 'refs': 0, 'bytes': size}
+                self._bytes += size
+            elif replace:
+                entry['value'] = value
+                self._bytes += size - entry['bytes']
+                entry['bytes'] = size
+            self._entries.move_to_end((namespace, key))
+            self._evict(namespace)
+            return entry['value']
+
+    def get_or_create(self, namespace: str, key: str, factory):
+        """
+        Return the value stored under ``key``, calling ``factory`` to create it on a miss.
+
+        Concurrent misses for the same key wait for a single ``factory`` call.
+        """
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault((namespace, key), threading.Lock())
+        with key_lock:
+            value = self.get(namespace, key)
+            if value is None:
+                value = self.put(namespace, key, factory())
+        with self._lock:
+            self._key_locks.pop((namespace, key), None)
+        return value
+
+    def resize(self, namespace: str, key: str):
+        """
+        Re-measure a stored value that has grown, evicting others if the store is now over its cap.
+        """
+        value = self.peek(namespace, key)
+        if value is None:
+            return
+        size = safe_size(value)
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None or entry['value'] is not value:
+                return
+            self._bytes += size - entry['bytes']
+            entry['bytes'] = size
+            self._evict(namespace)
+
+    def discard(self, namespace: str, key: str):
+        with self._lock:
+            if (namespace, key) in self._entries:
+                self._remove((namespace, key))
+
+    def acquire(self, namespace: str, key: str):
+        """
+        Pin a value so eviction skips it, e.g. the workbook a session has open.
+
+        :return: The value, or None if it is not stored.
+        """
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            entry['refs'] += 1
+            return entry['value']
+
+    def release(self, namespace: str, key: str):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry['refs'] > 0:
+                entry['refs'] -= 1
+
+    def clear(self, namespace: str = None):
+        with self._lock:
+            for entry_key in [k for k in self._entries if namespace is None or k[0] == namespace]:
+                self._remove(entry_key)
+
+    def memory_bytes(self, namespace: str = None) -> int:
+        with self._lock:
+            if namespace is None:
+                return self._bytes
+            return sum(entry['bytes'] for (ns, _), entry in self._entries.items() if ns == namespace)
+
+    def stats(self) -> dict:
+        """
+        Entries and approximate bytes per namespace, e.g. ``{'workbooks': {'entries': 2, 'bytes': ...}}``.
+        """
+        with self._lock:
+            stats = {}
+            for (namespace, _), entry in self._entries.items():
+                counts = stats.setdefault(namespace, {'entries': 0, 'bytes': 0, 'pinned': 0})
+                counts['entries'] += 1
+                counts['bytes'] += entry['bytes']
+                counts['pinned'] += entry['refs'] > 0
+            return stats
+
+    def _remove(self, entry_key):
+        # Called with the lock held
+        self._bytes -= self._entries.pop(entry_key)['bytes']
+
+    def _evict(self, namespace):
+        # Called with the lock held; uses the sizes recorded by put and resize
+        limit = self.limits.get(namespace)
+        if limit is not None:
+            keys = [k for k in self._entries if k[0] == namespace]
+            excess = len(keys) - limit
+            for entry_key in keys:
+                if excess <= 0:
+                    break
+                if self._entries[entry_key]['refs'] == 0:
+                    self._remove(entry_key)
+                    excess -= 1
+                    self.evictions += 1
+        for entry_key in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                break
+            if self._entries[entry_key]['refs'] == 0:
+                self._remove(entry_key)
+                self.evictions += 1
+
+
+# Process-wide store shared by all sessions; the module stays loaded across Streamlit reruns
+shared_state = StateManager()
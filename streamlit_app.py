@@ -1,17 +1,18 @@
 import streamlit as st
-import pandas as pd
 import time
 import plotly.express as px
 import google.generativeai as genai
-from google.api_core.exceptions import InternalServerError
 from dotenv import load_dotenv
-from vis_interpret import (
-    visualize_pelanggan, visualize_produk, visualize_transaksi_penjualan, 
-    visualize_lokasi_penjualan, visualize_staf_penjualan, visualize_inventaris, 
-    visualize_promosi_pemasaran, visualize_feedback_pengembalian, 
-    visualize_analisis_penjualan, visualize_lainnya
-)
-from state_management import StateManager
+from vis_interpret import VISUALIZERS, chart_figure, visualize_sheet_charts
+from chart_registry import business_options
+from state_management import StateManager, shared_state
+from session_memory import manage_session_memory, resume_session
+from data_loader import load_data, load_recent
+from snapshot_store import snapshot_store
+from chat_context import SYSTEM_PROMPT, ChatContext, trim_history
+from answer_cache import answer_cache, answer_keys
+from llm_client import get_client
+from interpretation_jobs import DONE, FAILED, CANCELLED, PREFETCH_BUDGET, interpretation_jobs
 
 state_manager = StateManager()
 
@@ -26,71 +27,14 @@ st.markdown("---")
 # Ambil API key dari variabel lingkungan
 API_KEY = st.secrets["general"]["API_KEY"]
 genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel(model_name='gemini-1.5-flash')
-
-# Function to load data from all sheets
-def load_data(uploaded_file):
-    if uploaded_file is not None:
-        data = pd.read_excel(uploaded_file, sheet_name=None)
-        return data
-    else:
-        return None
+# Calls go through process-wide clients that rate-limit, retry and coalesce requests for all sessions
+model = get_client(genai.GenerativeModel(model_name='gemini-1.5-flash'))
+# The chatbot persona is set once as the system instruction instead of being resent in every prompt
+chat_model = get_client(genai.GenerativeModel(model_name='gemini-1.5-flash', system_instruction=SYSTEM_PROMPT))
 
 # Function to get business info options based on selected sheet
 def get_business_options(sheet_name):
-    options = {
-        'Pelanggan': [
-            'Analisis demografi pelanggan',
-            'Distribusi usia dan jenis kelamin pelanggan',
-            'Segmentasi pelanggan berdasarkan preferensi'
-        ],
-        'Produk': [
-            'Kinerja penjualan produk dan stok',
-            'Distribusi penjualan berdasarkan kategori produk',
-            'Analisis harga produk dan trend penjualan'
-        ],
-        'Transaksi Penjualan': [
-            'Jumlah penjualan, pendapatan, dan metode pembayaran',
-            'Tren penjualan',
-            'Analisis status penjualan dan metode pembayaran'
-        ],
-        'Lokasi Penjualan': [
-            'Kinerja penjualan di berbagai lokasi',
-            'Distribusi penjualan berdasarkan kota/provinsi',
-            'Analisis lokasi dengan penjualan tertinggi/rendah'
-        ],
-        'Staf Penjualan': [
-            'Kinerja dan komisi staf penjualan',
-            'Analisis penilaian kinerja staf',
-            'Distribusi staf berdasarkan posisi/jabatan'
-        ],
-        'Inventaris': [
-            'Manajemen stok produk',
-            'Tren stok masuk dan keluar',
-            'Analisis produk dengan stok terbanyak/terkecil'
-        ],
-        'Promosi dan Pemasaran': [
-            'Efektivitas kampanye promosi',
-            'Distribusi penjualan berdasarkan media promosi',
-            'Analisis kode diskon promosi'
-        ],
-        'Feedback dan Pengembalian': [
-            'Masalah dan kepuasan pelanggan',
-            'Distribusi alasan pengembalian produk',
-            'Status pengembalian produk'
-        ],
-        'Analisis Penjualan': [
-            'Penjualan agregat dan tren',
-            'Analisis penjualan berdasarkan produk/kategori',
-            'Tren penjualan/tahunan'
-        ],
-        'Lainnya': [
-            'Analisis tambahan dan faktor eksternal',
-            'Tren penjualan berdasarkan faktor ekonomi',
-            'Distribusi biaya operasional terkait penjualan'
-        ]
-    }
-    return options.get(sheet_name, [])
+    return business_options(sheet_name)
 
 if 'charts' not in st.session_state:
     st.session_state.charts = []
@@ -108,12 +52,44 @@ if 'interpretation_done' not in st.session_state:
     st.session_state.interpretation_done = False
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []    
+if 'interpretation_job' not in st.session_state:
+    st.session_state.interpretation_job = None
+if 'interpretation_error_shown' not in st.session_state:
+    st.session_state.interpretation_error_shown = False
+if 'prefetched' not in st.session_state:
+    st.session_state.prefetched = set()
+if 'chat_context' not in st.session_state:
+    st.session_state.chat_context = ChatContext()
 
 # Sidebar for file upload
 st.sidebar.header("Unggah Data Penjualan Bisnis Kamu")
 uploaded_file = st.sidebar.file_uploader("Unggah file Excel", type=["xlsx"])
 data = load_data(uploaded_file)
 
+# Reopen a recently uploaded workbook from its local snapshot without re-uploading
+# Options are the stable snapshot keys in upload order: opening a snapshot touches it, and options
+# that change between reruns make Streamlit reset the selectbox
+if data is None:
+    recent_files = {
+        manifest['key']: f"{manifest['filename']} ({time.strftime('%d-%m-%Y %H:%M', time.localtime(manifest['saved_at']))})"
+        for manifest in sorted(snapshot_store.recent(), key=lambda manifest: manifest['saved_at'], reverse=True)
+    }
+    if recent_files:
+        selected_recent = st.sidebar.selectbox("Atau buka file terakhir", [""] + list(recent_files),
+                                               format_func=lambda key: recent_files.get(key, ""))
+        data = load_recent(selected_recent)
+
+# The workbook itself lives in the shared store; the session keeps only its key, pinned while open.
+# A session back from being idle past SESSION_TTL lost its pin and has its key cleared, so it pins again
+resume_session(st.session_state)
+workbook_key = getattr(data, 'key', None)
+if st.session_state.get('workbook_key') != workbook_key:
+    if st.session_state.get('workbook_key'):
+        shared_state.release('workbooks', st.session_state.workbook_key)
+    if workbook_key:
+        shared_state.acquire('workbooks', workbook_key)
+    st.session_state.workbook_key = workbook_key
+
 if data is not None:
     st.sidebar.success("Data berhasil diunggah!")
     sheet_names = list(data.keys())
@@ -121,6 +97,9 @@ else:
     st.sidebar.warning("Silakan unggah file Excel untuk melanjutkan.")
     sheet_names = []
 
+# Speculatively prepare the interpretations of a sheet's other options, within a per-session budget
+prefetch_enabled = st.sidebar.checkbox("Siapkan interpretasi opsi lain di latar belakang", value=False)
+
 # Main content area
 tab_selection = st.sidebar.radio("Pilih Halaman", ["Dashboard", "Chatbot"])
 
@@ -136,6 +115,35 @@ if not st.session_state.get('hint_shown', False):
     st.info("🔔 **Hint:** Untuk bantuan menggunakan aplikasi ini, lihat panel Bantuan di sidebar.")
     st.session_state['hint_shown'] = True
 
+# Function to wrap interpretation text in the styled interpretation box
+def interpretation_html(text):
+    return (
+        f'<div style="border: 2px solid #008080; padding: 10px; border-radius: 10px; margin-bottom: 10px;">'
+        f'{text}'
+        f'</div>'
+    )
+
+# Charts get element keys derived from their figure fingerprint, so an unchanged chart keeps its
+# identity across reruns and the frontend does not remount it. The figure comes from the figure
+# cache, but Streamlit still serializes it and sends it to the browser on every run that draws it
+def display_charts(charts):
+    for idx, chart in enumerate(charts):
+        try:
+            figure = chart_figure(chart)
+            if chart.get('key'):
+                st.plotly_chart(figure, key=f"chart_{idx}_{chart['key'][:16]}")
+            else:
+                st.plotly_chart(figure)
+        except Exception as e:
+            st.write(f"### Error: Could not display Plotly figure. Error: {e}")
+
+# Parts of the page that rerun on their own when their widgets change (e.g. the chat form), leaving
+# the charts around them untouched; older Streamlit versions rerun the whole script instead
+fragment_decorator = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+fragment = fragment_decorator or (lambda func: func)
+# Seconds between checks of a running interpretation job
+INTERPRETATION_POLL_INTERVAL = 0.5
+
 def add_date_picker(df):
     col1, col2 = st.columns(2)
     with col1:
@@ -158,77 +166,103 @@ if tab_selection == "Dashboard":
 
         if selected_sheet:
             sheet_data = data[selected_sheet]
+            memory_report = getattr(data, 'memory_report', {}).get(selected_sheet)
+            if memory_report:
+                st.sidebar.caption(
+                    f"Memori sheet {selected_sheet}: {memory_report['before'] / 1e6:.1f} MB → "
+                    f"{memory_report['after'] / 1e6:.1f} MB"
+                )
             st.write("#### Data yang Diunggah")
             st.dataframe(sheet_data)
 
             st.write("#### 👇 Pilih Informasi Bisnis yang Kamu Inginkan")
-            business_options = get_business_options(selected_sheet)
-            selected_business_info = st.selectbox("", [""] + business_options)
+            options = get_business_options(selected_sheet)
+            selected_business_info = st.selectbox("", [""] + options)
+
+            if prefetch_enabled and selected_sheet in VISUALIZERS:
+                sheet_key = sheet_data.attrs.get('sheet_key', selected_sheet)
+                budget_left = PREFETCH_BUDGET - len(st.session_state.prefetched)
+                prefetch_options = [
+                    option for option in options
+                    if option != selected_business_info and (sheet_key, option) not in st.session_state.prefetched
+                ][:max(budget_left, 0)]
+                if prefetch_options:
+                    st.session_state.prefetched.update((sheet_key, option) for option in prefetch_options)
+                    interpretation_jobs.prefetch(selected_sheet, sheet_data, prefetch_options, model)
+
+            # An unfinished interpretation for a selection the user has moved away from is no longer wanted
+            if (st.session_state.interpretation_job is not None and not st.session_state.interpretation_done and
+                (st.session_state.selected_sheet, st.session_state.selected_business_info) != (selected_sheet, selected_business_info)):
+                interpretation_jobs.cancel(st.session_state.interpretation_job)
+                st.session_state.interpretation_job = None
 
             if selected_business_info:
-                def get_visualization_and_interpretation(sheet_data, selected_business_info, selected_sheet):
-                    if selected_sheet == 'Pelanggan':
-                        return visualize_pelanggan(sheet_data, selected_business_info, model)
-                    elif selected_sheet == 'Produk':
-                        return visualize_produk(sheet_data, selected_business_info, model)
-                    elif selected_sheet == 'Transaksi Penjualan':
-                        return visualize_transaksi_penjualan(sheet_data, selected_business_info, model)
-                    elif selected_sheet == 'Lokasi Penjualan':
-                        return visualize_lokasi_penjualan(sheet_data, selected_business_info, model)
-                    elif selected_sheet == 'Staf Penjualan':
-                        return visualize_staf_penjualan(sheet_data, selected_business_info, model)
-                    elif selected_sheet == 'Inventaris':
-                        return visualize_inventaris(sheet_data, selected_business_info, model)
-                    elif selected_sheet == 'Promosi dan Pemasaran':
-                        return visualize_promosi_pemasaran(sheet_data, selected_business_info, model)
-                    elif selected_sheet == 'Feedback dan Pengembalian':
-                        return visualize_feedback_pengembalian(sheet_data, selected_business_info, model)
-                    elif selected_sheet == 'Analisis Penjualan':
-                        return visualize_analisis_penjualan(sheet_data, selected_business_info, model)
-                    elif selected_sheet == 'Lainnya':
-                        return visualize_lainnya(sheet_data, selected_business_info, model)
-                    else:
-                        return [], ""
-
+                def get_visualization(sheet_data, selected_business_info, selected_sheet):
+                    if selected_sheet not in VISUALIZERS:
+                        return []
+                    return visualize_sheet_charts(selected_sheet, sheet_data, selected_business_info)
+
+                # Charts are built inline; their interpretation is queued as a background job whose
+                # ID is kept in session state, so the charts paint without waiting for Gemini
+                job = interpretation_jobs.get(st.session_state.interpretation_job)
                 if (st.session_state.selected_sheet != selected_sheet or
                     st.session_state.selected_business_info != selected_business_info or
-                    not st.session_state.interpretation_done):
-                    try:
-                        charts, interpretation = get_visualization_and_interpretation(sheet_data, selected_business_info, selected_sheet)
-                        st.session_state.charts = charts
-                        st.session_state.interpretation = interpretation
-                        st.session_state.selected_sheet = selected_sheet
-                        st.session_state.selected_business_info = selected_business_info
-                        st.session_state.interpretation_done = True
-                    except InternalServerError as e:
-                        st.error("Terjadi kesalahan pada server saat mencoba mendapatkan interpretasi. Silakan coba lagi nanti.")
-                        st.stop()
-
-                def display_charts(charts):
-                    for chart in charts:
-                        figure = chart.get('figure')
-                        try:
-                            st.plotly_chart(figure)
-                        except Exception as e:
-                            st.write(f"### Error: Could not display Plotly figure. Error: {e}")
+                    (not st.session_state.interpretation_done and (
+                        job is None or job.status == CANCELLED or
+                        # A failed job is retried on the next interaction, once its error has been shown
+                        (job.status == FAILED and st.session_state.interpretation_error_shown)))):
+                    if job is not None:
+                        interpretation_jobs.cancel(job.id)
+                    charts = get_visualization(sheet_data, selected_business_info, selected_sheet)
+                    st.session_state.charts = charts
+                    st.session_state.interpretation = ""
+                    st.session_state.selected_sheet = selected_sheet
+                    st.session_state.selected_business_info = selected_business_info
+                    st.session_state.interpretation_done = False
+                    st.session_state.interpretation_error_shown = False
+                    st.session_state.interpretation_job = (
+                        interpretation_jobs.submit(selected_sheet, charts, model, selected_business_info)
+                        if charts else None
+                    )
 
                 # Display charts first
                 if 'charts' in st.session_state:
                     display_charts(st.session_state.charts)
 
-                # Then display interpretation with typing effect
+                # Then display the interpretation, polled from its job until it is finished
                 st.write("### ✨ Interpretasi AI")
-                typing_response = ""
-                typing_box = st.empty()
-                for i in range(len(st.session_state.interpretation)):
-                    typing_response += st.session_state.interpretation[i]
-                    typing_box.markdown(
-                        f'<div style="border: 2px solid #008080; padding: 10px; border-radius: 10px; margin-bottom: 10px;">'
-                        f'{typing_response}'
-                        f'</div>',
-                        unsafe_allow_html=True
-                    )
-                    time.sleep(0.004)
+
+                def interpretation_panel(polling=False):
+                    job = interpretation_jobs.get(st.session_state.interpretation_job)
+                    if polling and (job is None or job.finished):
+                        # Stop polling: rerun the page so the panel is drawn without run_every
+                        st.rerun()
+                    if st.session_state.interpretation_done or job is None:
+                        st.markdown(interpretation_html(st.session_state.interpretation), unsafe_allow_html=True)
+                        return
+                    if job.status == FAILED:
+                        st.error("Terjadi kesalahan pada server saat mencoba mendapatkan interpretasi. Silakan coba lagi nanti.")
+                        st.session_state.interpretation_error_shown = True
+                        return
+                    st.markdown(interpretation_html(job.text or "⏳ Sedang membuat interpretasi..."), unsafe_allow_html=True)
+                    if job.status == DONE:
+                        st.session_state.interpretation = job.text
+                        st.session_state.interpretation_done = True
+
+                def poll_interpretation():
+                    interpretation_panel(polling=True)
+
+                job = interpretation_jobs.get(st.session_state.interpretation_job)
+                if job is not None and not job.finished and fragment_decorator is not None:
+                    fragment_decorator(poll_interpretation, run_every=INTERPRETATION_POLL_INTERVAL)()
+                else:
+                    # Without fragments, wait for the job here, repainting the text as it grows
+                    interpretation_box = st.empty()
+                    while job is not None and not job.finished and not st.session_state.interpretation_done:
+                        interpretation_box.markdown(interpretation_html(job.text or "⏳ Sedang membuat interpretasi..."), unsafe_allow_html=True)
+                        time.sleep(INTERPRETATION_POLL_INTERVAL)
+                    with interpretation_box.container():
+                        interpretation_panel()
 
     # Hyperlink to Chatbot
     st.markdown("[Masih bingung sama hasilnya? Yuk tanyain ke Chatbot!](#chatbot)")
@@ -237,95 +271,88 @@ elif tab_selection == "Chatbot":
     st.write("### ✨ Business AIssistant")
     st.write("Ketik pertanyaan kamu di bawah ini untuk mendapatkan jawaban berdasarkan hasil visualisasi dan interpretasi data.")
 
-    def get_chatbot_response(user_question):
+    # Function to get the chatbot answer; with stream=True a generator of text chunks is returned.
+    # Questions already answered against the same context, or earlier in this conversation, come from the answer cache
+    def get_chatbot_response(user_question, stream=False):
+        context_key, conversation_key = answer_keys(st.session_state.get('charts', []),
+                                                    st.session_state.get('interpretation', ""),
+                                                    st.session_state.chat_context)
+        cached_answer = answer_cache.get(user_question, context_key, conversation_key)
+        if cached_answer is not None:
+            return iter([cached_answer]) if stream else cached_answer
+        if stream:
+            return stream_chatbot_response(user_question, context_key, conversation_key)
         try:
-            prompt = (
-                "Bertindaklah sebagai data dan business analyst profesional. Tugas kamu adalah menjawab pertanyaan dari pelaku UMKM seputar bisnis UMKM mereka. "
-                "Jawablah sesuai dengan pertanyaan pelaku UMKM. Kamu menjawab berdasarkan visualisasi chart dan interpretasi yang telah kamu buat sendiri. "
-                "Jawab dengan gaya bahasa yang sama dari interpretasi yang kamu buat sendiri tersebut. "
-                "Gunakan bahasa yang santai, mudah dipahami, friendly untuk pemula hingga ahli, dan tetap berfokus pada konteks bisnis. "
-                "Selalu panggil user dengan 'Kamu', gunakan bahasa yang energik, menarik, dan tidak membosankan. "
-                "Interpretasikan secara spesifik dan mendalam dalam konteks bisnis yang sesuai dan berikan rekomendasi yang dapat membantu bisnis untuk berkembang. "
-                "Jelaskan data dengan detail, sampaikan informasi yang bermanfaat kepada pelaku UMKM. "
-                "Tekankan kalimat atau kata yang penting dengan **bold**, _italic_, atau __underline__ sesuai kebutuhan. Buatkan poin-poin atau tabel jika perlu. "
-                "Berikut adalah pertanyaan yang harus kamu jawab.\n"
-                f"Pertanyaan: {user_question}\n"
-                f"Jawab dalam konteks bisnis, berdasarkan hasil visualisasi dan interpretasi yang telah kamu buat sendiri.\n\n"
-                f"**Ini adalah hasil Visualisasi dan Interpretasi yang sudah kamu buat sendiri sebelumnya:**\n"
-            )
-
-            if 'charts' in st.session_state:
-                prompt += "Berikut adalah visualisasi yang telah ditampilkan:\n"
-                for idx, chart in enumerate(st.session_state.charts):
-                    prompt += f"Visualisasi {idx + 1}: {chart.get('description', 'Tidak ada deskripsi')}\n"
-
-            if 'interpretation' in st.session_state:
-                prompt += "\nInterpretasi sebelumnya:\n"
-                prompt += st.session_state.interpretation
-
-            # Update response generation method
-            response = model.generate_content(prompt)
+            response = chat_model.generate_content(build_chatbot_prompt(user_question))
+            answer_cache.set(user_question, context_key, response.text, conversation_key)
             return response.text
         except Exception as e:
             return f"### Error: {e}"
 
+    def stream_chatbot_response(user_question, context_key, conversation_key):
+        parts = []
+        try:
+            for chunk in chat_model.generate_content(build_chatbot_prompt(user_question), stream=True):
+                parts.append(chunk.text)
+                yield chunk.text
+        except Exception as e:
+            yield f"### Error: {e}"
+            return
+        answer_cache.set(user_question, context_key, "".join(parts), conversation_key)
+
+    # Function to build the prompt of one question within the chat context's token budget
+    def build_chatbot_prompt(user_question):
+        return st.session_state.chat_context.build_prompt(
+            user_question,
+            st.session_state.get('charts', []),
+            st.session_state.get('interpretation', ""),
+        )
+
     # Display previous visualizations and interpretations
     st.write("### **Hasil Visualisasi dan Interpretasi Sebelumnya**")
     
     if 'charts' in st.session_state:
-        for chart in st.session_state.charts:
-            figure = chart.get('figure')
-            try:
-                st.plotly_chart(figure)
-            except Exception as e:
-                st.write(f"### Error: Could not display Plotly figure. Error: {e}")
+        display_charts(st.session_state.charts)
 
     if 'interpretation' in st.session_state:
         st.write("#### **Interpretasi:**")
-        interpretation_text = st.session_state.interpretation
-        st.markdown(
-            f'<div style="border: 2px solid #008080; padding: 10px; border-radius: 10px; margin-bottom: 10px;">'
-            f'{interpretation_text}'
-            f'</div>',
-            unsafe_allow_html=True
-        )
+        st.markdown(interpretation_html(st.session_state.interpretation), unsafe_allow_html=True)
 
-    # Function to display chat history in styled boxes
-    def display_chat(chat_history, typing_response=""):
-        chat_display = '<div style="border: 2px solid #e0e0e0; padding: 10px; border-radius: 10px; width: 100%; white-space: pre-wrap;">'
-        for chat in chat_history:
-            if "user" in chat:
-                chat_display += (
-                    f'<div style="display: flex; justify-content: flex-end; margin-bottom: 5px;">'
-                    f'<div style="background-color: #dcf8c6; padding: 10px; border-radius: 10px; max-width: 80%;">'
-                    f'<strong>You:</strong> {chat["user"]}'
-                    f'</div>'
-                    f'</div>'
-                )
-            if "bot" in chat:
-                chat_display += (
-                    f'<div style="display: flex; justify-content: flex-start; margin-bottom: 5px;">'
-                    f'<div style="padding: 10px; border-radius: 10px; max-width: 80%;">'
-                    f'<strong>Bot:</strong> {chat["bot"]}'
-                    f'</div>'
-                    f'</div>'
-                )
-        if typing_response:
+    # Function to render a single chat message as a styled box
+    def chat_message_html(chat):
+        chat_display = ""
+        if "user" in chat:
+            chat_display += (
+                f'<div style="display: flex; justify-content: flex-end; margin-bottom: 5px;">'
+                f'<div style="background-color: #dcf8c6; padding: 10px; border-radius: 10px; max-width: 80%;">'
+                f'<strong>You:</strong> {chat["user"]}'
+                f'</div>'
+                f'</div>'
+            )
+        if "bot" in chat:
             chat_display += (
                 f'<div style="display: flex; justify-content: flex-start; margin-bottom: 5px;">'
                 f'<div style="padding: 10px; border-radius: 10px; max-width: 80%;">'
-                f'<strong>Bot:</strong> {typing_response}'
+                f'<strong>Bot:</strong> {chat["bot"]}'
                 f'</div>'
                 f'</div>'
             )
-        chat_display += '</div>'
         return chat_display
 
-    # Create a container for the chat history
-    chat_container = st.empty()
+    # Function to display chat messages in a bordered chat box
+    def display_chat(chat_history):
+        chat_display = '<div style="border: 2px solid #e0e0e0; padding: 10px; border-radius: 10px; width: 100%; white-space: pre-wrap;">'
+        chat_display += "".join(chat_message_html(chat) for chat in chat_history)
+        chat_display += '</div>'
+        return chat_display
 
-    # Chat interface in the middle
+    # Chat interface in the middle, run as a fragment so a chat submit does not redraw the charts above
+    @fragment
     def chat_interface():
+        # Create a container for the chat history, and one below it for the answer being streamed
+        chat_container = st.empty()
+        streaming_box = st.empty()
+
         with st.form(key="chat_form"):
             user_input = st.text_area("Tanya AI", placeholder="Ketik pertanyaan kamu di sini...", key="chat_input")
             submit_button = st.form_submit_button(label="Kirim")
@@ -335,21 +362,19 @@ elif tab_selection == "Chatbot":
                 if user_input:
                     st.session_state.chat_history.append({"user": user_input})
                     st.session_state.keep_interpretation = True
-                    chatbot_response = get_chatbot_response(user_input)
-                    st.session_state.chatbot_response = chatbot_response
-                    st.session_state.chat_history.append({"bot": ""})  # Temporary empty response for typing effect
 
-                    # Typing effect
-                    typing_response = ""
-                    typing_box = st.empty()
-                    for i in range(len(chatbot_response)):
-                        typing_response += chatbot_response[i]
-                        with typing_box.container():
-                            chat_container.markdown(display_chat(st.session_state.chat_history[:-1], typing_response), unsafe_allow_html=True)
-                        time.sleep(0.004)
+                    # Earlier messages are rendered once; only the in-progress answer is repainted per chunk
+                    chat_container.markdown(display_chat(st.session_state.chat_history), unsafe_allow_html=True)
+                    chatbot_response = ""
+                    for chunk in get_chatbot_response(user_input, stream=True):
+                        chatbot_response += chunk
+                        streaming_box.markdown(display_chat([{"bot": chatbot_response}]), unsafe_allow_html=True)
 
-                    # Replace the temporary empty response with the final response
-                    st.session_state.chat_history[-1]["bot"] = chatbot_response
+                    st.session_state.chatbot_response = chatbot_response
+                    st.session_state.chat_history.append({"bot": chatbot_response})
+                    st.session_state.chat_context.record(user_input, chatbot_response)
+                    trim_history(st.session_state.chat_history)
+                    streaming_box.empty()
 
                     # Reset submit_on_enter flag
                     st.session_state.submit_on_enter = False
@@ -364,3 +389,6 @@ elif tab_selection == "Chatbot":
 
     # Hyperlink to Dashboard
     st.markdown("[Mau lihat informasi bisnis lain dari bisnis Kamu? Klik ini ya!](#)")
+
+# Keep this session's state within its memory budget and report its size for the cross-session policy
+manage_session_memory(st.session_state)
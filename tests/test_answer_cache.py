@@ -0,0 +1,109 @@
+from answer_cache import AnswerCache, answer_keys, context_fingerprint, normalize_question
+from chat_context import ChatContext
+
+CHARTS = [{'key': 'produk-terlaris', 'type': 'Produk terlaris'}]
+INTERPRETATION = "Produk Kopi Susu adalah produk paling laku."
+
+
+def ask(cache, chat_context, question, answers):
+    """
+    Answer a question the way the chatbot tab does, returning the answer and whether it was cached.
+    """
+    context_key, conversation_key = answer_keys(CHARTS, INTERPRETATION, chat_context)
+    answer = cache.get(question, context_key, conversation_key)
+    cached = answer is not None
+    if not cached:
+        answer = f"Jawaban #{len(answers) + 1}"
+        answers.append(answer)
+        cache.set(question, context_key, answer, conversation_key)
+    chat_context.record(question, answer)
+    return answer, cached
+
+
+def test_repeat_in_the_same_conversation_hits_after_other_turns():
+    cache, chat_context, answers = AnswerCache(), ChatContext(), []
+    first, _ = ask(cache, chat_context, "Produk apa yang paling laku?", answers)
+    ask(cache, chat_context, "Kapan penjualan tertinggi?", answers)
+
+    again, cached = ask(cache, chat_context, "produk apa yang paling laku", answers)
+
+    assert cached and again == first
+    assert cache.stats()['exact_hits'] == 1
+
+
+def test_first_question_is_shared_by_sessions():
+    cache, answers = AnswerCache(), []
+    first, _ = ask(cache, ChatContext(), "Produk apa yang paling laku?", answers)
+
+    answer, cached = ask(cache, ChatContext(), "Produk apa yang paling laku?", answers)
+
+    assert cached and answer == first
+
+
+def test_follow_up_is_not_shared_across_conversations():
+    cache, answers = AnswerCache(), []
+    first, second = ChatContext(), ChatContext()
+    ask(cache, first, "Produk apa yang paling laku?", answers)
+    ask(cache, first, "Kenapa bisa begitu?", answers)
+    ask(cache, second, "Kapan penjualan tertinggi?", answers)
+
+    _, cached = ask(cache, second, "Kenapa bisa begitu?", answers)
+
+    assert not cached
+
+
+def test_reset_starts_a_new_conversation():
+    cache, chat_context, answers = AnswerCache(), ChatContext(), []
+    ask(cache, chat_context, "Produk apa yang paling laku?", answers)
+    ask(cache, chat_context, "Kenapa bisa begitu?", answers)
+    chat_context.reset()
+    ask(cache, chat_context, "Kapan penjualan tertinggi?", answers)
+
+    _, cached = ask(cache, chat_context, "Kenapa bisa begitu?", answers)
+
+    assert not cached
+
+
+def test_other_context_misses():
+    cache = AnswerCache()
+    cache.set("Produk apa yang paling laku?", context_fingerprint(CHARTS, INTERPRETATION), "Kopi Susu")
+
+    assert cache.get("Produk apa yang paling laku?", context_fingerprint(CHARTS, "Interpretasi lain")) is None
+
+
+def test_similarity_tier_is_off_by_default():
+    cache = AnswerCache()
+    key = context_fingerprint(CHARTS, INTERPRETATION)
+    cache.set("Produk apa yang paling laku bulan ini?", key, "Kopi Susu")
+
+    assert cache.get("Produk apa yang paling laku bulan ini ya?", key) is None
+
+
+def test_similarity_tier_keeps_polarity_and_specifics_apart():
+    cache = AnswerCache(similarity_threshold=0.8)
+    key = context_fingerprint(CHARTS, INTERPRETATION)
+    cache.set("Berapa penjualan produk paling laku tahun 2023?", key, "Kopi Susu, 1.200 cup")
+
+    assert cache.get("Berapa penjualn produk paling laku tahun 2023?", key) == "Kopi Susu, 1.200 cup"
+    assert cache.get("Berapa penjualan produk paling tidak laku tahun 2023?", key) is None
+    assert cache.get("Berapa penjualan produk paling laku tahun 2024?", key) is None
+    assert cache.stats()['similar_hits'] == 1
+
+
+def test_expired_and_least_recently_used_answers_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('answer_cache.time.time', lambda: now[0])
+    cache = AnswerCache(ttl=60, max_entries=2)
+    cache.set("a", "ctx", "A")
+    cache.set("b", "ctx", "B")
+    cache.get("a", "ctx")
+    cache.set("c", "ctx", "C")
+
+    assert cache.get("b", "ctx") is None
+    assert cache.get("a", "ctx") == "A"
+    now[0] += 60
+    assert cache.get("a", "ctx") is None
+
+
+def test_questions_are_normalized():
+    assert normalize_question("  Produk  apa yang PALING laku?! ") == "produk apa yang paling laku"
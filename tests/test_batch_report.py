@@ -0,0 +1,109 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import batch_report
+import data_loader
+import snapshot_store as snapshot_module
+import vis_interpret
+from batch_report import CHARTS_ONLY, DONE_MARKER, FULL, OPTION_FILES, REPORT_NAME, is_done, process_workbook
+from fake_model import FakeGenerativeModel
+from interpretation_cache import InterpretationCache
+from state_management import StateManager
+
+OPTIONS = [
+    'Staf_Penjualan_Kinerja_dan_komisi_staf_penjualan',
+    'Staf_Penjualan_Analisis_penilaian_kinerja_staf',
+    'Staf_Penjualan_Distribusi_staf_berdasarkan_posisi_jabatan',
+]
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_module.snapshot_store, 'root', str(tmp_path / 'snapshots'))
+    monkeypatch.setattr(data_loader, 'workbook_cache', data_loader.WorkbookCache(store=StateManager()))
+    monkeypatch.setattr(vis_interpret, 'interpretation_cache',
+                        InterpretationCache(path=str(tmp_path / 'interpretations.sqlite3'), store=StateManager()))
+    monkeypatch.setattr(batch_report, '_model', None)
+    path = tmp_path / 'toko.xlsx'
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({
+            'Staf': ['Ani', 'Budi', 'Citra'],
+            'Komisi': [100000, 250000, 175000],
+            'Penilaian Kinerja': [4.5, 3.8, 4.1],
+            'Posisi/Jabatan': ['Kasir', 'Sales', 'Sales'],
+        }).to_excel(writer, sheet_name='Staf Penjualan', index=False)
+        pd.DataFrame({'Catatan': ['tidak digrafikkan']}).to_excel(writer, sheet_name='Catatan', index=False)
+    return str(path)
+
+
+def marker(out_dir):
+    with open(os.path.join(out_dir, DONE_MARKER), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_charts_only_run_writes_charts_and_is_resumable(workbook, tmp_path):
+    output = str(tmp_path / 'laporan')
+
+    result = process_workbook(workbook, output)
+
+    out_dir = os.path.join(output, 'toko')
+    assert result['status'] == 'done' and result['options'] == 3
+    assert sorted(os.listdir(out_dir)) == sorted(OPTIONS + [DONE_MARKER, REPORT_NAME])
+    assert sorted(os.listdir(os.path.join(out_dir, OPTIONS[0]))) == sorted([OPTION_FILES[CHARTS_ONLY], 'grafik_1.html'])
+    assert marker(out_dir)['mode'] == CHARTS_ONLY
+    assert process_workbook(workbook, output)['status'] == 'skipped'
+
+
+def test_full_run_redoes_charts_only_output(workbook, tmp_path, monkeypatch):
+    output = str(tmp_path / 'laporan')
+    process_workbook(workbook, output)
+    monkeypatch.setattr(batch_report, '_model', FakeGenerativeModel(latency=0))
+
+    result = process_workbook(workbook, output)
+
+    out_dir = os.path.join(output, 'toko')
+    assert result['status'] == 'done' and result['options'] == 3
+    assert marker(out_dir)['mode'] == FULL
+    with open(os.path.join(out_dir, REPORT_NAME), encoding='utf-8') as f:
+        assert f.read().count('Interpretasi palsu') == 3
+    assert process_workbook(workbook, output)['status'] == 'skipped'
+
+
+def test_charts_only_run_reuses_full_output(workbook, tmp_path, monkeypatch):
+    output = str(tmp_path / 'laporan')
+    monkeypatch.setattr(batch_report, '_model', FakeGenerativeModel(latency=0))
+    process_workbook(workbook, output)
+    monkeypatch.setattr(batch_report, '_model', None)
+
+    assert process_workbook(workbook, output)['status'] == 'skipped'
+
+
+def test_finished_options_are_not_redone(workbook, tmp_path, monkeypatch):
+    output = str(tmp_path / 'laporan')
+    model = FakeGenerativeModel(latency=0)
+    monkeypatch.setattr(batch_report, '_model', model)
+    process_workbook(workbook, output)
+    os.remove(os.path.join(output, 'toko', DONE_MARKER))
+
+    result = process_workbook(workbook, output)
+
+    assert (result['status'], result['options']) == ('done', 0)
+    assert model.calls == 3
+
+
+def test_markers_without_a_mode_only_satisfy_charts_only_runs(tmp_path):
+    with open(tmp_path / DONE_MARKER, 'w', encoding='utf-8') as f:
+        json.dump({'key': 'abc'}, f)
+
+    assert is_done(str(tmp_path), 'abc', CHARTS_ONLY)
+    assert not is_done(str(tmp_path), 'abc', FULL)
+    assert not is_done(str(tmp_path), 'other', CHARTS_ONLY)
+
+
+def test_batch_runs_leave_the_snapshot_store_alone(workbook, tmp_path):
+    process_workbook(workbook, str(tmp_path / 'laporan'))
+
+    assert not os.path.exists(tmp_path / 'snapshots')
@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from vis_interpret import WEBGL_POINT_THRESHOLD, build_charts, chart_render_mode
+
+
+def test_auto_mode_resolves_to_svg_or_webgl():
+    assert chart_render_mode('line', WEBGL_POINT_THRESHOLD, 'auto') == 'svg'
+    assert chart_render_mode('line', WEBGL_POINT_THRESHOLD + 1, 'auto') == 'webgl'
+    assert chart_render_mode('bar', 10 ** 6, 'auto') == 'svg'
+    assert chart_render_mode('line', 10, 'webgl') == 'webgl'
+
+
+@pytest.mark.parametrize('points, mode, trace', [(500, 'svg', 'scatter'), (1500, 'webgl', 'scattergl')])
+def test_chart_metadata_reports_the_mode_drawn(points, mode, trace):
+    df = pd.DataFrame({'Tanggal': pd.date_range('2018-01-01', periods=points), 'Pendapatan': np.random.rand(points)})
+
+    chart = build_charts(df, 'Transaksi Penjualan', 'Tren penjualan', render_mode='auto')[0]
+
+    assert chart['render_mode'] == mode
+    assert chart['figure'].data[0].type == trace
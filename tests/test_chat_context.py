@@ -0,0 +1,63 @@
+from chat_context import (
+    SUMMARY_BUDGET,
+    ChatContext,
+    estimate_tokens,
+    select_sections,
+    trim_history,
+)
+
+INTERPRETATION = "\n\n".join([
+    "Penjualan bulanan naik 20% sejak Maret, didorong promo akhir pekan.",
+    "Produk Kopi Susu adalah produk paling laku dengan 1.200 cup terjual.",
+    "Pelanggan usia 18-25 tahun mendominasi transaksi di channel online.",
+] + [f"Paragraf pelengkap nomor {i} tentang stok gudang dan biaya operasional." for i in range(200)])
+
+
+def test_prompt_stays_within_budget_as_the_conversation_grows():
+    context = ChatContext(budget=800)
+    sizes = []
+    for turn in range(30):
+        prompt = context.build_prompt("Produk apa yang paling laku?", [{'type': 'Produk terlaris'}], INTERPRETATION)
+        sizes.append(estimate_tokens(prompt))
+        context.record(f"Pertanyaan ke-{turn} tentang penjualan?", "Jawaban panjang. " * 200)
+
+    assert max(sizes) <= 800 * 1.1
+    assert sizes[-1] <= sizes[3] * 1.2
+
+
+def test_relevant_section_is_chosen_and_order_is_kept():
+    sections = select_sections("produk apa yang paling laku terjual?", INTERPRETATION, 20)
+
+    assert sections == [INTERPRETATION.split("\n\n")[1]]
+
+    both = select_sections("penjualan bulanan dan pelanggan online", INTERPRETATION, 40)
+    assert both == [INTERPRETATION.split("\n\n")[0], INTERPRETATION.split("\n\n")[2]]
+
+
+def test_old_turns_roll_into_a_bounded_summary():
+    context = ChatContext(recent_turns=2)
+    for turn in range(100):
+        context.record(f"Pertanyaan {turn}?", f"Jawaban {turn}. Detail lain.")
+
+    assert [question for question, _ in context.turns] == ["Pertanyaan 98?", "Pertanyaan 99?"]
+    assert estimate_tokens(context.summary) <= SUMMARY_BUDGET
+    assert context.summary_lines[-1] == "- Pertanyaan: Pertanyaan 97? → Jawaban 97."
+
+
+def test_state_and_reset():
+    context = ChatContext()
+    assert context.state() is None
+
+    context.record("Halo?", "Hai.")
+    assert context.state() == [[], [("Halo?", "Hai.")]]
+
+    context.reset()
+    assert context.state() is None
+
+
+def test_trim_history_keeps_latest_messages():
+    history = [{'user': str(i)} for i in range(50)]
+
+    trim_history(history, 10)
+
+    assert [message['user'] for message in history] == [str(i) for i in range(40, 50)]
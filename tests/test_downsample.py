@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from chart_payload import OTHER_LABEL
+from downsample import (
+    MAX_CATEGORIES,
+    MAX_POINTS,
+    fold_column,
+    lttb_indices,
+    minmax_indices,
+    prepare_plot_data,
+    thin_time_series,
+)
+
+
+def line_spec(y='Pendapatan', color=None):
+    figure = {'x': 'Tanggal', 'y': y}
+    if color:
+        figure['color'] = color
+    return {'kind': 'line', 'figure': figure, 'rollup': ('Tanggal', y, 'sum')}
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(10_000)
+    y = np.sin(x / 500.0)
+    y[4321] = 50.0
+
+    positions = lttb_indices(x, y, 500)
+
+    assert len(positions) <= 500
+    assert positions[0] == 0 and positions[-1] == len(x) - 1
+    assert np.all(np.diff(positions) > 0)
+    assert 4321 in positions
+
+
+def test_lttb_leaves_short_series_alone():
+    assert lttb_indices(np.arange(10), np.arange(10), 20).tolist() == list(range(10))
+
+
+def test_minmax_keeps_every_series_extremes():
+    values = np.zeros((1000, 2))
+    values[123, 0] = -7
+    values[789, 1] = 9
+
+    positions = minmax_indices(values, 50)
+
+    assert {0, 123, 789, 999} <= set(positions.tolist())
+    assert len(positions) <= 2 * 50 + 2
+
+
+def test_fold_column_keeps_top_labels_and_totals():
+    df = pd.DataFrame({'Produk': [f'P{i}' for i in range(40)], 'Jumlah Terjual': range(40)})
+
+    folded = fold_column(df, 'Produk', [], ['Jumlah Terjual'], top_n=10)
+
+    assert len(folded) == 10
+    assert set(folded['Produk']) == {f'P{i}' for i in range(31, 40)} | {OTHER_LABEL}
+    assert folded['Jumlah Terjual'].sum() == df['Jumlah Terjual'].sum()
+
+
+def test_long_daily_series_is_resampled_before_thinning():
+    dates = pd.date_range('2015-01-01', periods=3000, freq='D')
+    data = pd.DataFrame({'Tanggal': dates, 'Pendapatan': np.arange(3000.0)})
+
+    plot_data, info = prepare_plot_data(data, line_spec())
+
+    assert info['granularity'] == 'mingguan'
+    assert len(plot_data) <= MAX_POINTS
+    assert plot_data['Pendapatan'].sum() == data['Pendapatan'].sum()
+
+
+def test_intraday_series_is_resampled_daily():
+    times = pd.date_range('2024-01-01', periods=5000, freq='min')
+    data = pd.DataFrame({'Tanggal': times, 'Pendapatan': np.ones(5000)})
+
+    plot_data, info = prepare_plot_data(data, line_spec())
+
+    assert info['granularity'] == 'harian'
+    assert plot_data['Pendapatan'].tolist() == [1440.0, 1440.0, 1440.0, 680.0]
+
+
+def test_thinning_bounds_each_series():
+    times = pd.date_range('2024-01-01', periods=3000, freq='D')
+    data = pd.concat([
+        pd.DataFrame({'Tanggal': times, 'Produk': produk, 'A': np.arange(3000.0), 'B': -np.arange(3000.0)})
+        for produk in ('X', 'Y')
+    ], ignore_index=True)
+
+    single = thin_time_series(data[data['Produk'] == 'X'], 'Tanggal', ['A'], max_points=100)
+    grouped = thin_time_series(data, 'Tanggal', ['A', 'B'], ['Produk'], max_points=100)
+
+    assert len(single) <= 100
+    assert grouped.groupby('Produk').size().max() <= 102
+    assert grouped.groupby('Produk')['A'].max().tolist() == [2999.0, 2999.0]
+
+
+def test_many_categories_are_folded():
+    data = pd.DataFrame({'Produk': [f'P{i}' for i in range(100)], 'Jumlah Terjual': range(100)})
+    spec = {'kind': 'bar', 'figure': {'x': 'Produk', 'y': 'Jumlah Terjual'}, 'rollup': ('Produk', 'Jumlah Terjual', 'sum')}
+
+    plot_data, info = prepare_plot_data(data, spec)
+
+    assert len(plot_data) == MAX_CATEGORIES
+    assert info['folded_categories'] == 'Produk'
+
+
+def test_small_data_is_untouched():
+    data = pd.DataFrame({'Tanggal': pd.date_range('2024-01-01', periods=30), 'Pendapatan': range(30)})
+
+    plot_data, info = prepare_plot_data(data, line_spec())
+
+    assert plot_data is data
+    assert info == {'rows_in': 30, 'rows_out': 30}
@@ -0,0 +1,100 @@
+import re
+import time
+
+import pandas as pd
+import plotly.express as px
+import pytest
+
+import vis_interpret
+from fake_model import FakeGenerativeModel, FakeResponse
+from interpretation_cache import InterpretationCache
+from state_management import StateManager
+from vis_interpret import CHART_ERROR_PREFIX, interpret_chart
+
+
+class ChartEchoModel(FakeGenerativeModel):
+    """
+    Answers with the chart type named in the prompt, so each answer can be matched to its chart.
+
+    :param latencies: Seconds each chart type takes, to make later charts finish first.
+    :param fail_types: Chart types whose requests raise ``RuntimeError``.
+    """
+
+    def __init__(self, latencies=None, fail_types=()):
+        super().__init__(latency=0)
+        self.latencies = latencies or {}
+        self.fail_types = set(fail_types)
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        chart_type = re.search(r"Tipe Visualisasi: (.+?) \(", contents[0]).group(1)
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latencies.get(chart_type, 0))
+        if chart_type in self.fail_types:
+            raise RuntimeError(f"Simulated failure for {chart_type}")
+        if stream:
+            return iter([FakeResponse(f"Interpretasi {chart_type}")])
+        return FakeResponse(f"Interpretasi {chart_type}")
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    cache = InterpretationCache(path=str(tmp_path / 'interpretations.sqlite3'), store=StateManager())
+    monkeypatch.setattr(vis_interpret, 'interpretation_cache', cache)
+    return cache
+
+
+def make_charts(n):
+    charts = []
+    for i in range(n):
+        data = pd.DataFrame({'Kategori': list('ABC'), 'Jumlah': [i, i + 1, i + 2]})
+        charts.append({'type': f'Grafik {i}', 'data': data, 'figure': px.bar(data_frame=data, x='Kategori', y='Jumlah')})
+    return charts
+
+
+def test_interpretations_follow_chart_order():
+    charts = make_charts(4)
+    # The first chart answers last
+    model = ChartEchoModel(latencies={'Grafik 0': 0.3, 'Grafik 1': 0.2, 'Grafik 2': 0.1})
+
+    text = interpret_chart('Produk', charts, model, 'Produk', max_concurrency=4)
+
+    assert text.split("\n\n") == [f"Interpretasi Grafik {i}" for i in range(4)]
+
+
+def test_streamed_interpretations_follow_chart_order():
+    charts = make_charts(3)
+    model = ChartEchoModel(latencies={'Grafik 0': 0.2, 'Grafik 1': 0.1})
+
+    text = "".join(interpret_chart('Produk', charts, model, 'Produk', max_concurrency=3, stream=True))
+
+    assert text.split("\n\n") == [f"Interpretasi Grafik {i}" for i in range(3)]
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_failed_chart_does_not_discard_the_others(stream):
+    charts = make_charts(3)
+    model = ChartEchoModel(fail_types={'Grafik 1'})
+
+    result = interpret_chart('Produk', charts, model, 'Produk', max_concurrency=3, stream=stream)
+    sections = ("".join(result) if stream else result).split("\n\n")
+
+    assert sections[0] == "Interpretasi Grafik 0"
+    assert sections[1].startswith(f"{CHART_ERROR_PREFIX} 2 (Grafik 1)")
+    assert sections[2] == "Interpretasi Grafik 2"
+
+
+def test_every_chart_failing_raises():
+    with pytest.raises(RuntimeError):
+        interpret_chart('Produk', make_charts(2), ChartEchoModel(fail_types={'Grafik 0', 'Grafik 1'}), 'Produk')
+
+
+def test_cached_interpretations_are_not_requested_again():
+    charts = make_charts(2)
+    model = ChartEchoModel()
+
+    first = interpret_chart('Produk', charts, model, 'Produk')
+    second = interpret_chart('Produk', charts, model, 'Produk')
+
+    assert first == second
+    assert model.calls == 2
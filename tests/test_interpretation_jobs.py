@@ -0,0 +1,198 @@
+import re
+import threading
+import time
+
+import pandas as pd
+import plotly.express as px
+import pytest
+
+import interpretation_jobs
+import vis_interpret
+from fake_model import FakeGenerativeModel, FakeResponse
+from interpretation_cache import InterpretationCache
+from interpretation_jobs import (
+    CANCELLED,
+    DONE,
+    FAILED,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_PREFETCH,
+    QUEUED,
+    RUNNING,
+    JobQueue,
+    PrefetchTask,
+)
+from state_management import StateManager
+
+
+class GatedModel(FakeGenerativeModel):
+    """
+    Answers with the chart type named in the prompt; charts named in ``gated`` wait for
+    ``gate`` first, so a test decides when the worker running them is free again.
+    """
+
+    def __init__(self, gated=(), fail_types=()):
+        super().__init__(latency=0)
+        self.gate = threading.Event()
+        self.gated = set(gated)
+        self.fail_types = set(fail_types)
+        self.started = []
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        chart_type = re.search(r"Tipe Visualisasi: (.+?) \(", contents[0]).group(1)
+        with self._lock:
+            self.calls += 1
+            self.started.append(chart_type)
+        if chart_type in self.gated:
+            self.gate.wait(5)
+        if chart_type in self.fail_types:
+            raise RuntimeError(f"Simulated failure for {chart_type}")
+        return iter([FakeResponse(f"Interpretasi {chart_type}")])
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    cache = InterpretationCache(path=str(tmp_path / 'interpretations.sqlite3'), store=StateManager())
+    monkeypatch.setattr(vis_interpret, 'interpretation_cache', cache)
+
+
+@pytest.fixture
+def model():
+    model = GatedModel(gated={'Blok'})
+    yield model
+    model.gate.set()
+
+
+def make_charts(*names):
+    charts = []
+    for i, name in enumerate(names):
+        data = pd.DataFrame({'Kategori': list('ABC'), 'Jumlah': [i, i + 1, i + 2]})
+        charts.append({'type': name, 'data': data, 'figure': px.bar(data_frame=data, x='Kategori', y='Jumlah')})
+    return charts
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+def block_worker(jobs, model):
+    """
+    Occupy the queue's single worker, so jobs submitted next stay queued.
+    """
+    job_id = jobs.submit('Produk', make_charts('Blok'), model, 'Blok')
+    wait_for(lambda: jobs.get(job_id).status == RUNNING)
+    return job_id
+
+
+def test_job_streams_the_interpretation_until_done(model):
+    jobs = JobQueue(workers=1)
+    job = jobs.get(jobs.submit('Produk', make_charts('Grafik A'), model, 'Produk'))
+
+    wait_for(lambda: job.finished)
+    assert job.status == DONE
+    assert "Interpretasi Grafik A" in job.text
+
+
+def test_job_fails_when_every_chart_fails():
+    jobs = JobQueue(workers=1)
+    job = jobs.get(jobs.submit('Produk', make_charts('Grafik A'), GatedModel(fail_types={'Grafik A'}), 'Produk'))
+
+    wait_for(lambda: job.finished)
+    assert job.status == FAILED and job.error is not None
+
+
+def test_identical_requests_share_one_job(model):
+    jobs = JobQueue(workers=1)
+    block_worker(jobs, model)
+    first = jobs.submit('Produk', make_charts('Grafik A'), model, 'Produk')
+
+    assert jobs.submit('Produk', make_charts('Grafik A'), model, 'Produk') == first
+    assert jobs.submit('Produk', make_charts('Grafik A'), model, 'Pelanggan') != first
+    assert jobs.get(first).subscribers == 2
+
+
+def test_job_is_cancelled_only_when_every_subscriber_cancels(model):
+    jobs = JobQueue(workers=1)
+    block_worker(jobs, model)
+    job_id = jobs.submit('Produk', make_charts('Grafik A'), model, 'Produk')
+    jobs.submit('Produk', make_charts('Grafik A'), model, 'Produk')
+
+    jobs.cancel(job_id)
+    assert jobs.get(job_id).status == QUEUED
+    jobs.cancel(job_id)
+    assert jobs.get(job_id).status == CANCELLED
+
+    model.gate.set()
+    wait_for(lambda: jobs.pending() == 0)
+    assert 'Grafik A' not in model.started
+
+
+def test_cancelled_running_job_is_not_reused(model):
+    jobs = JobQueue(workers=2)
+    job_id = block_worker(jobs, model)
+    jobs.cancel(job_id)
+
+    assert jobs.submit('Produk', make_charts('Blok'), model, 'Blok') != job_id
+    model.gate.set()
+    wait_for(lambda: jobs.get(job_id).finished)
+    assert jobs.get(job_id).status == CANCELLED
+
+
+def test_interactive_jobs_run_before_prefetched_ones(model):
+    jobs = JobQueue(workers=1)
+    block_worker(jobs, model)
+    jobs.submit('Produk', make_charts('Prefetch'), model, 'Prefetch', priority=PRIORITY_PREFETCH)
+    jobs.submit('Produk', make_charts('Interaktif'), model, 'Interaktif')
+
+    model.gate.set()
+    wait_for(lambda: len(model.started) == 3)
+    assert model.started == ['Blok', 'Interaktif', 'Prefetch']
+
+
+def test_selecting_a_prefetched_option_bumps_its_queued_job(model):
+    jobs = JobQueue(workers=1)
+    block_worker(jobs, model)
+    job_id = jobs.submit('Produk', make_charts('Nanti'), model, 'Nanti', priority=PRIORITY_PREFETCH)
+    jobs.submit('Produk', make_charts('Lain'), model, 'Lain', priority=PRIORITY_PREFETCH)
+
+    assert jobs.submit('Produk', make_charts('Nanti'), model, 'Nanti') == job_id
+    assert jobs.get(job_id).priority == PRIORITY_INTERACTIVE
+    model.gate.set()
+    wait_for(lambda: len(model.started) == 3)
+    assert model.started == ['Blok', 'Nanti', 'Lain']
+
+
+def test_prefetch_queues_every_option_and_skips_failing_ones(model, monkeypatch):
+    def fake_charts(sheet_name, df, option, interactive=True):
+        if option == 'Rusak':
+            raise ValueError("chart gagal dibuat")
+        return make_charts(f'Grafik {option}')
+
+    monkeypatch.setattr(interpretation_jobs, 'visualize_sheet_charts', fake_charts)
+    jobs = JobQueue(workers=1)
+    submitted = []
+    monkeypatch.setattr(jobs, 'submit', lambda *args, **kwargs: submitted.append((args, kwargs)))
+
+    PrefetchTask(jobs, 'Produk', None, ['Satu', 'Rusak', 'Dua'], model).run()
+
+    assert [args[3] for args, _ in submitted] == ['Satu', 'Dua']
+    assert all(kwargs == {'priority': PRIORITY_PREFETCH} for _, kwargs in submitted)
+
+
+def test_prefetched_job_is_reused_when_the_option_is_selected(model, monkeypatch):
+    monkeypatch.setattr(interpretation_jobs, 'visualize_sheet_charts',
+                        lambda sheet_name, df, option, interactive=True: make_charts(f'Grafik {option}'))
+    model.gated.add('Grafik Satu')
+    jobs = JobQueue(workers=1)
+    jobs.prefetch('Produk', None, ['Satu'], model)
+    wait_for(lambda: model.started == ['Grafik Satu'])
+
+    job_id = jobs.submit('Produk', make_charts('Grafik Satu'), model, 'Satu')
+    assert jobs.get(job_id).priority == PRIORITY_PREFETCH
+    model.gate.set()
+    wait_for(lambda: jobs.get(job_id).finished)
+    assert jobs.get(job_id).status == DONE
+    assert model.started == ['Grafik Satu']
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+from google.api_core.exceptions import InvalidArgument, ServiceUnavailable
+
+import llm_client
+from fake_model import FakeGenerativeModel, FakeResponse
+from llm_client import LLMClient, TokenBucket
+
+
+class FlakyModel(FakeGenerativeModel):
+    """
+    Fails its first ``failures`` calls with ``error``; with ``after_chunk`` a stream fails
+    after yielding its first chunk instead.
+    """
+
+    def __init__(self, failures, error=ServiceUnavailable, after_chunk=False, **kwargs):
+        super().__init__(latency=0, **kwargs)
+        self.failures = failures
+        self.error = error
+        self.after_chunk = after_chunk
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        failing = n <= self.failures
+        if stream:
+            return self._flaky_stream(failing)
+        if failing:
+            raise self.error("busy")
+        return FakeResponse(self.text.format(n=n))
+
+    def _flaky_stream(self, failing):
+        if failing and not self.after_chunk:
+            raise self.error("busy")
+        yield FakeResponse("Halo ")
+        if failing:
+            raise self.error("busy")
+        yield FakeResponse("dunia")
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_client, 'BASE_BACKOFF', 0)
+
+
+def unlimited():
+    return TokenBucket(rate=1000, capacity=1000)
+
+
+def test_retryable_errors_are_retried():
+    model = FlakyModel(failures=2)
+    client = LLMClient(model, unlimited())
+
+    assert client.generate_content("halo").text == "Interpretasi palsu #3"
+    assert client.stats()['retries'] == 2
+
+
+def test_retries_give_up_after_max_retries():
+    client = LLMClient(FlakyModel(failures=5), unlimited(), max_retries=2)
+
+    with pytest.raises(ServiceUnavailable):
+        client.generate_content("halo")
+
+
+def test_other_errors_are_not_retried():
+    model = FlakyModel(failures=1, error=InvalidArgument)
+
+    with pytest.raises(InvalidArgument):
+        LLMClient(model, unlimited()).generate_content("halo")
+    assert model.calls == 1
+
+
+def test_identical_concurrent_requests_share_one_call():
+    model = FakeGenerativeModel(latency=0.3)
+    client = LLMClient(model, unlimited())
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.generate_content("sama").text))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.calls == 1
+    assert results == ["Interpretasi palsu #1"] * 5
+    assert client.stats() == {'in_flight': 0, 'retries': 0, 'coalesced': 4}
+
+
+def test_stream_is_retried_before_its_first_chunk():
+    client = LLMClient(FlakyModel(failures=1), unlimited())
+
+    assert "".join(chunk.text for chunk in client.generate_content("halo", stream=True)) == "Halo dunia"
+
+
+def test_stream_is_not_retried_after_a_chunk_was_yielded():
+    model = FlakyModel(failures=1, after_chunk=True)
+    chunks = []
+
+    with pytest.raises(ServiceUnavailable):
+        for chunk in LLMClient(model, unlimited()).generate_content("halo", stream=True):
+            chunks.append(chunk.text)
+    assert chunks == ["Halo "]
+    assert model.calls == 1
+
+
+def test_token_bucket_allows_a_burst_then_the_rate():
+    bucket = TokenBucket(rate=20, capacity=3)
+    start = time.monotonic()
+    for _ in range(3):
+        assert bucket.acquire()
+    assert time.monotonic() - start < 0.05
+
+    assert not bucket.acquire(timeout=0.01)
+    assert bucket.acquire(timeout=0.2)
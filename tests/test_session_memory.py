@@ -0,0 +1,137 @@
+import pandas as pd
+import pytest
+
+import session_memory
+from chat_context import MAX_HISTORY_MESSAGES
+from session_memory import (
+    COMPACT_HISTORY_MESSAGES,
+    SessionRegistry,
+    compact_session,
+    manage_session_memory,
+    resume_session,
+    slim_charts,
+)
+from state_management import StateManager
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_memory.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = SessionRegistry(high_water=100, ttl=60)
+    monkeypatch.setattr(session_memory, 'session_registry', registry)
+    return registry
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    store = StateManager()
+    monkeypatch.setattr(session_memory, 'shared_state', store)
+    return store
+
+
+def history(n):
+    return [{'user': f'Pertanyaan {i}', 'bot': f'Jawaban {i}'} for i in range(n)]
+
+
+def test_slim_charts_drops_only_redrawable_figures():
+    charts = [{'type': 'A', 'spec': {'kind': 'bar'}, 'figure': object()}, {'type': 'B', 'figure': object()}]
+
+    slim = slim_charts(charts)
+
+    assert 'figure' not in slim[0]
+    assert slim[1] is charts[1]
+
+
+def test_compaction_caps_history_and_drops_finished_charts():
+    state = {'chat_history': history(60), 'charts': [{'type': 'A'}], 'selected_sheet': 'Produk',
+             'interpretation_done': True}
+
+    compact_session(state)
+    assert len(state['chat_history']) == MAX_HISTORY_MESSAGES
+    assert state['charts']
+
+    compact_session(state, aggressive=True)
+    assert len(state['chat_history']) == COMPACT_HISTORY_MESSAGES
+    assert state['chat_history'][-1]['user'] == 'Pertanyaan 59'
+    assert state['charts'] == [] and state['selected_sheet'] == ""
+
+
+def test_charts_still_being_interpreted_are_kept():
+    state = {'charts': [{'type': 'A'}], 'selected_sheet': 'Produk', 'interpretation_done': False}
+
+    compact_session(state, aggressive=True)
+
+    assert state['charts'] and state['selected_sheet'] == 'Produk'
+
+
+def test_session_over_budget_compacts_itself(registry, clock):
+    state = {'session_id': 'a', 'chat_history': history(30), 'interpretation_done': True,
+             'charts': [{'type': 'A', 'data': pd.DataFrame({'x': range(10000)})}]}
+
+    report = manage_session_memory(state, budget=50000)
+
+    assert report['compacted'] and state['charts'] == []
+    assert report['bytes'] <= 50000
+    assert registry.stats()['bytes'] == report['bytes']
+
+
+def test_least_recently_active_sessions_are_flagged_once(registry, clock):
+    for session_id, size in [('a', 40), ('b', 20), ('c', 50)]:
+        registry.update(session_id, size)
+        clock[0] += 1
+
+    assert registry.should_compact('a')
+    assert not registry.should_compact('a')
+    assert not registry.should_compact('b') and not registry.should_compact('c')
+    assert registry.stats()['compactions'] == 1
+
+
+def test_flagged_session_compacts_on_its_next_run(registry, clock):
+    registry.high_water = 10 ** 6
+    state = {'session_id': 'a', 'charts': [{'type': 'A'}], 'interpretation_done': True}
+    assert not manage_session_memory(state)['compacted']
+    clock[0] += 1
+    registry.update('other', 10 ** 6)
+
+    assert manage_session_memory(state)['compacted']
+    assert state['charts'] == []
+
+
+def test_expired_session_releases_its_workbook(registry, shared, clock):
+    shared.put('workbooks', 'wb', object())
+    shared.acquire('workbooks', 'wb')
+    registry.update('a', 10, workbook_key='wb')
+
+    clock[0] += 61
+    registry.update('b', 10)
+
+    assert shared._entries[('workbooks', 'wb')]['refs'] == 0
+    assert not registry.touch('a')
+
+
+def test_touch_keeps_an_active_session_from_expiring(registry, shared, clock):
+    registry.update('a', 10)
+    clock[0] += 50
+    assert registry.touch('a')
+    clock[0] += 50
+    registry.update('b', 10)
+
+    assert registry.stats()['sessions'] == 2
+
+
+def test_resumed_expired_session_forgets_its_released_pin(registry, shared, clock):
+    state = {'session_id': 'a', 'workbook_key': 'wb'}
+    registry.update('a', 10, workbook_key='wb')
+    assert resume_session(state) and state['workbook_key'] == 'wb'
+
+    clock[0] += 61
+    registry.update('b', 10)
+
+    assert not resume_session(state)
+    assert state['workbook_key'] is None
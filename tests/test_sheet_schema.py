@@ -0,0 +1,80 @@
+from io import BytesIO
+
+import pandas as pd
+
+from sheet_schema import DATE_FORMATS, apply_schema, compact_frame, detect_date_format, infer_schema
+
+
+def read_sheet(df):
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        df.to_excel(writer, sheet_name='Transaksi Penjualan', index=False)
+    return pd.read_excel(BytesIO(buffer.getvalue()), sheet_name='Transaksi Penjualan')
+
+
+def test_text_dates_read_from_excel_get_their_format():
+    frame = read_sheet(pd.DataFrame({
+        'Tanggal': ['31/01/2024', '01/02/2024', '15/03/2024'],
+        'Produk': ['A', 'B', 'A'],
+        'Jumlah Terjual': [3, 5, 2],
+    }))
+
+    schema = infer_schema(frame)
+    typed = apply_schema(frame, schema)
+
+    assert schema.date_columns == {'Tanggal': '%d/%m/%Y'}
+    assert pd.api.types.is_datetime64_any_dtype(typed['Tanggal'])
+    assert typed['Tanggal'].dt.month.tolist() == [1, 2, 3]
+
+
+def test_native_excel_dates_are_recognised():
+    frame = read_sheet(pd.DataFrame({'Tanggal': pd.to_datetime(['2024-01-31', '2024-02-01']), 'Jumlah': [1, 2]}))
+
+    assert infer_schema(frame).date_columns == {'Tanggal': 'native'}
+
+
+def test_first_matching_format_wins_and_non_dates_are_rejected():
+    assert detect_date_format(pd.Series(['2024-01-31', '2024-02-01'])) == DATE_FORMATS[0]
+    assert detect_date_format(pd.Series(['A', 'B'])) is None
+    assert detect_date_format(pd.Series([1, 2])) is None
+
+
+def test_roles_of_other_columns():
+    frame = pd.DataFrame({
+        'Produk': ['A', 'B'] * 10,
+        'Catatan': [f'catatan {i}' for i in range(20)],
+        'Jumlah': range(20),
+    })
+
+    schema = infer_schema(frame)
+
+    assert schema.categorical == ['Produk']
+    assert schema.numeric == ['Jumlah']
+
+
+def test_compact_frame_categorizes_text_and_downcasts_measures():
+    frame = read_sheet(pd.DataFrame({
+        'Produk': ['A', 'B', 'C', 'A'] * 50,
+        'Metode Pembayaran': ['Tunai', 'QRIS'] * 100,
+        'Jumlah Terjual': range(200),
+        'Harga': [1500.5, 2000.25] * 100,
+    }))
+    schema = infer_schema(frame)
+
+    compacted, report = compact_frame(frame, schema)
+
+    assert isinstance(compacted['Produk'].dtype, pd.CategoricalDtype)
+    assert isinstance(compacted['Metode Pembayaran'].dtype, pd.CategoricalDtype)
+    assert compacted['Jumlah Terjual'].dtype == 'int16'
+    assert compacted['Harga'].dtype == 'float32'
+    assert report['after'] < report['before']
+    pd.testing.assert_frame_equal(compacted.astype({'Produk': str, 'Metode Pembayaran': str}), frame,
+                                  check_dtype=False)
+
+
+def test_compact_frame_keeps_inexact_floats():
+    frame = pd.DataFrame({'Pendapatan': [0.1, 0.2, 0.3]})
+
+    compacted, _ = compact_frame(frame, infer_schema(frame))
+
+    assert compacted['Pendapatan'].dtype == 'float64'
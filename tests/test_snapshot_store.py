@@ -0,0 +1,94 @@
+import os
+import time
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+import data_loader
+import snapshot_store as snapshot_module
+from snapshot_store import SnapshotStore
+from state_management import StateManager
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'streamlit_app.py')
+
+
+def workbook_bytes():
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        pd.DataFrame({'Produk': ['A', 'B', 'C'], 'Harga Produk': [1000, 2500, 4000], 'Stok': [3, 0, 7]}).to_excel(
+            writer, sheet_name='Produk', index=False)
+    return buffer.getvalue()
+
+
+class Upload(BytesIO):
+    name = 'toko.xlsx'
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = snapshot_module.snapshot_store
+    monkeypatch.setattr(store, 'root', str(tmp_path / 'snapshots'))
+    monkeypatch.setattr(data_loader, 'workbook_cache', data_loader.WorkbookCache(store=StateManager()))
+    return store
+
+
+def test_sheets_round_trip_with_their_dtypes(store):
+    content = workbook_bytes()
+    parsed = data_loader.load_data(Upload(content))['Produk']
+    key = data_loader.content_hash(content)
+
+    assert store.read_manifest(key)['sheet_names'] == ['Produk']
+    assert store.read_source(key) == content
+    loaded = store.load_sheet(key, 'Produk')
+    pd.testing.assert_frame_equal(loaded, parsed, check_like=True)
+
+
+def test_workbook_reopens_from_snapshot_without_upload(store):
+    content = workbook_bytes()
+    data_loader.load_data(Upload(content))['Produk']
+    data_loader.workbook_cache.clear()
+
+    reopened = data_loader.load_recent(data_loader.content_hash(content))
+
+    assert list(reopened) == ['Produk']
+    assert reopened['Produk']['Stok'].tolist() == [3, 0, 7]
+
+
+def test_touch_reorders_recent_but_keeps_saved_at(store):
+    store.save_source('a', b'a', 'a.xlsx', ['S'])
+    store.save_source('b', b'b', 'b.xlsx', ['S'])
+    saved_at = store.read_manifest('a')['saved_at']
+    os.utime(store._manifest_path('a'), (0, 0))
+    store.touch('a')
+
+    assert [manifest['key'] for manifest in store.recent()][0] == 'a'
+    assert store.read_manifest('a')['saved_at'] == saved_at
+
+
+def test_prune_keeps_most_recently_used(tmp_path):
+    store = SnapshotStore(root=str(tmp_path), max_entries=2)
+    for key in 'abc':
+        store.save_source(key, key.encode(), f'{key}.xlsx', ['S'])
+        time.sleep(0.01)
+
+    assert sorted(manifest['key'] for manifest in store.recent()) == ['b', 'c']
+
+
+def test_recent_file_stays_open_across_reruns(store):
+    from streamlit.testing.v1 import AppTest
+
+    content = workbook_bytes()
+    data_loader.load_data(Upload(content))
+    key = data_loader.content_hash(content)
+    # Last used long ago, so opening it changes its modification time
+    os.utime(store._manifest_path(key), (0, 0))
+
+    app = AppTest.from_file(APP_PATH, default_timeout=60)
+    app.secrets['general'] = {'API_KEY': 'test'}
+    app.run()
+    app.sidebar.selectbox[0].select(key).run()
+    [box for box in app.selectbox if box.label == "Pilih Kategori Data"][0].select('Produk').run()
+
+    assert not app.exception
+    assert any(box.label == "Pilih Kategori Data" and box.value == 'Produk' for box in app.selectbox)
@@ -0,0 +1,173 @@
+from io import BytesIO
+
+import pandas as pd
+
+import data_loader
+from aggregate_cube import AggregateCube, CubeCache
+from state_management import StateManager
+
+
+class Sized:
+    def __init__(self, size):
+        self.size = size
+
+    def memory_bytes(self):
+        return self.size
+
+
+class Counted(Sized):
+    """
+    Records how often it is measured and whether the store's lock was held meanwhile.
+    """
+
+    def __init__(self, size, store):
+        super().__init__(size)
+        self.store = store
+        self.measured = 0
+        self.measured_under_lock = False
+
+    def memory_bytes(self):
+        self.measured += 1
+        self.measured_under_lock |= self.store._lock.locked()
+        return self.size
+
+
+def keys(store, namespace):
+    return [key for ns, key in store._entries if ns == namespace]
+
+
+def test_namespace_limit_evicts_least_recently_used():
+    store = StateManager(limits={'workbooks': 2})
+    store.put('workbooks', 'a', Sized(1))
+    store.put('workbooks', 'b', Sized(1))
+    store.get('workbooks', 'a')
+    store.put('workbooks', 'c', Sized(1))
+
+    assert keys(store, 'workbooks') == ['a', 'c']
+    assert store.evictions == 1
+
+
+def test_byte_cap_evicts_across_namespaces():
+    store = StateManager(max_bytes=100)
+    store.put('workbooks', 'a', Sized(60))
+    store.put('aggregates', 'b', Sized(30))
+    store.put('aggregates', 'c', Sized(30))
+
+    assert store.get('workbooks', 'a') is None
+    assert keys(store, 'aggregates') == ['b', 'c']
+
+
+def test_pinned_entries_survive_eviction_until_released():
+    store = StateManager(max_bytes=100, limits={'workbooks': 1})
+    store.put('workbooks', 'a', Sized(80))
+    store.acquire('workbooks', 'a')
+    store.put('workbooks', 'b', Sized(80))
+
+    assert store.get('workbooks', 'a') is not None
+
+    store.release('workbooks', 'a')
+    store.put('workbooks', 'c', Sized(10))
+    assert store.get('workbooks', 'a') is None
+
+
+def test_get_or_create_calls_factory_once():
+    store = StateManager()
+    calls = []
+    for _ in range(3):
+        store.get_or_create('aggregates', 'a', lambda: calls.append(1) or Sized(1))
+
+    assert len(calls) == 1
+
+
+def test_multi_measure_cube_does_not_break_later_writes():
+    df = pd.DataFrame({
+        'Tanggal': pd.date_range('2024-01-01', periods=4),
+        'Stok Masuk': [1, 2, 3, 4],
+        'Stok Keluar': [4, 3, 2, 1],
+    })
+    store = StateManager()
+    cube = AggregateCube(df, [('Tanggal', ['Stok Masuk', 'Stok Keluar'], 'sum')])
+    store.put('aggregates', 'inventaris', cube)
+
+    store.put('interpretations', 'key', ('text', 0.0))
+
+    assert cube.memory_bytes() > 0
+    assert store.stats()['aggregates']['bytes'] == cube.memory_bytes()
+
+
+def test_unmeasurable_value_does_not_fail_writes():
+    class Broken:
+        def memory_bytes(self):
+            raise ValueError
+
+    store = StateManager(max_bytes=10 ** 6)
+    store.put('aggregates', 'broken', Broken())
+    store.put('aggregates', 'ok', Sized(1))
+
+    assert store.get('aggregates', 'ok') is not None
+
+
+def test_entries_are_measured_once_outside_the_lock():
+    store = StateManager(max_bytes=10 ** 6)
+    values = [Counted(10, store) for _ in range(50)]
+    for i, value in enumerate(values):
+        store.put('aggregates', str(i), value)
+    store.stats()
+
+    assert [value.measured for value in values] == [1] * 50
+    assert not any(value.measured_under_lock for value in values)
+    assert store.memory_bytes() == 500
+
+
+def test_running_total_follows_replace_discard_and_clear():
+    store = StateManager(max_bytes=10 ** 6)
+    store.put('interpretations', 'a', Sized(10))
+    store.put('interpretations', 'a', Sized(30), replace=True)
+    store.put('aggregates', 'b', Sized(5))
+    assert store.memory_bytes() == 35
+    assert store.memory_bytes('aggregates') == 5
+
+    store.discard('interpretations', 'a')
+    assert store.memory_bytes() == 5
+    store.clear()
+    assert store.memory_bytes() == 0
+
+
+def test_growth_reported_by_resize_triggers_eviction():
+    store = StateManager(max_bytes=100)
+    grown = Sized(10)
+    store.put('workbooks', 'old', Sized(50))
+    store.put('workbooks', 'grown', grown)
+
+    grown.size = 60
+    store.resize('workbooks', 'grown')
+
+    assert store.get('workbooks', 'old') is None
+    assert store.memory_bytes() == 60
+
+
+def test_cube_rollups_computed_later_are_counted():
+    df = pd.DataFrame({'Produk': list('ABCA'), 'Jumlah': [1, 2, 3, 4]})
+    df.attrs['sheet_key'] = 'toko:Produk'
+    store = StateManager()
+    cube = CubeCache(store=store).get(df)
+    assert store.memory_bytes() == 0
+
+    cube.rollup('Produk', 'Jumlah')
+
+    assert store.memory_bytes('aggregates') == cube.memory_bytes() > 0
+
+
+def test_workbook_sheets_parsed_later_are_counted(monkeypatch):
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        pd.DataFrame({'Produk': ['A', 'B'], 'Stok': [3, 7]}).to_excel(writer, sheet_name='Produk', index=False)
+    upload = BytesIO(buffer.getvalue())
+    store = StateManager()
+    monkeypatch.setattr(data_loader, 'workbook_cache', data_loader.WorkbookCache(store=store))
+    workbook = data_loader.load_data(upload, store=None)
+    before = store.memory_bytes()
+
+    workbook['Produk']
+
+    assert store.memory_bytes() == workbook.memory_bytes() > before
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import vis_interpret
+from aggregate_cube import CubeCache, frame_bytes
+from state_management import StateManager
+from time_index import DATE_FILTER_COLUMN, TimeIndex, TimeIndexCache
+from vis_interpret import filter_and_sort
+
+
+@pytest.fixture
+def sheet():
+    rng = np.random.default_rng(0)
+    dates = pd.Series(pd.date_range('2024-01-01', periods=60, freq='D')).sample(frac=1, random_state=1)
+    df = pd.DataFrame({
+        DATE_FILTER_COLUMN: dates.to_numpy(),
+        'Produk': rng.choice(list('ABCD'), 60),
+        'Jumlah': rng.integers(0, 5, 60),
+    })
+    df.loc[[3, 17], DATE_FILTER_COLUMN] = pd.NaT
+    df.attrs['sheet_key'] = 'toko:Transaksi'
+    return df
+
+
+@pytest.fixture(autouse=True)
+def isolated_index_cache(monkeypatch):
+    monkeypatch.setattr(vis_interpret, 'time_index_cache', TimeIndexCache())
+
+
+def expected(df, start, end, sort_by=None, ascending=True):
+    df = df.sort_values(DATE_FILTER_COLUMN, kind='stable', na_position='last')
+    df = df[(df[DATE_FILTER_COLUMN] >= start) & (df[DATE_FILTER_COLUMN] <= end)]
+    return df if sort_by is None else df.sort_values(sort_by, ascending=ascending, kind='stable')
+
+
+@pytest.mark.parametrize('sort_by, ascending', [(None, True), ('Jumlah', True), ('Jumlah', False), ('Produk', True)])
+def test_sorted_range_matches_filtering_then_sorting(sheet, sort_by, ascending):
+    index = TimeIndex(sheet, DATE_FILTER_COLUMN)
+    start, end = pd.Timestamp('2024-01-10'), pd.Timestamp('2024-02-05')
+
+    result = index.sorted_range(start, end, sort_by, ascending)
+
+    pd.testing.assert_frame_equal(result, expected(sheet, start, end, sort_by, ascending))
+
+
+def test_sorting_by_the_date_column_needs_no_sort(sheet):
+    index = TimeIndex(sheet, DATE_FILTER_COLUMN)
+
+    result = index.sorted_range('2024-01-10', '2024-01-20', DATE_FILTER_COLUMN, ascending=False)
+
+    assert result[DATE_FILTER_COLUMN].is_monotonic_decreasing
+    assert len(result) == len(expected(sheet, pd.Timestamp('2024-01-10'), pd.Timestamp('2024-01-20')))
+
+
+def test_sort_order_is_computed_once_per_column(sheet):
+    index = TimeIndex(sheet, DATE_FILTER_COLUMN)
+
+    assert index.sort_order('Jumlah') is index.sort_order('Jumlah')
+    assert index.sort_order('Jumlah', ascending=False) is not index.sort_order('Jumlah')
+
+
+def test_undated_rows_are_only_dropped_by_a_date_range(sheet):
+    index = TimeIndex(sheet, DATE_FILTER_COLUMN)
+
+    assert index.bounds() == (0, 60)
+    assert index.slice() is index.frame
+    assert index.bounds(start=index.min_date()) == (0, 58)
+    assert index.bounds(end=index.max_date()) == (0, 58)
+
+
+def test_filtered_frames_get_their_own_key(sheet):
+    unfiltered = filter_and_sort(sheet)
+    filtered = filter_and_sort(sheet, pd.Timestamp('2024-01-10'), pd.Timestamp('2024-01-20'))
+    resorted = filter_and_sort(sheet, sort_by='Jumlah')
+
+    assert unfiltered.attrs['sheet_key'] == 'toko:Transaksi'
+    assert 'filtered_from' not in unfiltered.attrs
+    assert filtered.attrs['sheet_key'] == 'toko:Transaksi@2024-01-10 00:00:00:2024-01-20 00:00:00'
+    assert filtered.attrs['filtered_from'] == 'toko:Transaksi'
+    assert len(filtered) == len(expected(sheet, pd.Timestamp('2024-01-10'), pd.Timestamp('2024-01-20')))
+    assert len(unfiltered) == len(sheet)
+    assert resorted.attrs['sheet_key'] == 'toko:Transaksi'
+    assert resorted.attrs['filtered_from'] == 'toko:Transaksi'
+
+
+def test_frames_without_a_sheet_key_are_filtered_directly(sheet):
+    start, end = pd.Timestamp('2024-01-10'), pd.Timestamp('2024-01-20')
+    sheet.attrs.clear()
+
+    result = filter_and_sort(sheet, start, end, 'Jumlah')
+
+    assert len(result) == len(expected(sheet, start, end))
+    assert result['Jumlah'].is_monotonic_increasing
+
+
+def test_cubes_of_filtered_frames_count_their_rows(sheet):
+    cubes = CubeCache(store=StateManager())
+    filtered = filter_and_sort(sheet, pd.Timestamp('2024-01-10'), pd.Timestamp('2024-01-20'))
+
+    sheet_cube = cubes.get(filter_and_sort(sheet))
+    filtered_cube = cubes.get(filtered)
+
+    assert sheet_cube is not filtered_cube
+    assert sheet_cube.memory_bytes() == 0
+    assert filtered_cube.memory_bytes() == frame_bytes(filtered)
+
+
+def test_index_cache_keeps_the_most_recently_used(sheet):
+    cache = TimeIndexCache(max_entries=1)
+    first = cache.get(sheet)
+    assert cache.get(sheet) is first
+
+    other = sheet.copy()
+    other.attrs['sheet_key'] = 'toko:Lain'
+    cache.get(other)
+
+    assert cache.get(sheet) is not first
@@ -0,0 +1,117 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Column the dashboard date-range filter applies to
+DATE_FILTER_COLUMN = 'Date'
+# Number of per-sheet indexes kept in memory, shared by all sessions
+TIME_INDEX_CACHE_SIZE = 32
+
+
+class TimeIndex:
+    """
+    Sheet rows pre-sorted by a date column, with cached sort orders for the other columns.
+
+    A date range becomes two binary searches and a positional slice (a view, not a
+    copy). Sorting by any column reuses an order computed once per column.
+
+    :param df: Sheet data.
+    :param column: Date column to index by, or None for a sheet without one.
+    """
+
+    def __init__(self, df, column=None):
+        self.column = column if column in df.columns else None
+        if self.column is not None:
+            df = df.sort_values(self.column, kind='stable', na_position='last')
+            self._dates = df[self.column].to_numpy(dtype='datetime64[ns]')
+            self._dates = self._dates[:df[self.column].notna().sum()]
+        self.frame = df
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def min_date(self):
+        return pd.Timestamp(self._dates[0]) if self.column is not None and len(self._dates) else None
+
+    def max_date(self):
+        return pd.Timestamp(self._dates[-1]) if self.column is not None and len(self._dates) else None
+
+    def bounds(self, start=None, end=None):
+        """
+        Positional bounds of the rows with ``start <= date <= end``; without either bound
+        every row is kept, including those without a date.
+        """
+        if self.column is None or (start is None and end is None):
+            return 0, len(self.frame)
+        lo = 0 if start is None else int(np.searchsorted(self._dates, pd.Timestamp(start).to_datetime64(), 'left'))
+        hi = len(self._dates) if end is None else int(np.searchsorted(self._dates, pd.Timestamp(end).to_datetime64(), 'right'))
+        return lo, max(lo, hi)
+
+    def slice(self, start=None, end=None):
+        lo, hi = self.bounds(start, end)
+        if lo == 0 and hi == len(self.frame):
+            return self.frame
+        return self.frame.iloc[lo:hi]
+
+    def sort_order(self, column, ascending=True):
+        """
+        Row positions of the indexed frame ordered by ``column``, computed once per column.
+        """
+        key = (column, ascending)
+        order = self._orders.get(key)
+        if order is None:
+            order = (self.frame[column].reset_index(drop=True)
+                     .sort_values(ascending=ascending, kind='stable').index.to_numpy())
+            with self._lock:
+                self._orders[key] = order
+        return order
+
+    def sorted_range(self, start=None, end=None, sort_by=None, ascending=True):
+        """
+        Rows within the date range, ordered by ``sort_by``.
+        """
+        lo, hi = self.bounds(start, end)
+        if sort_by is None:
+            return self.slice(start, end)
+        if sort_by == self.column:
+            view = self.frame.iloc[lo:hi]
+            return view if ascending else view.iloc[::-1]
+        order = self.sort_order(sort_by, ascending)
+        if lo > 0 or hi < len(self.frame):
+            order = order[(order >= lo) & (order < hi)]
+        return self.frame.take(order)
+
+
+class TimeIndexCache:
+    """
+    LRU of time indexes keyed by the ``sheet_key`` attribute of sheet frames.
+    """
+
+    def __init__(self, max_entries: int = TIME_INDEX_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, df, column=DATE_FILTER_COLUMN):
+        """
+        :return: The index of ``df``, or None if ``df`` was not loaded through data_loader.
+        """
+        key = df.attrs.get('sheet_key')
+        if key is None:
+            return None
+        with self._lock:
+            index = self._indexes.get((key, column))
+            if index is not None:
+                self._indexes.move_to_end((key, column))
+                return index
+        index = TimeIndex(df, column)
+        with self._lock:
+            index = self._indexes.setdefault((key, column), index)
+            self._indexes.move_to_end((key, column))
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        return index
+
+
+time_index_cache = TimeIndexCache()
@@ -11,10 +11,28 @@ from PIL import Image
 import plotly.express as px
 import pandas as pd
 import streamlit as st
+import hashlib
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from aggregate_cube import cube_cache
+from chart_payload import serialize_chart_data
+from chart_registry import measure_columns, sheet_has_filters, sheet_rollups, valid_chart_specs
+from chart_renderer import chart_renderer
+from data_loader import data_fingerprint
+from downsample import prepare_plot_data
+from figure_cache import figure_cache, figure_key
+from interpretation_cache import interpretation_cache, interpretation_key
+from sheet_schema import detect_date_format, parse_dates
+from time_index import DATE_FILTER_COLUMN, time_index_cache
 
 def add_date_picker(df):
-    min_date = df['Date'].min()
-    max_date = df['Date'].max()
+    index = time_index_cache.get(df)
+    if index is not None:
+        min_date, max_date = index.min_date(), index.max_date()
+    else:
+        min_date = df[DATE_FILTER_COLUMN].min()
+        max_date = df[DATE_FILTER_COLUMN].max()
     start_date, end_date = st.date_input("Select date range", [min_date, max_date])
     return start_date, end_date
 
@@ -24,31 +42,63 @@ def add_sort_buttons(df):
     sort_order = st.radio("Sort Order", ("Ascending", "Descending"))
     return sort_order, sort_by
 
+# Function to filter rows to a date range and sort them; sheets loaded through data_loader
+# use their time index, so the filter is a binary-search slice and sort orders are reused
+def filter_and_sort(df, start_date=None, end_date=None, sort_by=None, ascending=True):
+    index = time_index_cache.get(df)
+    if index is not None:
+        sheet_key = df.attrs['sheet_key']
+        df = index.sorted_range(start_date, end_date, sort_by, ascending)
+        if start_date is not None or end_date is not None:
+            # The filtered rows need their own aggregate cube
+            df.attrs['sheet_key'] = f"{sheet_key}@{start_date}:{end_date}"
+        if df is not index.frame:
+            # The rows are a copy or slice held by whatever caches this frame, not by the workbook
+            df.attrs['filtered_from'] = sheet_key
+        return df
+
+    if DATE_FILTER_COLUMN in df.columns and (start_date is not None or end_date is not None):
+        df = df[(df[DATE_FILTER_COLUMN] >= pd.to_datetime(start_date)) & (df[DATE_FILTER_COLUMN] <= pd.to_datetime(end_date))]
+    if sort_by is not None:
+        df = df.sort_values(by=sort_by, ascending=ascending)
+    return df
+
 def add_date_and_sorting_options(df):
-    if 'Date' in df.columns:
+    start_date, end_date = None, None
+    if DATE_FILTER_COLUMN in df.columns:
         start_date, end_date = add_date_picker(df)
-        df = df[(df['Date'] >= pd.to_datetime(start_date)) & (df['Date'] <= pd.to_datetime(end_date))]
 
     sort_order, sort_by = add_sort_buttons(df)
 
-    if sort_order == 'Ascending':
-        df = df.sort_values(by=sort_by, ascending=True)
-    else:
-        df = df.sort_values(by=sort_by, ascending=False)
-
-    return df
+    return filter_and_sort(df, start_date, end_date, sort_by, sort_order == 'Ascending')
 
 # Function to save Plotly figure as an image and load it using PIL
-def fig_to_pil_image(fig):
-    buf = BytesIO()
-    fig.write_image(buf, format='png')
-    buf.seek(0)
-    image = Image.open(buf)
-    return image
-
-# Function to interpret chart data using Gemini
-def interpret_chart(sheet_name, charts, model):
-    general_prompt = (
+def fig_to_pil_image(fig, key=None):
+    return Image.open(BytesIO(chart_renderer.render(fig, key)))
+
+# Function to render several figures in one pass through the shared renderer
+def figs_to_pil_images(figs):
+    return [Image.open(BytesIO(png)) for png in chart_renderer.render_many(figs)]
+
+# Maximum number of Gemini requests in flight for the charts of one selection
+INTERPRET_CONCURRENCY = int(os.environ.get('INTERPRET_CONCURRENCY', '4'))
+
+# How each Plotly trace type is sent to the model: 'data' sends the aggregated frame behind
+# the chart as compact text, 'image' rasterizes the figure with kaleido
+DEFAULT_INTERPRETATION_MODE = os.environ.get('INTERPRETATION_MODE', 'data')
+INTERPRETATION_MODES = {
+    'bar': DEFAULT_INTERPRETATION_MODE,
+    'pie': DEFAULT_INTERPRETATION_MODE,
+    'scatter': DEFAULT_INTERPRETATION_MODE,
+    'histogram': DEFAULT_INTERPRETATION_MODE,
+    'sunburst': DEFAULT_INTERPRETATION_MODE,
+}
+
+# Bump whenever the interpretation prompt changes so cached interpretations are regenerated
+PROMPT_VERSION = 2
+
+def build_general_prompt(sheet_name):
+    return (
         f"""
         Kamu adalah seorang data analyst dan business intelligence handal dan profesional. Tugas Kamu adalah menginterpretasikan data 
         penjualan UMKM dari sheet {sheet_name}. Gunakan bahasa yang santai, mudah dipahami, friendly untuk pemula hingga ahli, dan tetap berfokus pada konteks bisnis.
@@ -61,446 +111,317 @@ def interpret_chart(sheet_name, charts, model):
         Berikut adalah visualisasi yang tersedia:
         """
     )
-    
-    chart_prompts = []
-    for chart in charts:
-        chart_image = fig_to_pil_image(chart['figure'])
-        chart_prompt = f"Tipe Visualisasi: {chart['type']}. Interpretasikan data berikut:"
-        combined_prompt = f"{general_prompt}\n{chart_prompt}"
-        response = model.generate_content([combined_prompt, chart_image])
+
+# Function to get the Plotly trace type of a chart, e.g. 'bar' or 'pie'
+def chart_kind(chart):
+    figure = chart_figure(chart)
+    return figure.data[0].type if figure.data else 'empty'
+
+# Function to choose how a chart is sent to the model: as its aggregated data or as an image
+def interpretation_mode(chart):
+    if chart.get('data') is None:
+        return 'image'
+    return INTERPRETATION_MODES.get(chart_kind(chart), DEFAULT_INTERPRETATION_MODE)
+
+# Function to build the interpretation cache key of a chart
+def chart_cache_key(sheet_name, business_info, chart):
+    if chart.get('data') is not None:
+        data_hash = data_fingerprint(chart['data'])
+    else:
+        data_hash = hashlib.sha256(chart['figure'].to_json().encode('utf-8')).hexdigest()
+    chart_type = f"{chart_kind(chart)}:{interpretation_mode(chart)}"
+    return interpretation_key(sheet_name, business_info or chart['type'], chart_type, data_hash, PROMPT_VERSION)
+
+# Function to build the Gemini request contents for a chart, falling back to an image of the figure
+def build_chart_contents(general_prompt, chart):
+    if interpretation_mode(chart) == 'data':
+        try:
+            measures = measure_columns(chart['spec']) if chart.get('spec') is not None else None
+            payload = serialize_chart_data(chart['data'], measures=measures)
+        except Exception:
+            payload = None
+        if payload is not None:
+            chart_prompt = (
+                f"Tipe Visualisasi: {chart['type']} (grafik {chart_kind(chart)}). "
+                f"Interpretasikan data berikut (format CSV):\n{payload}"
+            )
+            return [f"{general_prompt}\n{chart_prompt}"]
+    chart_image = fig_to_pil_image(chart_figure(chart), chart.get('key'))
+    chart_prompt = f"Tipe Visualisasi: {chart['type']}. Interpretasikan data berikut:"
+    return [f"{general_prompt}\n{chart_prompt}", chart_image]
+
+# Function to rasterize every image-mode chart still needing an interpretation in a single pass,
+# so the concurrent per-chart requests find their PNGs in the render cache
+def prerender_chart_images(sheet_name, charts, business_info=None):
+    pending = [
+        chart for chart in charts
+        if interpretation_mode(chart) == 'image'
+        and not interpretation_cache.contains(chart_cache_key(sheet_name, business_info, chart))
+    ]
+    if pending:
+        for chart in pending:
+            if chart.get('key') is None:
+                chart['key'] = chart_renderer.figure_key(chart['figure'])
+        chart_renderer.render_many([chart_figure(chart) for chart in pending], [chart['key'] for chart in pending])
+
+# Function to interpret a single chart, reusing a cached interpretation when available
+def interpret_single_chart(sheet_name, chart, model, business_info=None, general_prompt=None):
+    key = chart_cache_key(sheet_name, business_info, chart)
+    chart_description = interpretation_cache.get(key)
+    if chart_description is None:
+        general_prompt = general_prompt or build_general_prompt(sheet_name)
+        response = model.generate_content(build_chart_contents(general_prompt, chart))
         chart_description = response.text.strip()
-        chart_prompts.append(chart_description)
-    
+        interpretation_cache.set(key, chart_description)
+    return chart_description
+
+# Function to stream the interpretation of a single chart as text chunks arrive from Gemini
+def stream_single_chart(sheet_name, chart, model, business_info=None, general_prompt=None):
+    key = chart_cache_key(sheet_name, business_info, chart)
+    chart_description = interpretation_cache.get(key)
+    if chart_description is not None:
+        yield chart_description
+        return
+    general_prompt = general_prompt or build_general_prompt(sheet_name)
+    parts = []
+    for chunk in model.generate_content(build_chart_contents(general_prompt, chart), stream=True):
+        parts.append(chunk.text)
+        yield chunk.text
+    interpretation_cache.set(key, "".join(parts).strip())
+
+# Start of the note that replaces the interpretation of a chart whose request failed
+CHART_ERROR_PREFIX = "⚠️ Interpretasi untuk visualisasi"
+
+def _chart_error_message(idx, chart, error):
+    return f"{CHART_ERROR_PREFIX} {idx + 1} ({chart['type']}) gagal dibuat: {error}"
+
+def _pump_chunks(chunks, output):
+    try:
+        for chunk in chunks:
+            output.put(('chunk', chunk))
+        output.put(('done', None))
+    except Exception as e:
+        output.put(('error', e))
+
+# Function to stream the interpretation of all charts in order while their requests run concurrently
+def stream_interpretation(sheet_name, charts, model, business_info=None, max_concurrency=None):
+    general_prompt = build_general_prompt(sheet_name)
+    max_concurrency = max(1, min(max_concurrency or INTERPRET_CONCURRENCY, len(charts) or 1))
+    prerender_chart_images(sheet_name, charts, business_info)
+    queues = [queue.Queue() for _ in charts]
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    try:
+        for chart, output in zip(charts, queues):
+            chunks = stream_single_chart(sheet_name, chart, model, business_info, general_prompt)
+            executor.submit(_pump_chunks, chunks, output)
+
+        # Failures are held back until another chart succeeds, so that a run where
+        # every chart failed can still raise instead of yielding only warnings
+        errors, pending, succeeded = [], [], False
+        for idx, (chart, output) in enumerate(zip(charts, queues)):
+            started = False
+            while True:
+                kind, payload = output.get()
+                if kind == 'chunk':
+                    if not started:
+                        lead = [""] + pending if succeeded else pending
+                        if lead:
+                            yield "\n\n".join(lead + [""])
+                        pending, started, succeeded = [], True, True
+                    yield payload
+                elif kind == 'done':
+                    break
+                else:
+                    errors.append(payload)
+                    if succeeded:
+                        yield "\n\n" + _chart_error_message(idx, chart, payload)
+                    else:
+                        pending.append(_chart_error_message(idx, chart, payload))
+                    break
+        if charts and not succeeded:
+            raise errors[0]
+    finally:
+        executor.shutdown(wait=False)
+
+# Function to interpret chart data using Gemini, one concurrent request per chart.
+# With stream=True a generator of text chunks is returned instead of the full text.
+def interpret_chart(sheet_name, charts, model, business_info=None, max_concurrency=None, stream=False):
+    if stream:
+        return stream_interpretation(sheet_name, charts, model, business_info, max_concurrency)
+
+    general_prompt = build_general_prompt(sheet_name)
+    max_concurrency = max(1, min(max_concurrency or INTERPRET_CONCURRENCY, len(charts) or 1))
+    prerender_chart_images(sheet_name, charts, business_info)
+
+    results = [None] * len(charts)
+    errors = [None] * len(charts)
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {
+            executor.submit(interpret_single_chart, sheet_name, chart, model, business_info, general_prompt): idx
+            for idx, chart in enumerate(charts)
+        }
+        for future, idx in futures.items():
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                errors[idx] = e
+
+    # One failed chart must not discard the others; only give up when every chart failed
+    if charts and all(error is not None for error in errors):
+        raise errors[0]
+    chart_prompts = [
+        result if errors[idx] is None else _chart_error_message(idx, charts[idx], errors[idx])
+        for idx, result in enumerate(results)
+    ]
     return "\n\n".join(chart_prompts)
 
+# Function to make sure date columns are datetimes. Sheets loaded through data_loader are
+# already typed, so this only parses columns the schema could not type, and never in place
 def convert_to_date(df, columns):
-    for col in columns:
-        if (col in df.columns) and (df[col].dtype != 'datetime64[ns]'):
-            df[col] = pd.to_datetime(df[col], errors='coerce')
+    pending = [col for col in columns if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col])]
+    if not pending:
+        return df
+    df = df.copy()
+    for col in pending:
+        fmt = detect_date_format(df[col])
+        df[col] = parse_dates(df[col], fmt) if fmt else pd.to_datetime(df[col], errors='coerce')
     return df
 
-def visualize_pelanggan(df, selected_business_info, model):
-    df = convert_to_date(df, ['Tanggal'])
-    df = add_date_and_sorting_options(df)
+# Plotly Express function for each chart kind used in the registry
+PLOTTERS = {
+    'bar': px.bar,
+    'pie': px.pie,
+    'line': px.line,
+    'histogram': px.histogram,
+    'sunburst': px.sunburst,
+}
+
+# How line charts are drawn: 'auto' uses WebGL traces (Scattergl) above WEBGL_POINT_THRESHOLD
+# points across all series and SVG otherwise; 'svg' and 'webgl' force one mode. The default
+# threshold is Plotly Express's own auto cut-off (1000 rows), so a chart never draws as SVG
+# where Plotly would have used WebGL, and it sits below the per-series downsampling cap
+# (downsample.MAX_POINTS) so single-series trends can still reach it
+RENDER_MODE = os.environ.get('CHART_RENDER_MODE', 'auto')
+WEBGL_POINT_THRESHOLD = int(os.environ.get('WEBGL_POINT_THRESHOLD', '1000'))
+# Chart kinds whose Plotly Express function takes render_mode; bars and pies have no WebGL trace
+WEBGL_KINDS = ('line', 'scatter')
+
+# Function to choose SVG or WebGL for a chart from its kind and the number of points it draws
+def chart_render_mode(kind, point_count, render_mode=None):
+    render_mode = render_mode or RENDER_MODE
+    if kind not in WEBGL_KINDS:
+        return 'svg'
+    if render_mode == 'auto':
+        return 'webgl' if point_count > WEBGL_POINT_THRESHOLD else 'svg'
+    return render_mode
+
+# Function to get the aggregate cube of a sheet with every rollup its columns allow precomputed
+def sheet_cube(df, sheet_name):
+    return cube_cache.get(df, sheet_rollups(sheet_name, tuple(df.columns)))
+
+# Function to draw a registry chart from its (downsampled) data
+def plot_chart(spec, plot_data, render_mode):
+    figure_kwargs = dict(spec['figure'], render_mode=render_mode) if spec['kind'] in WEBGL_KINDS else spec['figure']
+    return PLOTTERS[spec['kind']](data_frame=plot_data, **figure_kwargs)
+
+# Function to get the figure of a chart. Charts kept without their figure (see session_memory)
+# are redrawn from their spec and data, through the figure cache so this is usually a lookup
+def chart_figure(chart):
+    figure = chart.get('figure')
+    if figure is not None or chart.get('spec') is None or chart.get('data') is None:
+        return figure
+    return figure_cache.get_or_build(
+        chart['key'], lambda: plot_chart(chart['spec'], prepare_plot_data(chart['data'], chart['spec'])[0],
+                                         chart.get('render_mode', 'svg')))
+
+# Function to build the charts registered for a sheet and business option. 'data' keeps the full
+# aggregate for interpretation; the figure is drawn from a downsampled copy bounded in size
+def build_charts(df, sheet_name, selected_business_info, render_mode=None):
+    specs = valid_chart_specs(sheet_name, selected_business_info, tuple(df.columns))
+    if not specs:
+        return []
+    cube = sheet_cube(df, sheet_name)
     charts = []
-
-    if selected_business_info == 'Analisis demografi pelanggan':
-        if 'Jenis Kelamin Pelanggan' in df.columns:
-            gender_counts = df['Jenis Kelamin Pelanggan'].value_counts().reset_index()
-            gender_counts.columns = ['Jenis Kelamin Pelanggan', 'Jumlah']
-            charts.append({
-                'type': 'Analisis demografi pelanggan',
-                'figure': px.bar(data_frame=gender_counts, 
-                                 x='Jenis Kelamin Pelanggan', 
-                                 y='Jumlah', 
-                                 labels={'Jenis Kelamin Pelanggan': 'Jenis Kelamin Pelanggan', 'Jumlah': 'Jumlah'})
-            })
-        if 'Umur Pelanggan' in df.columns:
-            age_counts = df['Umur Pelanggan'].value_counts().reset_index()
-            age_counts.columns = ['Umur Pelanggan', 'Jumlah']
-            charts.append({
-                'type': 'Analisis demografi pelanggan',
-                'figure': px.bar(data_frame=age_counts, 
-                                 x='Umur Pelanggan', 
-                                 y='Jumlah', 
-                                 labels={'Umur Pelanggan': 'Umur Pelanggan', 'Jumlah': 'Jumlah'})
-            })
-        if 'Segmentasi Pelanggan' in df.columns:
-            segmentation_counts = df['Segmentasi Pelanggan'].value_counts().reset_index()
-            segmentation_counts.columns = ['Segmentasi Pelanggan', 'Jumlah']
-            charts.append({
-                'type': 'Analisis demografi pelanggan',
-                'figure': px.pie(data_frame=segmentation_counts, 
-                                 names='Segmentasi Pelanggan', 
-                                 values='Jumlah')
-            })
-
-    elif selected_business_info == 'Distribusi usia dan jenis kelamin pelanggan':
-        if 'Umur Pelanggan' in df.columns and 'Jenis Kelamin Pelanggan' in df.columns:
-            age_gender_counts = df.groupby(['Umur Pelanggan', 'Jenis Kelamin Pelanggan']).size().reset_index(name='Jumlah')
-            charts.append({
-                'type': 'Distribusi usia dan jenis kelamin pelanggan',
-                'figure': px.histogram(data_frame=age_gender_counts, 
-                                       x='Umur Pelanggan', 
-                                       y='Jumlah', 
-                                       color='Jenis Kelamin Pelanggan', 
-                                       barmode='group')
-            })
-
-    elif selected_business_info == 'Segmentasi pelanggan berdasarkan preferensi':
-        if 'Preferensi Pembelian' in df.columns and 'Segmentasi Pelanggan' in df.columns:
-            pref_segment_counts = df.groupby(['Preferensi Pembelian', 'Segmentasi Pelanggan']).size().reset_index(name='Jumlah')
-            charts.append({
-                'type': 'Segmentasi pelanggan berdasarkan preferensi',
-                'figure': px.sunburst(data_frame=pref_segment_counts, 
-                                      path=['Preferensi Pembelian', 'Segmentasi Pelanggan'], 
-                                      values='Jumlah')
-            })
-
-    interpretation = interpret_chart('Pelanggan', charts, model)
-    return charts, interpretation
-
-def visualize_produk(df, selected_business_info, model):
+    for spec in specs:
+        dims, measure, how = spec['rollup']
+        data = cube.rollup(dims, measure, how, name=spec['name'])
+        plot_data, downsampling = prepare_plot_data(data, spec)
+        y = spec['figure'].get('y')
+        point_count = len(plot_data) * (len(y) if isinstance(y, list) else 1)
+        mode = chart_render_mode(spec['kind'], point_count, render_mode)
+        key = figure_key(spec, plot_data, mode)
+        charts.append({
+            'type': spec['option'],
+            'key': key,
+            'spec': spec,
+            'data': data,
+            'figure': figure_cache.get_or_build(key, lambda spec=spec, plot_data=plot_data, mode=mode:
+                                                plot_chart(spec, plot_data, mode)),
+            'downsampling': downsampling,
+            'render_mode': mode,
+        })
+    return charts
+
+# Function to build the charts of a sheet for the selected business option, with its filters applied.
+# With interactive=False (headless runs) no filter widgets are shown and the whole sheet is charted
+def visualize_sheet_charts(sheet_name, df, selected_business_info, interactive=True):
     df = convert_to_date(df, ['Tanggal'])
-    df = add_date_and_sorting_options(df)
-    charts = []
-
-    if selected_business_info == 'Kinerja penjualan produk dan stok':
-        if 'Produk' in df.columns and 'Jumlah Terjual' in df.columns:
-            product_sales = df.groupby('Produk')['Jumlah Terjual'].sum().reset_index()
-            charts.append({
-                'type': 'Kinerja penjualan produk dan stok',
-                'figure': px.bar(data_frame=product_sales, 
-                                 x='Produk', 
-                                 y='Jumlah Terjual', 
-                                 labels={'Produk': 'Produk', 'Jumlah Terjual': 'Jumlah Terjual'})
-            })
-    elif selected_business_info == 'Distribusi penjualan berdasarkan kategori produk':
-        if 'Kategori Produk' in df.columns and 'Jumlah Terjual' in df.columns:
-            category_sales = df.groupby('Kategori Produk')['Jumlah Terjual'].sum().reset_index()
-            charts.append({
-                'type': 'Distribusi penjualan berdasarkan kategori produk',
-                'figure': px.pie(data_frame=category_sales, 
-                                 names='Kategori Produk', 
-                                 values='Jumlah Terjual')
-            })
-
-    elif selected_business_info == 'Analisis harga produk dan trend penjualan':
-        if 'Tanggal' in df.columns and 'Harga Produk' in df.columns and 'Jumlah Terjual' in df.columns:
-            price_trends = df.groupby(['Tanggal', 'Harga Produk'])['Jumlah Terjual'].sum().reset_index()
-            charts.append({
-                'type': 'Analisis harga produk dan trend penjualan',
-                'figure': px.line(data_frame=price_trends, 
-                                  x='Tanggal', 
-                                  y='Jumlah Terjual', 
-                                  color='Harga Produk', 
-                                  labels={'Tanggal': 'Tanggal', 'Jumlah Terjual': 'Jumlah Terjual', 'Harga Produk': 'Harga Produk'})
-            })
-
-    interpretation = interpret_chart('Produk', charts, model)
+    if interactive and sheet_has_filters(sheet_name):
+        df = add_date_and_sorting_options(df)
+    return build_charts(df, sheet_name, selected_business_info)
+
+# Function to visualize a sheet for the selected business option and interpret the charts
+def visualize_sheet(sheet_name, df, selected_business_info, model, stream=False, interactive=True):
+    charts = visualize_sheet_charts(sheet_name, df, selected_business_info, interactive)
+    interpretation = interpret_chart(sheet_name, charts, model, selected_business_info, stream=stream)
     return charts, interpretation
 
-def visualize_transaksi_penjualan(df, selected_business_info, model):
-    df = convert_to_date(df, ['Tanggal'])
-    df = add_date_and_sorting_options(df)
-    charts = []
+def visualize_pelanggan(df, selected_business_info, model, stream=False, interactive=True):
+    return visualize_sheet('Pelanggan', df, selected_business_info, model, stream, interactive)
 
-    if selected_business_info == 'Jumlah penjualan, pendapatan, dan metode pembayaran':
-        if 'Metode Pembayaran' in df.columns and 'Pendapatan' in df.columns:
-            payment_sales = df.groupby('Metode Pembayaran')['Pendapatan'].sum().reset_index()
-            charts.append({
-                'type': 'Jumlah penjualan, pendapatan, dan metode pembayaran',
-                'figure': px.bar(data_frame=payment_sales, 
-                                 x='Metode Pembayaran', 
-                                 y='Pendapatan', 
-                                 labels={'Metode Pembayaran': 'Metode Pembayaran', 'Pendapatan': 'Pendapatan'})
-            })
-
-    elif selected_business_info == 'Tren penjualan':
-        if 'Tanggal' in df.columns and 'Pendapatan' in df.columns:
-            daily_trends = df.groupby('Tanggal')['Pendapatan'].sum().reset_index()
-            charts.append({
-                'type': 'Tren penjualan',
-                'figure': px.line(data_frame=daily_trends, 
-                                  x='Tanggal', 
-                                  y='Pendapatan', 
-                                  labels={'Tanggal': 'Tanggal', 'Pendapatan': 'Pendapatan'})
-            })
-
-    elif selected_business_info == 'Penjualan berdasarkan channel dan produk':
-        if 'Channel Penjualan' in df.columns and 'Produk' in df.columns and 'Jumlah Terjual' in df.columns:
-            channel_product_sales = df.groupby(['Channel Penjualan', 'Produk'])['Jumlah Terjual'].sum().reset_index()
-            charts.append({
-                'type': 'Penjualan berdasarkan channel dan produk',
-                'figure': px.histogram(data_frame=channel_product_sales, 
-                                       x='Channel Penjualan', 
-                                       y='Jumlah Terjual', 
-                                       color='Produk', 
-                                       barmode='group', 
-                                       labels={'Channel Penjualan': 'Channel Penjualan', 'Jumlah Terjual': 'Jumlah Terjual'})
-            })
-
-    interpretation = interpret_chart('Transaksi Penjualan', charts, model)
-    return charts, interpretation
+def visualize_produk(df, selected_business_info, model, stream=False, interactive=True):
+    return visualize_sheet('Produk', df, selected_business_info, model, stream, interactive)
 
+def visualize_transaksi_penjualan(df, selected_business_info, model, stream=False, interactive=True):
+    return visualize_sheet('Transaksi Penjualan', df, selected_business_info, model, stream, interactive)
 
-def visualize_lokasi_penjualan(df, selected_business_info, model):
-    df = convert_to_date(df, ['Tanggal'])
-    charts = []
+def visualize_lokasi_penjualan(df, selected_business_info, model, stream=False, interactive=True):
+    return visualize_sheet('Lokasi Penjualan', df, selected_business_info, model, stream, interactive)
 
-    if selected_business_info == 'Kinerja penjualan di berbagai lokasi':
-        if 'Lokasi' in df.columns and 'Jumlah Terjual' in df.columns:
-            location_sales = df.groupby('Lokasi')['Jumlah Terjual'].sum().reset_index()
-            charts.append({
-                'type': 'Kinerja penjualan di berbagai lokasi',
-                'figure': px.bar(data_frame=location_sales, 
-                                 x='Lokasi', 
-                                 y='Jumlah Terjual', 
-                                 labels={'Lokasi': 'Lokasi', 'Jumlah Terjual': 'Jumlah Terjual'})
-            })
-
-    elif selected_business_info == 'Distribusi penjualan berdasarkan kota/provinsi':
-        if 'Kota/Provinsi' in df.columns and 'Jumlah Terjual' in df.columns:
-            city_sales = df.groupby('Kota/Provinsi')['Jumlah Terjual'].sum().reset_index()
-            charts.append({
-                'type': 'Distribusi penjualan berdasarkan kota/provinsi',
-                'figure': px.pie(data_frame=city_sales, 
-                                 names='Kota/Provinsi', 
-                                 values='Jumlah Terjual')
-            })
-
-    elif selected_business_info == 'Analisis lokasi dengan penjualan tertinggi/rendah':
-        if 'Lokasi' in df.columns and 'Jumlah Terjual' in df.columns:
-            location_sales = df.groupby('Lokasi')['Jumlah Terjual'].sum().reset_index()
-            charts.append({
-                'type': 'Analisis lokasi dengan penjualan tertinggi/rendah',
-                'figure': px.bar(data_frame=location_sales, 
-                                 x='Lokasi', 
-                                 y='Jumlah Terjual', 
-                                 labels={'Lokasi': 'Lokasi', 'Jumlah Terjual': 'Jumlah Terjual'})
-            })
-
-    interpretation = interpret_chart('Lokasi Penjualan', charts, model)
-    return charts, interpretation
+def visualize_staf_penjualan(df, selected_business_info, model, stream=False, interactive=True):
+    return visualize_sheet('Staf Penjualan', df, selected_business_info, model, stream, interactive)
 
-def visualize_staf_penjualan(df, selected_business_info, model):
-    df = convert_to_date(df, ['Tanggal'])
-    charts = []
+def visualize_inventaris(df, selected_business_info, model, stream=False, interactive=True):
+    return visualize_sheet('Inventaris', df, selected_business_info, model, stream, interactive)
 
-    if selected_business_info == 'Kinerja dan komisi staf penjualan':
-        if 'Staf' in df.columns and 'Komisi' in df.columns:
-            staff_commissions = df.groupby('Staf')['Komisi'].sum().reset_index()
-            charts.append({
-                'type': 'Kinerja dan komisi staf penjualan',
-                'figure': px.bar(data_frame=staff_commissions, 
-                                 x='Staf', 
-                                 y='Komisi', 
-                                 labels={'Staf': 'Staf', 'Komisi': 'Komisi'})
-            })
-
-    elif selected_business_info == 'Analisis penilaian kinerja staf':
-        if 'Staf' in df.columns and 'Penilaian Kinerja' in df.columns:
-            staff_performance = df.groupby('Staf')['Penilaian Kinerja'].mean().reset_index()
-            charts.append({
-                'type': 'Analisis penilaian kinerja staf',
-                'figure': px.bar(data_frame=staff_performance, 
-                                 x='Staf', 
-                                 y='Penilaian Kinerja', 
-                                 labels={'Staf': 'Staf', 'Penilaian Kinerja': 'Penilaian Kinerja'})
-            })
-
-    elif selected_business_info == 'Distribusi staf berdasarkan posisi/jabatan':
-        if 'Posisi/Jabatan' in df.columns and 'Staf' in df.columns:
-            position_counts = df['Posisi/Jabatan'].value_counts().reset_index()
-            position_counts.columns = ['Posisi/Jabatan', 'Jumlah Staf']
-            charts.append({
-                'type': 'Distribusi staf berdasarkan posisi/jabatan',
-                'figure': px.pie(data_frame=position_counts, 
-                                 names='Posisi/Jabatan', 
-                                 values='Jumlah Staf')
-            })
-
-    interpretation = interpret_chart('Staf Penjualan', charts, model)
-    return charts, interpretation
+def visualize_promosi_pemasaran(df, selected_business_info, model, stream=False, interactive=True):
+    return visualize_sheet('Promosi dan Pemasaran', df, selected_business_info, model, stream, interactive)
 
-def visualize_inventaris(df, selected_business_info, model):
-    df = convert_to_date(df, ['Tanggal'])
-    charts = []
-
-    if selected_business_info == 'Manajemen stok produk':
-        if 'Produk' in df.columns and 'Stok' in df.columns:
-            stock_management = df.groupby('Produk')['Stok'].sum().reset_index()
-            charts.append({
-                'type': 'Manajemen stok produk',
-                'figure': px.bar(data_frame=stock_management, 
-                                 x='Produk', 
-                                 y='Stok', 
-                                 labels={'Produk': 'Produk', 'Stok': 'Stok'})
-            })
-
-    elif selected_business_info == 'Tren stok masuk dan keluar':
-        if 'Tanggal' in df.columns and 'Stok Masuk' in df.columns and 'Stok Keluar' in df.columns:
-            stock_trends = df.groupby('Tanggal')[['Stok Masuk', 'Stok Keluar']].sum().reset_index()
-            charts.append({
-                'type': 'Tren stok masuk dan keluar',
-                'figure': px.line(data_frame=stock_trends, 
-                                  x='Tanggal', 
-                                  y=['Stok Masuk', 'Stok Keluar'], 
-                                  labels={'Tanggal': 'Tanggal', 'value': 'Jumlah'})
-            })
-
-    elif selected_business_info == 'Analisis produk dengan stok terbanyak/terkecil':
-        if 'Produk' in df.columns and 'Stok' in df.columns:
-            stock_analysis = df.groupby('Produk')['Stok'].sum().reset_index()
-            charts.append({
-                'type': 'Analisis produk dengan stok terbanyak/terkecil',
-                'figure': px.bar(data_frame=stock_analysis, 
-                                 x='Produk', 
-                                 y='Stok', 
-                                 labels={'Produk': 'Produk', 'Stok': 'Stok'})
-            })
-
-    interpretation = interpret_chart('Inventaris', charts, model)
-    return charts, interpretation
-
-def visualize_promosi_pemasaran(df, selected_business_info, model):
-    df = convert_to_date(df, ['Tanggal'])
-    charts = []
-
-    if selected_business_info == 'Efektivitas kampanye promosi':
-        if 'Kampanye Promosi' in df.columns and 'Jumlah Terjual' in df.columns:
-            campaign_effectiveness = df.groupby('Kampanye Promosi')['Jumlah Terjual'].sum().reset_index()
-            charts.append({
-                'type': 'Efektivitas kampanye promosi',
-                'figure': px.bar(data_frame=campaign_effectiveness, 
-                                 x='Kampanye Promosi', 
-                                 y='Jumlah Terjual', 
-                                 labels={'Kampanye Promosi': 'Kampanye Promosi', 'Jumlah Terjual': 'Jumlah Terjual'})
-            })
-
-    elif selected_business_info == 'Distribusi penjualan berdasarkan media promosi':
-        if 'Media Promosi' in df.columns and 'Jumlah Terjual' in df.columns:
-            media_sales = df.groupby('Media Promosi')['Jumlah Terjual'].sum().reset_index()
-            charts.append({
-                'type': 'Distribusi penjualan berdasarkan media promosi',
-                'figure': px.pie(data_frame=media_sales, 
-                                 names='Media Promosi', 
-                                 values='Jumlah Terjual')
-            })
-
-    elif selected_business_info == 'Analisis kode diskon promosi':
-        if 'Kode Diskon' in df.columns and 'Jumlah Terjual' in df.columns:
-            discount_analysis = df.groupby('Kode Diskon')['Jumlah Terjual'].sum().reset_index()
-            charts.append({
-                'type': 'Analisis kode diskon promosi',
-                'figure': px.bar(data_frame=discount_analysis, 
-                                 x='Kode Diskon', 
-                                 y='Jumlah Terjual', 
-                                 labels={'Kode Diskon': 'Kode Diskon', 'Jumlah Terjual': 'Jumlah Terjual'})
-            })
-
-    interpretation = interpret_chart('Promosi dan Pemasaran', charts, model)
-    return charts, interpretation
-
-def visualize_feedback_pengembalian(df, selected_business_info, model):
-    df = convert_to_date(df, ['Tanggal'])
-    charts = []
+def visualize_feedback_pengembalian(df, selected_business_info, model, stream=False, interactive=True):
+    return visualize_sheet('Feedback dan Pengembalian', df, selected_business_info, model, stream, interactive)
 
-    if selected_business_info == 'Masalah dan kepuasan pelanggan':
-        if 'Masalah Pelanggan' in df.columns and 'Kepuasan Pelanggan' in df.columns:
-            problem_satisfaction = df.groupby('Masalah Pelanggan')['Kepuasan Pelanggan'].mean().reset_index()
-            charts.append({
-                'type': 'Masalah dan kepuasan pelanggan',
-                'figure': px.bar(data_frame=problem_satisfaction, 
-                                 x='Masalah Pelanggan', 
-                                 y='Kepuasan Pelanggan', 
-                                 labels={'Masalah Pelanggan': 'Masalah Pelanggan', 'Kepuasan Pelanggan': 'Kepuasan Pelanggan'})
-            })
-
-    elif selected_business_info == 'Distribusi alasan pengembalian produk':
-        if 'Alasan Pengembalian' in df.columns:
-            return_reasons = df['Alasan Pengembalian'].value_counts().reset_index()
-            return_reasons.columns = ['Alasan Pengembalian', 'Jumlah']
-            charts.append({
-                'type': 'Distribusi alasan pengembalian produk',
-                'figure': px.pie(data_frame=return_reasons, 
-                                 names='Alasan Pengembalian', 
-                                 values='Jumlah')
-            })
-
-    elif selected_business_info == 'Status pengembalian produk':
-        if 'Status Pengembalian' in df.columns:
-            return_status = df['Status Pengembalian'].value_counts().reset_index()
-            return_status.columns = ['Status Pengembalian', 'Jumlah']
-            charts.append({
-                'type': 'Status pengembalian produk',
-                'figure': px.pie(data_frame=return_status, 
-                                 names='Status Pengembalian', 
-                                 values='Jumlah')
-            })
-
-    interpretation = interpret_chart('Feedback dan Pengembalian', charts, model)
-    return charts, interpretation
+def visualize_analisis_penjualan(df, selected_business_info, model, stream=False, interactive=True):
+    return visualize_sheet('Analisis Penjualan', df, selected_business_info, model, stream, interactive)
 
-def visualize_analisis_penjualan(df, selected_business_info, model):
-    df = convert_to_date(df, ['Tanggal'])
-    charts = []
+def visualize_lainnya(df, selected_business_info, model, stream=False, interactive=True):
+    return visualize_sheet('Lainnya', df, selected_business_info, model, stream, interactive)
 
-    if selected_business_info == 'Penjualan agregat dan tren':
-        if 'Tanggal' in df.columns and 'Pendapatan' in df.columns:
-            sales_trends = df.groupby('Tanggal')['Pendapatan'].sum().reset_index()
-            charts.append({
-                'type': 'Penjualan agregat dan tren',
-                'figure': px.line(data_frame=sales_trends, 
-                                  x='Tanggal', 
-                                  y='Pendapatan', 
-                                  labels={'Tanggal': 'Tanggal', 'Pendapatan': 'Pendapatan'})
-            })
-
-    elif selected_business_info == 'Analisis penjualan berdasarkan produk/kategori':
-        if 'Produk' in df.columns and 'Pendapatan' in df.columns:
-            product_sales = df.groupby('Produk')['Pendapatan'].sum().reset_index()
-            charts.append({
-                'type': 'Analisis penjualan berdasarkan produk/kategori',
-                'figure': px.bar(data_frame=product_sales, 
-                                 x='Produk', 
-                                 y='Pendapatan', 
-                                 labels={'Produk': 'Produk', 'Pendapatan': 'Pendapatan'})
-            })
-
-    elif selected_business_info == 'Tren penjualan/tahunan':
-        if 'Tanggal' in df.columns and 'Pendapatan' in df.columns:
-            df['Tahun'] = df['Tanggal'].dt.year
-            annual_trends = df.groupby('Tahun')['Pendapatan'].sum().reset_index()
-            charts.append({
-                'type': 'Tren penjualan/tahunan',
-                'figure': px.line(data_frame=annual_trends, 
-                                  x='Tahun', 
-                                  y='Pendapatan', 
-                                  labels={'Tahun': 'Tahun', 'Pendapatan': 'Pendapatan'})
-            })
-
-    interpretation = interpret_chart('Analisis Penjualan', charts, model)
-    return charts, interpretation
+# Visualizer of each sheet, looked up instead of dispatching through an if/elif chain
+VISUALIZERS = {
+    'Pelanggan': visualize_pelanggan,
+    'Produk': visualize_produk,
+    'Transaksi Penjualan': visualize_transaksi_penjualan,
+    'Lokasi Penjualan': visualize_lokasi_penjualan,
+    'Staf Penjualan': visualize_staf_penjualan,
+    'Inventaris': visualize_inventaris,
+    'Promosi dan Pemasaran': visualize_promosi_pemasaran,
+    'Feedback dan Pengembalian': visualize_feedback_pengembalian,
+    'Analisis Penjualan': visualize_analisis_penjualan,
+    'Lainnya': visualize_lainnya,
+}
 
-def visualize_lainnya(df, selected_business_info, model):
-    df = convert_to_date(df, ['Tanggal'])
-    charts = []
-
-    if selected_business_info == 'Analisis tambahan dan faktor eksternal':
-        if 'Faktor Eksternal' in df.columns and 'Pendapatan' in df.columns:
-            external_factors = df.groupby('Faktor Eksternal')['Pendapatan'].sum().reset_index()
-            charts.append({
-                'type': 'Analisis tambahan dan faktor eksternal',
-                'figure': px.bar(data_frame=external_factors, 
-                                 x='Faktor Eksternal', 
-                                 y='Pendapatan', 
-                                 labels={'Faktor Eksternal': 'Faktor Eksternal', 'Pendapatan': 'Pendapatan'})
-            })
-
-    interpretation = interpret_chart('Lainnya', charts, model)
-    return charts, interpretation
-
-def visualize_data(df, selected_info, selected_business_info, model):
-    if selected_info == 'Pelanggan':
-        return visualize_pelanggan(df, selected_business_info, model)
-    elif selected_info == 'Produk':
-        return visualize_produk(df, selected_business_info, model)
-    elif selected_info == 'Transaksi Penjualan':
-        return visualize_transaksi_penjualan(df, selected_business_info, model)
-    elif selected_info == 'Lokasi Penjualan':
-        return visualize_lokasi_penjualan(df, selected_business_info, model)
-    elif selected_info == 'Staf Penjualan':
-        return visualize_staf_penjualan(df, selected_business_info, model)
-    elif selected_info == 'Inventaris':
-        return visualize_inventaris(df, selected_business_info, model)
-    elif selected_info == 'Promosi dan Pemasaran':
-        return visualize_promosi_pemasaran(df, selected_business_info, model)
-    elif selected_info == 'Feedback dan Pengembalian':
-        return visualize_feedback_pengembalian(df, selected_business_info, model)
-    elif selected_info == 'Analisis Penjualan':
-        return visualize_analisis_penjualan(df, selected_business_info, model)
-    elif selected_info == 'Lainnya':
-        return visualize_lainnya(df, selected_business_info, model)
-    else:
+def visualize_data(df, selected_info, selected_business_info, model, stream=False):
+    visualizer = VISUALIZERS.get(selected_info)
+    if visualizer is None:
         return [], "Pilihan informasi bisnis tidak ditemukan."
+    return visualizer(df, selected_business_info, model, stream=stream)